@@ -1,6 +1,13 @@
 import yt_dlp
 import os
 import sys
+from download_archive import DownloadArchive, downloaded_filepath
+from metadata_cache import MetadataCache, extract_with_cache, download_with_cache
+import batch_download
+from url_validation import is_youtube_url
+
+# Shared by get_video_info and download_video so each URL is extracted once
+metadata_cache = MetadataCache()
 
 def progress_hook(d):
     """Progress hook for yt-dlp downloads."""
@@ -16,7 +23,7 @@ def get_video_info(url):
     ydl_opts = {'quiet': True}
     with yt_dlp.YoutubeDL(ydl_opts) as ydl:
         try:
-            return ydl.extract_info(url, download=False)
+            return extract_with_cache(ydl, url, metadata_cache)
         except Exception as e:
             print(f"Error getting video info: {e}")
             return None
@@ -35,7 +42,11 @@ def get_available_formats(info):
     return sorted(formats, key=lambda x: int(x['resolution'].split('x')[1]) if 'x' in x['resolution'] else 0, reverse=True)
 
 def download_video(url, format_id, download_path):
-    """Download video with specified format."""
+    """
+    Download video with specified format.
+
+    Returns the path of the downloaded file, or None if the download failed.
+    """
     ydl_opts = {
         'format': format_id,
         'outtmpl': os.path.join(download_path, '%(title)s.%(ext)s'),
@@ -44,16 +55,15 @@ def download_video(url, format_id, download_path):
     
     with yt_dlp.YoutubeDL(ydl_opts) as ydl:
         try:
-            ydl.download([url])
-            return True
+            info = download_with_cache(ydl, url, metadata_cache)
+            return downloaded_filepath(info, ydl)
         except Exception as e:
             print(f"Download error: {e}")
-            return False
+            return None
 
 def validate_youtube_url(url):
     """Validate if the URL is a valid YouTube URL."""
-    youtube_domains = ['youtube.com', 'youtu.be', 'www.youtube.com', 'm.youtube.com']
-    return any(domain in url.lower() for domain in youtube_domains)
+    return is_youtube_url(url)
 
 
 
@@ -61,6 +71,7 @@ def main():
     """Main function."""
     print("Python YouTube Video Downloader")
     print("=" * 35)
+    archive = DownloadArchive()
     
     while True:
         url = input("\nEnter YouTube video URL (or 'quit' to exit): ").strip()
@@ -72,6 +83,11 @@ def main():
         if not validate_youtube_url(url):
             print("[ERROR] Invalid YouTube URL.")
             continue
+
+        archived = archive.get_url(url)
+        if archived:
+            print(f"Already downloaded: {archived['file_path']}")
+            continue
             
         print("\nFetching video information...")
         info = get_video_info(url)
@@ -109,9 +125,10 @@ def main():
             os.makedirs(download_path)
             
         print(f"\nStarting download...")
-        success = download_video(url, selected_format['format_id'], download_path)
+        filepath = download_video(url, selected_format['format_id'], download_path)
         
-        if success:
+        if filepath:
+            archive.add_info(info, filepath)
             print(f"File saved in: {os.path.abspath(download_path)}")
             restart = input("\nDownload another video? (y/n): ").strip().lower()
             if restart != 'y':
@@ -120,4 +137,7 @@ def main():
             print("[ERROR] Download failed.")
 
 if __name__ == "__main__":
+    if len(sys.argv) > 1:
+        # With arguments, run a non-interactive batch, e.g. python 10.py urls.txt --workers 4
+        sys.exit(batch_download.main(sys.argv[1:], validate=validate_youtube_url))
     main()
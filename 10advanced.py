@@ -4,12 +4,22 @@ import sys
 import tkinter as tk
 from tkinter import ttk, messagebox, filedialog
 import threading
+import queue
 from datetime import datetime
 import logging
 import json
+import multiprocessing
 from typing import Dict, List, Optional, Union
 import re
-from urllib.parse import urlparse, parse_qs
+from download_manager import DownloadManager, DownloadJob, DONE, FAILED, CANCELLED, expand_playlist
+from download_archive import DownloadArchive, downloaded_filepath, extract_video_id
+from metadata_cache import MetadataCache, extract_with_cache, download_with_cache, DEFAULT_TTL, DEFAULT_MAX_ENTRIES
+from chunked_download import ChunkedDownloader, bandwidth_bucket, parse_rate
+from format_selection import (FormatChoice, DEFAULT_QUALITY, available_video_formats, choose_for_format_id,
+                              select_format, fallback_format_spec)
+from post_processing import PostProcessor
+from download_telemetry import TelemetryLog, JobTelemetry, DEFAULT_TELEMETRY_LOG, DEFAULT_BACKUP_COUNT
+from url_validation import is_youtube_url, validate_many
 
 # Configure logging
 logging.basicConfig(
@@ -22,18 +32,68 @@ logging.basicConfig(
 )
 logger = logging.getLogger(__name__)
 
+PROGRESS_FPS = 10
+
 class YouTubeDownloader:
     def __init__(self):
         self.window = tk.Tk()
         self.window.title("Advanced YouTube Downloader")
-        self.window.geometry("800x600")
+        self.window.geometry("800x700")
         
         # Configuration management
         self.config_file = "config.json"
         self.config = self.load_config()
+        self.current_info: Optional[Dict] = None
+        self.current_info_url = ""
+        self.archive = DownloadArchive()
+        self.metadata_cache = MetadataCache(
+            ttl=self.config.get("metadata_cache_ttl", DEFAULT_TTL),
+            max_entries=self.config.get("metadata_cache_size", DEFAULT_MAX_ENTRIES),
+        )
+        # One JSON record per finished job; summarize with download_telemetry.py
+        self.telemetry_log = TelemetryLog(
+            self.config.get("telemetry_log", DEFAULT_TELEMETRY_LOG),
+            max_bytes=int(self.config.get("telemetry_log_max_mb", 5) * 1024 * 1024),
+            backup_count=self.config.get("telemetry_log_backups", DEFAULT_BACKUP_COUNT),
+        )
+        # One bucket shared by every running job caps their combined bandwidth
+        try:
+            bandwidth_limit = parse_rate(self.config.get("bandwidth_limit", "0"))
+        except ValueError:
+            logger.warning(f"Invalid bandwidth_limit {self.config.get('bandwidth_limit')!r} in config; not limiting")
+            bandwidth_limit = 0
+        self.bandwidth_limiter = bandwidth_bucket(bandwidth_limit)
         
         self.setup_ui()
-        self.current_downloads: Dict[str, Dict] = {}
+
+        # Finished files are processed in worker processes while downloads continue.
+        # A misspelt step in the config is logged and skipped rather than stopping the app
+        self.post_processor = PostProcessor(self.config.get("post_processing", []),
+                                            max_workers=self.config.get("post_processing_workers"),
+                                            on_done=self.post_processing_done, skip_invalid=True,
+                                            # Forking a multithreaded Tk process can deadlock the children
+                                            mp_context=multiprocessing.get_context('spawn'))
+
+        # Worker threads only push job updates here; the Tk thread drains the
+        # queue at a fixed frame rate and redraws each changed job once per frame
+        self.progress_events = queue.SimpleQueue()
+        self.progress_pending: Dict[str, DownloadJob] = {}
+        self.progress_interval = max(16, 1000 // max(1, int(self.config.get("progress_fps", PROGRESS_FPS))))
+
+        # Queued downloads, run at most max_concurrent_downloads at a time
+        self.download_manager = DownloadManager(
+            self.run_download_job,
+            max_workers=self.config.get("max_concurrent_downloads", 3),
+            queue_file="download_queue.json",
+            on_update=self.queue_job_update,
+        )
+        self.current_downloads: Dict[str, DownloadJob] = self.download_manager.jobs
+        for job in self.download_manager.list_jobs():
+            self.refresh_job_row(job)
+        self.refresh_summary()
+        self.download_manager.start()
+        self.window.after(self.progress_interval, self.render_progress)
+        self.window.protocol("WM_DELETE_WINDOW", self.on_close)
         
     def load_config(self) -> Dict:
         """Load configuration from JSON file."""
@@ -47,7 +107,17 @@ class YouTubeDownloader:
             "default_download_path": "downloads",
             "max_concurrent_downloads": 3,
             "preferred_quality": "1080p",
-            "auto_create_playlist_folder": True
+            "auto_create_playlist_folder": True,
+            "metadata_cache_ttl": DEFAULT_TTL,
+            "metadata_cache_size": DEFAULT_MAX_ENTRIES,
+            "download_fragments": 1,
+            "bandwidth_limit": "0",
+            "progress_fps": PROGRESS_FPS,
+            "post_processing": [],
+            "post_processing_workers": None,
+            "telemetry_log": DEFAULT_TELEMETRY_LOG,
+            "telemetry_log_max_mb": 5,
+            "telemetry_log_backups": DEFAULT_BACKUP_COUNT
         }
         
     def save_config(self):
@@ -91,51 +161,100 @@ class YouTubeDownloader:
         ttk.Entry(control_frame, textvariable=self.download_path_var, width=50).pack(side=tk.LEFT, padx=5)
         ttk.Button(control_frame, text="Browse", command=self.browse_download_path).pack(side=tk.LEFT)
         
-        # Download Button
-        self.download_btn = ttk.Button(self.window, text="Download", command=self.start_download)
-        self.download_btn.pack(pady=10)
+        # Download Buttons
+        button_frame = ttk.Frame(self.window)
+        button_frame.pack(pady=10)
+        self.download_btn = ttk.Button(button_frame, text="Download", command=self.start_download)
+        self.download_btn.pack(side=tk.LEFT, padx=5)
+        ttk.Button(button_frame, text="Dry Run", command=self.show_dry_run).pack(side=tk.LEFT, padx=5)
+        ttk.Button(button_frame, text="Add URLs...", command=self.open_batch_dialog).pack(side=tk.LEFT, padx=5)
+        ttk.Button(button_frame, text="Cancel Selected", command=self.cancel_selected_jobs).pack(side=tk.LEFT, padx=5)
         
-        # Progress Frame
+        # Progress Frame: one row per queued/running/finished job
         progress_frame = ttk.LabelFrame(self.window, text="Download Progress", padding=10)
-        progress_frame.pack(fill=tk.X, padx=5, pady=5)
+        progress_frame.pack(fill=tk.BOTH, padx=5, pady=5, expand=True)
+        
+        job_columns = ("Title", "Status", "Progress", "Speed", "ETA")
+        self.jobs_tree = ttk.Treeview(progress_frame, columns=job_columns, show="headings", height=6)
+        for col in job_columns:
+            self.jobs_tree.heading(col, text=col)
+        self.jobs_tree.column("Title", width=320)
+        for col in job_columns[1:]:
+            self.jobs_tree.column(col, width=90, anchor=tk.CENTER)
+        self.jobs_tree.pack(fill=tk.BOTH, expand=True, pady=5)
         
         self.progress_var = tk.StringVar(value="Ready")
         self.progress_bar = ttk.Progressbar(progress_frame, length=300, mode='determinate')
         self.progress_bar.pack(fill=tk.X, pady=5)
         ttk.Label(progress_frame, textvariable=self.progress_var).pack()
 
-    def progress_hook(self, d: Dict):
-        """Enhanced progress hook for downloads."""
+    def progress_hook(self, job: DownloadJob, d: Dict):
+        """Per-job progress hook for downloads; runs on the worker thread."""
+        job.check_cancelled()
         if d['status'] == 'downloading':
-            percent = d.get('_percent_str', 'N/A')
-            speed = d.get('_speed_str', 'N/A')
-            eta = d.get('_eta_str', 'N/A')
-            
-            progress = float(percent.strip('%')) if percent != 'N/A' else 0
-            self.progress_bar['value'] = progress
-            
-            status = f"Downloading: {percent} at {speed} (ETA: {eta})"
-            self.progress_var.set(status)
-            self.window.update_idletasks()
+            percent = d.get('_percent_str', 'N/A').strip()
+            try:
+                job.progress = float(percent.strip('%'))
+            except ValueError:
+                pass
+            job.speed = d.get('_speed_str', 'N/A').strip()
+            job.eta = d.get('_eta_str', 'N/A').strip()
             
         elif d['status'] == 'finished':
-            self.progress_var.set(f"Download completed: {os.path.basename(d['filename'])}")
-            self.progress_bar['value'] = 100
+            job.filename = d.get('filename', '')
+            job.progress = 100.0
+        self.download_manager.notify(job)
+
+    def queue_job_update(self, job: DownloadJob):
+        """Marks a job as changed; safe to call from any thread."""
+        # A job already waiting for the next frame is not queued again, so the
+        # queue never holds more than one entry per job however often yt-dlp calls back
+        if job.job_id not in self.progress_pending:
+            self.progress_pending[job.job_id] = job
+            self.progress_events.put(job)
+
+    def render_progress(self):
+        """Applies queued job updates on the Tk thread, once per frame."""
+        changed: List[DownloadJob] = []
+        try:
+            while True:
+                job = self.progress_events.get_nowait()
+                # Drop the mark before drawing, so later changes queue the job again
+                self.progress_pending.pop(job.job_id, None)
+                changed.append(job)
+        except queue.Empty:
+            pass
+
+        if changed:
+            for job in changed:
+                self.refresh_job_row(job)
+            self.refresh_summary()
+        self.window.after(self.progress_interval, self.render_progress)
+
+    def refresh_job_row(self, job: DownloadJob):
+        """Updates a job's row in the progress view."""
+        title = job.title or job.url
+        status = f"{job.state} ({job.extra['post']})" if job.extra.get('post') else job.state
+        values = (title, status, f"{job.progress:.1f}%", job.speed, job.eta)
+        if self.jobs_tree.exists(job.job_id):
+            self.jobs_tree.item(job.job_id, values=values)
+        else:
+            self.jobs_tree.insert('', 'end', iid=job.job_id, values=values)
+
+    def refresh_summary(self):
+        """Updates the overall progress bar and the completed/failed/pending counts."""
+        jobs = self.download_manager.list_jobs()
+        active = [j for j in jobs if j.state not in (FAILED, CANCELLED)]
+        if active:
+            self.progress_bar['value'] = sum(j.progress for j in active) / len(active)
+        done = sum(1 for j in jobs if j.state == DONE)
+        failed = sum(1 for j in jobs if j.state == FAILED)
+        pending = self.download_manager.pending_count()
+        self.progress_var.set(f"{done}/{len(jobs)} completed, {failed} failed, {pending} pending")
             
     def validate_youtube_url(self, url: str) -> bool:
         """Enhanced URL validation with support for playlists and shorts."""
-        try:
-            parsed = urlparse(url)
-            if parsed.netloc in ['youtube.com', 'www.youtube.com', 'youtu.be', 'm.youtube.com']:
-                if parsed.path.startswith('/watch') or parsed.path.startswith('/shorts/'):
-                    return True
-                if parsed.path.startswith('/playlist'):
-                    return True
-                if parsed.netloc == 'youtu.be' and len(parsed.path) > 1:
-                    return True
-            return False
-        except Exception:
-            return False
+        return is_youtube_url(url)
 
     def get_video_info(self, url: str) -> Optional[Dict]:
         """Get video information with enhanced error handling."""
@@ -147,7 +266,7 @@ class YouTubeDownloader:
         
         try:
             with yt_dlp.YoutubeDL(ydl_opts) as ydl:
-                info = ydl.extract_info(url, download=False)
+                info = extract_with_cache(ydl, url, self.metadata_cache)
                 if info.get('_type') == 'playlist':
                     # Handle playlist differently
                     return self.process_playlist_info(info)
@@ -159,19 +278,32 @@ class YouTubeDownloader:
 
     def process_playlist_info(self, playlist_info: Dict) -> Dict:
         """Process playlist information."""
+        entries = [entry for entry in playlist_info.get('entries') or [] if entry]
         return {
+            'id': playlist_info.get('id'),
             'title': playlist_info.get('title', 'Unknown Playlist'),
             'is_playlist': True,
-            'entries': playlist_info.get('entries', []),
-            'playlist_count': playlist_info.get('playlist_count', 0)
+            'entries': entries,
+            'playlist_count': playlist_info.get('playlist_count') or len(entries)
         }
 
+    def extract_entry_info(self, url: str) -> Dict:
+        """Extract full metadata for a single playlist entry (thread-safe)."""
+        with yt_dlp.YoutubeDL({'quiet': True, 'no_warnings': True}) as ydl:
+            return extract_with_cache(ydl, url, self.metadata_cache)
+
     def fetch_video_info(self):
         """Fetch and display video information."""
         url = self.url_var.get().strip()
         if not self.validate_youtube_url(url):
             messagebox.showerror("Error", "Invalid YouTube URL")
             return
+
+        archived = self.archive.get_url(url)
+        if archived and not messagebox.askyesno(
+                "Already Downloaded",
+                f"This video was already downloaded to:\n{archived['file_path']}\n\nFetch its information anyway?"):
+            return
             
         self.progress_var.set("Fetching video information...")
         self.window.update_idletasks()
@@ -179,38 +311,120 @@ class YouTubeDownloader:
         def fetch():
             info = self.get_video_info(url)
             if info:
+                self.current_info = info
+                self.current_info_url = url
                 self.display_video_info(info)
                 
         threading.Thread(target=fetch, daemon=True).start()
 
     def get_available_formats(self, info: Dict) -> List[Dict]:
-        """Get available video formats."""
+        """Get available video formats, including video-only ones when ffmpeg can merge audio in."""
         formats = []
-        for f in info.get('formats', []):
-            if f.get('vcodec') != 'none' and f.get('acodec') != 'none':
-                formats.append({
-                    'format_id': f['format_id'],
-                    'ext': f['ext'],
-                    'resolution': f.get('resolution', 'Unknown'),
-                    'filesize': f.get('filesize', 0),
-                })
-        return sorted(formats, key=lambda x: int(x['resolution'].split('x')[1]) if 'x' in x['resolution'] else 0, reverse=True)
-
-    def download_video(self, url: str, resolution: str, download_path: str) -> bool:
-        """Download video with specified resolution."""
+        for f in available_video_formats(info):
+            choice = choose_for_format_id(info, f['format_id'])
+            formats.append({
+                'format_id': f['format_id'],
+                'ext': choice.merge_format or f['ext'],
+                'resolution': f.get('resolution', 'Unknown'),
+                'filesize': choice.expected_bytes or 0,
+            })
+        return formats
+
+    def select_format(self, info: Dict, selection: Optional[str] = None) -> Optional[FormatChoice]:
+        """Resolves a selected format_id, or the preferred quality when nothing is selected."""
+        return select_format(info, selection, self.config.get("preferred_quality", DEFAULT_QUALITY))
+
+    def download_video(self, url: str, resolution: str, download_path: str,
+                       progress_hook=None, telemetry: Optional[JobTelemetry] = None) -> Optional[Dict]:
+        """
+        Download video in the selected format. Returns the video's info dict, or None on failure.
+
+        `resolution` is a format_id from the format list or a quality such as
+        '720p'; 'best' means the configured preferred quality. If `telemetry`
+        is given it receives yt-dlp's log messages and the error on failure.
+        """
+        fragments = max(1, int(self.config.get("download_fragments", 1)))
+        preferred = self.config.get("preferred_quality", DEFAULT_QUALITY)
         ydl_opts = {
-            'format': 'best[height<=?720]',  # Default format
+            'format': fallback_format_spec(resolution if resolution not in ('', 'best') else preferred),
             'outtmpl': os.path.join(download_path, '%(title)s.%(ext)s'),
-            'progress_hooks': [self.progress_hook],
+            'progress_hooks': [progress_hook] if progress_hook else [],
+            'continuedl': True,
+            'concurrent_fragment_downloads': fragments,
         }
+        if telemetry:
+            ydl_opts['logger'] = telemetry
+        if self.bandwidth_limiter.rate > 0:
+            # yt-dlp can only limit each download; give every worker an equal share
+            ydl_opts['ratelimit'] = self.bandwidth_limiter.rate / self.download_manager.max_workers
         
-        with yt_dlp.YoutubeDL(ydl_opts) as ydl:
-            try:
-                ydl.download([url])
-                return True
-            except Exception as e:
-                logger.error(f"Download error: {e}")
-                return False
+        try:
+            # YoutubeDL compiles its format selector up front, so pick the
+            # concrete streams from the (usually cached) metadata first
+            with yt_dlp.YoutubeDL({'quiet': True, 'no_warnings': True}) as probe:
+                info = extract_with_cache(probe, url, self.metadata_cache)
+            choice = self.select_format(info, resolution)
+            if choice:
+                ydl_opts.update(choice.ydl_options())
+                logger.info(f"Selected {choice.describe()}")
+
+            with yt_dlp.YoutubeDL(ydl_opts) as ydl:
+                if fragments > 1 or self.bandwidth_limiter.rate > 0:
+                    info = self.download_chunked(ydl, url, fragments, progress_hook)
+                    if info:
+                        return info
+                info = download_with_cache(ydl, url, self.metadata_cache)
+                info['filepath'] = downloaded_filepath(info, ydl)
+                return info
+        except Exception as e:
+            logger.error(f"Download error: {e}")
+            if telemetry:
+                telemetry.failed(e)
+            return None
+
+    def download_chunked(self, ydl, url: str, fragments: int, progress_hook=None) -> Optional[Dict]:
+        """
+        Download a single-file format over parallel range requests.
+
+        Uses the shared bandwidth limiter and resumes from an existing .part
+        file. Returns None when the selected format is not a plain HTTP file
+        (separate video/audio streams, HLS/DASH), so yt-dlp's own downloader
+        handles it instead.
+        """
+        info = extract_with_cache(ydl, url, self.metadata_cache)
+        info = ydl.process_ie_result(info, download=False)
+        formats = info.get('requested_formats') or [info]
+        if len(formats) != 1 or formats[0].get('protocol') not in ('http', 'https') or not formats[0].get('url'):
+            return None
+
+        fmt = formats[0]
+        filepath = ydl.prepare_filename(info)
+        os.makedirs(os.path.dirname(filepath) or '.', exist_ok=True)
+
+        def report(downloaded, total, speed):
+            if not progress_hook:
+                return
+            eta = (total - downloaded) / speed if total and speed else None
+            progress_hook({
+                'status': 'downloading',
+                '_percent_str': f"{100 * downloaded / total:.1f}%" if total else 'N/A',
+                '_speed_str': f"{speed / 1_000_000:.2f}MB/s",
+                '_eta_str': f"{int(eta) // 60:02d}:{int(eta) % 60:02d}" if eta is not None else 'N/A',
+                'downloaded_bytes': downloaded,
+                'total_bytes': total,
+                'speed': speed,
+                'filename': filepath,
+            })
+
+        ChunkedDownloader(
+            fmt['url'], filepath, fragments=fragments, bucket=self.bandwidth_limiter,
+            headers=fmt.get('http_headers'), progress=report,
+            expected_size=fmt.get('filesize'),
+        ).run()
+        if progress_hook:
+            progress_hook({'status': 'finished', 'filename': filepath})
+        info['filepath'] = filepath
+        return info
 
     def display_playlist_info(self, info: Dict):
         """Display playlist information."""
@@ -219,6 +433,13 @@ class YouTubeDownloader:
             "Various",
             "N/A"
         ))
+        for entry in info['entries']:
+            duration = entry.get('duration')
+            self.format_tree.insert('', 'end', values=(
+                f"  {entry.get('title') or entry.get('id')}",
+                "Video",
+                f"{int(duration) // 60}:{int(duration) % 60:02d}" if duration else "N/A"
+            ))
 
     def display_video_info(self, info: Dict):
         """Display video information in the UI."""
@@ -233,7 +454,7 @@ class YouTubeDownloader:
         formats = self.get_available_formats(info)
         for fmt in formats:
             size_mb = fmt['filesize'] / 1_000_000 if fmt['filesize'] else 0
-            self.format_tree.insert('', 'end', values=(
+            self.format_tree.insert('', 'end', iid=fmt['format_id'], values=(
                 fmt['resolution'],
                 fmt['ext'],
                 f"{size_mb:.1f} MB"
@@ -241,29 +462,165 @@ class YouTubeDownloader:
 
     def start_download(self):
         """Initiate the download process."""
-        selected_items = self.format_tree.selection()
-        if not selected_items:
-            messagebox.showwarning("Warning", "Please select a format to download")
+        url = self.url_var.get().strip()
+        if self.current_info and self.current_info.get('is_playlist') and self.current_info_url == url:
+            self.download_playlist(self.current_info, self.download_path_var.get())
+            return
+
+        archived = self.archive.get_url(url)
+        if archived:
+            messagebox.showinfo("Already Downloaded", f"This video was already downloaded to:\n{archived['file_path']}")
             return
             
-        url = self.url_var.get().strip()
-        format_values = self.format_tree.item(selected_items[0])['values']
+        # The selected row's format_id, or the preferred quality if no row is selected
+        selected_items = self.format_tree.selection()
+        format_spec = selected_items[0] if selected_items else 'best'
         
         download_path = self.download_path_var.get()
-        if not os.path.exists(download_path):
-            os.makedirs(download_path)
-            
-        def download():
-            self.download_btn['state'] = 'disabled'
-            success = self.download_video(url, format_values[0], download_path)
-            self.download_btn['state'] = 'normal'
-            
-            if success:
-                messagebox.showinfo("Success", f"Download completed!\nSaved in: {download_path}")
-            else:
-                messagebox.showerror("Error", "Download failed")
-                
-        threading.Thread(target=download, daemon=True).start()
+        info = self.current_info if self.current_info and self.current_info_url == url else {}
+        self.download_manager.submit(url, download_path, format_spec=format_spec,
+                                     title=info.get('title', ''), video_id=info.get('id'))
+
+    def show_dry_run(self):
+        """Shows which streams a download would fetch and how many bytes to expect."""
+        url = self.url_var.get().strip()
+        info = self.current_info if self.current_info_url == url else None
+        if not info or info.get('is_playlist'):
+            messagebox.showwarning("Warning", "Fetch the information of a single video first")
+            return
+
+        selected_items = self.format_tree.selection()
+        choice = self.select_format(info, selected_items[0] if selected_items else None)
+        if choice is None:
+            messagebox.showwarning("Warning", "No downloadable formats found")
+            return
+        messagebox.showinfo("Dry Run", f"{info.get('title', url)}\n\nFormat {choice.format_spec}\n{choice.describe()}")
+
+    def download_playlist(self, info: Dict, download_path: str):
+        """Resolve every playlist entry concurrently and queue the ones not downloaded yet."""
+        if self.config.get("auto_create_playlist_folder", True):
+            folder = re.sub(r'[\\/:*?"<>|]', '_', info.get('title') or 'Playlist').strip()
+            download_path = os.path.join(download_path, folder)
+        self.progress_var.set(f"Resolving {len(info['entries'])} playlist entries...")
+
+        def expand():
+            resolved, skipped, failures = expand_playlist(
+                info['entries'],
+                self.extract_entry_info,
+                skip_ids=self.download_manager.known_video_ids() | self.archive.video_ids(),
+                max_workers=max(4, self.download_manager.max_workers * 2),
+            )
+            for entry in resolved:
+                self.download_manager.submit(
+                    entry['webpage_url'], download_path,
+                    title=entry.get('title', ''),
+                    video_id=entry.get('id'),
+                    playlist=info.get('title'),
+                )
+            summary = (f"Queued {len(resolved)} playlist videos, skipped {len(skipped)} already downloaded, "
+                       f"{len(failures)} could not be resolved")
+            logger.info(summary)
+            self.window.after(0, self.progress_var.set, summary)
+
+        threading.Thread(target=expand, daemon=True).start()
+
+    def run_download_job(self, job: DownloadJob):
+        """Runs one queued job on a download worker thread."""
+        telemetry = JobTelemetry(job.job_id, job.url, video_id=job.extra.get('video_id'),
+                                 format=job.format_spec)
+        status = 'failed'
+
+        def hook(d):
+            telemetry.progress(d)
+            self.progress_hook(job, d)
+
+        try:
+            archived = self.archive.get_url(job.url)
+            if archived:
+                job.filename = archived['file_path'] or ''
+                logger.info(f"Skipping already downloaded video: {job.url}")
+                status = 'skipped'
+                return
+
+            os.makedirs(job.download_path, exist_ok=True)
+            info = self.download_video(job.url, job.format_spec, job.download_path,
+                                       progress_hook=hook, telemetry=telemetry)
+            if not info:
+                raise RuntimeError(f"Download failed: {job.url}")
+            status = 'done'
+            job.filename = info.get('filepath') or job.filename
+            self.archive.add_info(info, job.filename)
+            logger.info(f"Download completed: {job.filename or job.url}")
+            # Marked before submitting: a fast step may finish (and set the result) before submit returns
+            job.extra['post'] = 'processing'
+            if not self.post_processor.submit(job.job_id, job.filename):
+                job.extra.pop('post', None)
+        except Exception as e:
+            if telemetry.exception is None:
+                telemetry.failed(e)
+            status = 'cancelled' if job.cancel_event.is_set() else 'failed'
+            raise
+        finally:
+            self.telemetry_log.write(telemetry.to_record(status))
+
+    def post_processing_done(self, job_id: str, results: Dict):
+        """Records post-processing results on the job; called from a pool thread."""
+        job = self.download_manager.jobs.get(job_id)
+        if job is None:
+            return
+        job.extra['post'] = 'processing failed' if results['errors'] else 'processed'
+        job.extra['post_results'] = results
+        self.download_manager.notify(job)
+
+    def open_batch_dialog(self):
+        """Opens a dialog to queue several URLs at once, one per line."""
+        dialog = tk.Toplevel(self.window)
+        dialog.title("Add URLs")
+        dialog.geometry("500x300")
+        dialog.transient(self.window)
+
+        ttk.Label(dialog, text="One YouTube URL per line:").pack(anchor=tk.W, padx=10, pady=(10, 0))
+        text = tk.Text(dialog, height=10)
+        text.pack(fill=tk.BOTH, expand=True, padx=10, pady=5)
+
+        def add():
+            self.queue_urls(text.get("1.0", tk.END).splitlines())
+            dialog.destroy()
+
+        ttk.Button(dialog, text="Add to Queue", command=add).pack(pady=(0, 10))
+
+    def queue_urls(self, urls: List[str]):
+        """Queues every valid URL with the default format."""
+        download_path = self.download_path_var.get()
+        urls = [url.strip() for url in urls if url.strip()]
+        verdicts = validate_many(urls, is_youtube_url)
+        invalid = [url for url, ok in zip(urls, verdicts) if not ok]
+        queued_ids = self.download_manager.known_video_ids()
+        skipped = 0
+        for url, ok in zip(urls, verdicts):
+            if not ok:
+                continue
+            key = extract_video_id(url)
+            if key and (key in self.archive or key[1] in queued_ids):
+                skipped += 1
+                continue
+            self.download_manager.submit(url, download_path, video_id=key[1] if key else None)
+        if skipped:
+            self.progress_var.set(f"Skipped {skipped} already downloaded or queued video(s)")
+        if invalid:
+            messagebox.showwarning("Invalid URLs", f"Skipped {len(invalid)} invalid URL(s):\n" + "\n".join(invalid[:10]))
+
+    def cancel_selected_jobs(self):
+        """Cancels the jobs selected in the progress view."""
+        for job_id in self.jobs_tree.selection():
+            self.download_manager.cancel(job_id)
+
+    def on_close(self):
+        """Persists the unfinished queue and closes the window."""
+        self.download_manager.shutdown()
+        self.post_processor.shutdown(wait=False)
+        self.telemetry_log.close()
+        self.window.destroy()
 
     def browse_download_path(self):
         """Open file dialog to select download directory."""
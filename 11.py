@@ -1,7 +1,7 @@
 import requests
 from bs4 import BeautifulSoup
-import csv
 import os
+from scrape_store import upsert_csv
 
 def fetch_page(url):
     """
@@ -70,35 +70,40 @@ def parse_quotes(html_content):
 
 def save_to_csv(data, filename='quotes.csv'):
     """
-    Saves the extracted data to a CSV file.
+    Merges the extracted data into a CSV file.
+
+    Existing quotes are matched by their text and author, so only new quotes
+    are appended and only quotes whose tags changed are rewritten.
 
     Args:
         data (list): A list of dictionaries to save.
         filename (str): The name of the output CSV file.
+
+    Returns:
+        dict: The upsert delta, or None if nothing was saved.
     """
     if not data:
         print("No data to save.")
-        return
+        return None
 
-    # Define the fieldnames from the keys of the first dictionary
-    fieldnames = data[0].keys()
-    
     try:
-        with open(filename, 'w', newline='', encoding='utf-8') as csvfile:
-            writer = csv.DictWriter(csvfile, fieldnames=fieldnames)
-            
-            # Write the header row
-            writer.writeheader()
-            
-            # Write the data rows
-            writer.writerows(data)
-        
-        print(f"\nSuccessfully saved {len(data)} quotes to '{os.path.abspath(filename)}'.")
-
-    except IOError as e:
+        delta = upsert_csv(data, filename, key_fields=('text', 'author'))
+    except (IOError, KeyError) as e:
         print(f"Error writing to file {filename}: {e}")
+        return None
     except Exception as err:
         print(f"An unexpected error occurred during file writing: {err}")
+        return None
+
+    print(f"\nMerged into '{os.path.abspath(filename)}': "
+          f"{len(delta['inserted'])} new, {len(delta['updated'])} changed, "
+          f"{delta['unchanged']} unchanged.")
+    for op, records in (('+', delta['inserted']), ('~', delta['updated'])):
+        for record in records:
+            # Records come back keyed in the existing file's header case.
+            fields = {str(k).lower(): v for k, v in record.items()}
+            print(f"  {op} {fields.get('author', '')}: {str(fields.get('text', ''))[:60]}")
+    return delta
 
 def main():
     """
@@ -119,7 +124,7 @@ def main():
         scraped_data = parse_quotes(html)
         
         if scraped_data:
-            # Step 3: Save the data to a CSV file
+            # Step 3: Merge the data into the CSV file
             save_to_csv(scraped_data)
         else:
             print("Could not find any quotes to parse. The website structure might have changed.")
@@ -1,33 +1,74 @@
 import requests
-from bs4 import BeautifulSoup
-import csv
+import argparse
+import asyncio
 import os
+import sys
+import json
+import time
 import threading
+import queue
+from collections import Counter, deque
+from concurrent.futures import ProcessPoolExecutor
 import tkinter as tk
 from tkinter import ttk, messagebox, filedialog, scrolledtext
-
-def fetch_page(url):
+from scrape_store import upsert_csv
+from extraction_schema import CompiledSchema, load_schema
+from percentiles import percentile
+try:
+    import aiohttp
+    AIOHTTP_AVAILABLE = True
+except ImportError:
+    AIOHTTP_AVAILABLE = False
+
+HEADERS = {
+    'User-Agent': 'Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/91.0.4472.124 Safari/537.36'
+}
+REQUEST_TIMEOUT = 10
+
+# Default extraction schema for quotes.toscrape.com; see extraction_schema.py
+QUOTES_SCHEMA = {
+    'name': 'quotes.toscrape.com',
+    'record': 'div.quote',
+    'fields': {
+        'Text': 'span.text',
+        'Author': 'small.author',
+        'Tags': {'selector': 'a.tag', 'many': True, 'join': ', '},
+    },
+    'next': 'li.next > a[href]',
+    'key': ['Text', 'Author'],
+}
+DEFAULT_SCHEMA = CompiledSchema(QUOTES_SCHEMA)
+_active_schema = DEFAULT_SCHEMA
+
+def fetch_page(url, metrics=None):
     """
     Fetches the content of a web page.
 
     Args:
         url (str): The URL of the web page to fetch.
+        metrics (CrawlMetrics): Optional collector for latency, size and errors.
 
     Returns:
         tuple: (HTML content as string, error message as string)
     """
+    started = time.perf_counter()
     try:
-        headers = {
-            'User-Agent': 'Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/91.0.4472.124 Safari/537.36'
-        }
-        response = requests.get(url, headers=headers, timeout=10)
+        response = requests.get(url, headers=HEADERS, timeout=REQUEST_TIMEOUT)
         response.raise_for_status()
+        if metrics:
+            metrics.record_fetch(time.perf_counter() - started, len(response.content))
         return response.text, None
     except requests.exceptions.HTTPError as http_err:
+        if metrics:
+            metrics.record_error(http_err)
         return None, f"HTTP error occurred: {http_err}"
     except requests.exceptions.RequestException as req_err:
+        if metrics:
+            metrics.record_error(req_err)
         return None, f"Network error: {req_err}"
     except Exception as err:
+        if metrics:
+            metrics.record_error(err)
         return None, f"An unexpected error occurred: {err}"
 
 def parse_quotes(html_content):
@@ -40,34 +81,430 @@ def parse_quotes(html_content):
     Returns:
         list: A list of dictionaries, where each dictionary represents a quote.
     """
-    if not html_content:
-        return []
+    quotes_data, _ = parse_page(html_content, schema=DEFAULT_SCHEMA)
+    return quotes_data
 
-    soup = BeautifulSoup(html_content, 'html.parser')
-    quotes_data = []
-    quote_elements = soup.find_all('div', class_='quote')
+def parse_page(html_content, page_url=None, schema=None):
+    """
+    Extracts the records on a page and finds the link to the next page.
 
-    for quote_element in quote_elements:
-        text = quote_element.find('span', class_='text').get_text(strip=True)
-        author = quote_element.find('small', class_='author').get_text(strip=True)
-        tags_elements = quote_element.find_all('a', class_='tag')
-        tags = ', '.join([tag.get_text(strip=True) for tag in tags_elements])
-        
-        quotes_data.append({
-            'Text': text,
-            'Author': author,
-            'Tags': tags
-        })
-    return quotes_data
+    Args:
+        html_content (str): The HTML content of the page.
+        page_url (str): The URL the page was fetched from, used to resolve the next link.
+        schema (CompiledSchema): The extraction schema; defaults to the active one.
+
+    Returns:
+        tuple: (list of record dictionaries, absolute URL of the next page or None)
+    """
+    return (schema or _active_schema).extract(html_content, page_url)
+
+def use_schema(spec):
+    """
+    Compiles a schema definition and makes it the default for parse_page.
+
+    Also used as the process-pool initializer so every parser process
+    compiles the selectors exactly once.
+    """
+    global _active_schema
+    _active_schema = CompiledSchema(spec) if spec else DEFAULT_SCHEMA
+
+def crawl(start_urls, max_pages, metrics, on_records, on_progress=None, schema=None):
+    """
+    Crawls pages breadth-first from the seed URLs, following 'Next' links.
+
+    Args:
+        start_urls (list): Seed URLs.
+        max_pages (int): Maximum number of pages to fetch.
+        metrics (CrawlMetrics): Collector updated as pages are fetched and parsed.
+        on_records (callable): Called with each page's list of records.
+        on_progress (callable): Optional, called with the number of pages done.
+        schema (CompiledSchema): The extraction schema; defaults to the active one.
+
+    Returns:
+        tuple: (pages fetched, error message or None)
+    """
+    frontier = deque(start_urls)
+    seen = set(start_urls)
+    pages = 0
+    while frontier and pages < max_pages:
+        metrics.set_queue_depth(len(frontier))
+        url = frontier.popleft()
+        html, error = fetch_page(url, metrics)
+        if error:
+            metrics.set_queue_depth(0)
+            return pages, error
+
+        started = time.perf_counter()
+        data, next_url = parse_page(html, url, schema)
+        metrics.record_parse(time.perf_counter() - started, len(data))
+        pages += 1
+
+        if data:
+            on_records(data)
+        if next_url and next_url not in seen:
+            seen.add(next_url)
+            frontier.append(next_url)
+        if on_progress:
+            on_progress(pages)
+
+    metrics.set_queue_depth(0)
+    return pages, None
+
+def _parse_page_timed(html_content, page_url, schema=None):
+    """Process-pool entry point: parses a page and reports how long it took."""
+    started = time.perf_counter()
+    data, next_url = parse_page(html_content, page_url, schema)
+    return data, next_url, time.perf_counter() - started
+
+async def fetch_page_async(session, url, metrics=None):
+    """
+    Fetches a page with aiohttp, or with requests on a thread when aiohttp is missing.
+
+    Args:
+        session (aiohttp.ClientSession): Shared session, or None for the fallback.
+        url (str): The URL of the web page to fetch.
+        metrics (CrawlMetrics): Optional collector for latency, size and errors.
+
+    Returns:
+        tuple: (HTML content as string, error message as string)
+    """
+    if session is None:
+        return await asyncio.to_thread(fetch_page, url, metrics)
+
+    started = time.perf_counter()
+    try:
+        async with session.get(url) as response:
+            body = await response.read()
+            response.raise_for_status()
+            if metrics:
+                metrics.record_fetch(time.perf_counter() - started, len(body))
+            return body.decode(response.get_encoding(), errors='replace'), None
+    except aiohttp.ClientResponseError as http_err:
+        if metrics:
+            metrics.record_error(http_err)
+        return None, f"HTTP error occurred: {http_err.status} {http_err.message} for url: {url}"
+    except (aiohttp.ClientError, asyncio.TimeoutError) as req_err:
+        if metrics:
+            metrics.record_error(req_err)
+        return None, f"Network error: {req_err!r} for url: {url}"
+
+async def crawl_async(start_urls, max_pages, metrics, on_records, concurrency=8, parse_workers=None,
+                      schema=None):
+    """
+    Crawls with concurrent async fetches and HTML parsing in a process pool.
+
+    Fetching is I/O bound and runs on the event loop; parsing is CPU bound
+    and is shipped to worker processes so it scales with cores instead of
+    contending for the GIL.
+
+    Args:
+        start_urls (list): Seed URLs.
+        max_pages (int): Maximum number of pages to fetch.
+        metrics (CrawlMetrics): Collector updated as pages are fetched and parsed.
+        on_records (callable): Called with each page's list of records.
+        concurrency (int): Maximum number of simultaneous requests.
+        parse_workers (int): Parser processes; 0 parses on the event loop thread.
+        schema (CompiledSchema): The extraction schema; defaults to the active one.
+
+    Returns:
+        tuple: (pages fetched, list of error messages)
+    """
+    loop = asyncio.get_running_loop()
+    frontier = asyncio.Queue()
+    seen = set()
+    scheduled = 0
+    pages = 0
+    in_flight = 0
+    errors = []
+
+    def schedule(url):
+        nonlocal scheduled
+        if url and url not in seen and scheduled < max_pages:
+            seen.add(url)
+            scheduled += 1
+            frontier.put_nowait(url)
+
+    for url in start_urls:
+        schedule(url)
+
+    schema = schema or _active_schema
+    pool = None
+    if parse_workers != 0:
+        pool = ProcessPoolExecutor(max_workers=parse_workers, initializer=use_schema, initargs=(schema.spec,))
+    session = None
+    if AIOHTTP_AVAILABLE:
+        session = aiohttp.ClientSession(
+            headers=HEADERS,
+            timeout=aiohttp.ClientTimeout(total=REQUEST_TIMEOUT),
+            connector=aiohttp.TCPConnector(limit=concurrency),
+        )
+
+    async def worker():
+        nonlocal pages, in_flight
+        while True:
+            url = await frontier.get()
+            in_flight += 1
+            try:
+                metrics.set_queue_depth(frontier.qsize() + in_flight)
+                html, error = await fetch_page_async(session, url, metrics)
+                if error:
+                    errors.append(error)
+                    continue
+                if pool:
+                    data, next_url, seconds = await loop.run_in_executor(pool, _parse_page_timed, html, url)
+                else:
+                    data, next_url, seconds = _parse_page_timed(html, url, schema)
+                metrics.record_parse(seconds, len(data))
+                pages += 1
+                if data:
+                    on_records(data)
+                schedule(next_url)
+            except Exception as err:
+                metrics.record_error(err)
+                errors.append(f"Failed to process {url}: {err}")
+            finally:
+                in_flight -= 1
+                metrics.set_queue_depth(frontier.qsize() + in_flight)
+                frontier.task_done()
+
+    workers = [asyncio.create_task(worker()) for _ in range(max(1, concurrency))]
+    try:
+        await frontier.join()
+    finally:
+        for task in workers:
+            task.cancel()
+        await asyncio.gather(*workers, return_exceptions=True)
+        if session:
+            await session.close()
+        if pool:
+            pool.shutdown()
+    return pages, errors
+
+class CrawlMetrics:
+    """
+    Thread-safe crawl counters updated by the worker.
+
+    Readers only ever see consistent copies via snapshot(), so the GUI and
+    the JSON-lines reporter can sample it at their own fixed rate.
+    """
+    LATENCY_WINDOW = 1000
+
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.reset()
+
+    def reset(self):
+        """Clears all counters and restarts the clock."""
+        with self.lock:
+            self.started = time.monotonic()
+            self.pages = 0
+            self.records = 0
+            self.bytes = 0
+            self.parse_seconds = 0.0
+            self.parsed_pages = 0
+            self.queue_depth = 0
+            self.errors = Counter()
+            self.latencies = deque(maxlen=self.LATENCY_WINDOW)
+
+    def record_fetch(self, latency, size):
+        """Records a successful fetch of `size` bytes that took `latency` seconds."""
+        with self.lock:
+            self.pages += 1
+            self.bytes += size
+            self.latencies.append(latency)
+
+    def record_parse(self, seconds, records):
+        """Records the time taken to parse one page and how many records it gave."""
+        with self.lock:
+            self.parse_seconds += seconds
+            self.parsed_pages += 1
+            self.records += records
+
+    def record_error(self, error):
+        """Counts an error by its exception class name."""
+        with self.lock:
+            self.errors[type(error).__name__ if isinstance(error, BaseException) else str(error)] += 1
+
+    def set_queue_depth(self, depth):
+        """Updates the number of pages waiting to be fetched or parsed."""
+        with self.lock:
+            self.queue_depth = depth
+
+    def snapshot(self):
+        """Returns a JSON-serializable copy of the current metrics."""
+        with self.lock:
+            elapsed = max(time.monotonic() - self.started, 1e-9)
+            latencies = list(self.latencies)
+            return {
+                'timestamp': time.time(),
+                'elapsed_s': round(elapsed, 3),
+                'pages': self.pages,
+                'records': self.records,
+                'pages_per_s': round(self.pages / elapsed, 3),
+                'bytes': self.bytes,
+                'avg_parse_ms': round(1000 * self.parse_seconds / self.parsed_pages, 3) if self.parsed_pages else 0.0,
+                'queue_depth': self.queue_depth,
+                'errors': dict(self.errors),
+                'p95_fetch_ms': round(1000 * percentile(latencies, 95), 3),
+            }
+
+class MetricsReporter(threading.Thread):
+    """Writes a CrawlMetrics snapshot as one JSON line every `interval` seconds."""
+
+    def __init__(self, metrics, stream, interval=1.0):
+        super().__init__(daemon=True)
+        self.metrics = metrics
+        self.stream = stream
+        self.interval = interval
+        self.stopped = threading.Event()
+
+    def run(self):
+        while not self.stopped.wait(self.interval):
+            self.emit()
+
+    def emit(self):
+        """Writes the current snapshot immediately."""
+        self.stream.write(json.dumps(self.metrics.snapshot()) + '\n')
+        self.stream.flush()
+
+    def stop(self):
+        """Stops the reporter and writes a final snapshot."""
+        self.stopped.set()
+        self.join()
+        self.emit()
+
+class VirtualTreeview(ttk.Frame):
+    """
+    A Treeview that only materializes the rows currently visible.
+
+    All records live in a plain list; a fixed pool of Treeview items is
+    re-filled from that list whenever the view scrolls, so appending tens of
+    thousands of records costs the same as appending a screenful.
+    """
+    DEFAULT_ROW_HEIGHT = 20
+    DEFAULT_HEADER_HEIGHT = 25
+
+    def __init__(self, parent, columns, **kwargs):
+        super().__init__(parent, **kwargs)
+        self.columns = columns
+        self.records = []
+        self.offset = 0
+        self.visible_rows = 1
+
+        self.tree = ttk.Treeview(self, columns=columns, show='headings', selectmode='browse')
+        self.set_columns(columns)
+        self.scrollbar = ttk.Scrollbar(self, orient=tk.VERTICAL, command=self.yview)
+
+        self.scrollbar.pack(side=tk.RIGHT, fill=tk.Y)
+        self.tree.pack(side=tk.LEFT, fill=tk.BOTH, expand=True)
+
+        self.tree.bind('<Configure>', self._on_resize)
+        self.tree.bind('<MouseWheel>', self._on_mousewheel)
+        self.tree.bind('<Button-4>', lambda e: self.scroll_by(-3))
+        self.tree.bind('<Button-5>', lambda e: self.scroll_by(3))
+        self.tree.bind('<Prior>', lambda e: self.scroll_by(-self.visible_rows))
+        self.tree.bind('<Next>', lambda e: self.scroll_by(self.visible_rows))
+
+    def set_columns(self, columns):
+        """Replaces the displayed columns, e.g. after loading a different schema."""
+        self.columns = list(columns)
+        self.tree.configure(columns=self.columns)
+        for col in self.columns:
+            self.tree.heading(col, text=col)
+
+    def append(self, records):
+        """Adds records to the view, re-rendering only if they land on screen."""
+        start = len(self.records)
+        self.records.extend(records)
+        if start < self.offset + self.visible_rows:
+            self.render()
+        else:
+            self._update_scrollbar()
+
+    def clear(self):
+        """Removes all records from the view."""
+        self.records = []
+        self.offset = 0
+        self.render()
+
+    def scroll_by(self, rows):
+        """Scrolls the window by a number of rows."""
+        self._scroll_to(self.offset + rows)
+
+    def yview(self, *args):
+        """Scrollbar command handler implementing the 'moveto' and 'scroll' protocol."""
+        if not args:
+            return
+        if args[0] == 'moveto':
+            self._scroll_to(int(float(args[1]) * len(self.records)))
+        elif args[0] == 'scroll':
+            amount = int(args[1])
+            if args[2] == 'pages':
+                amount *= self.visible_rows
+            self.scroll_by(amount)
+
+    def render(self):
+        """Fills the visible item pool from the current window of records."""
+        window = self.records[self.offset:self.offset + self.visible_rows]
+        items = self.tree.get_children()
+
+        for iid in items[len(window):]:
+            self.tree.delete(iid)
+        for i, record in enumerate(window):
+            values = [record.get(col, '') for col in self.columns]
+            if i < len(items):
+                self.tree.item(items[i], values=values)
+            else:
+                self.tree.insert('', tk.END, values=values)
+        self._update_scrollbar()
+
+    def _scroll_to(self, offset):
+        max_offset = max(0, len(self.records) - self.visible_rows)
+        offset = min(max(0, offset), max_offset)
+        if offset != self.offset:
+            self.offset = offset
+            self.render()
+
+    def _update_scrollbar(self):
+        total = len(self.records)
+        if total <= self.visible_rows:
+            self.scrollbar.set(0.0, 1.0)
+        else:
+            self.scrollbar.set(self.offset / total, (self.offset + self.visible_rows) / total)
+
+    def _on_resize(self, event):
+        items = self.tree.get_children()
+        bbox = self.tree.bbox(items[0]) if items else None
+        if bbox:
+            header_height, row_height = bbox[1], bbox[3]
+        else:
+            header_height, row_height = self.DEFAULT_HEADER_HEIGHT, self.DEFAULT_ROW_HEIGHT
+        visible_rows = max(1, (event.height - header_height) // max(1, row_height))
+        if visible_rows != self.visible_rows:
+            self.visible_rows = visible_rows
+            self._scroll_to(self.offset)
+            self.render()
+
+    def _on_mousewheel(self, event):
+        self.scroll_by(-3 if event.delta > 0 else 3)
+        return 'break'
 
 class ScraperApp(tk.Tk):
     """A GUI application for scraping web data."""
+    POLL_INTERVAL_MS = 100
+    METRICS_INTERVAL_MS = 500
+    MAX_BATCHES_PER_POLL = 50
+
     def __init__(self):
         super().__init__()
         self.title("Web Scraper")
         self.geometry("800x600")
 
         self.scraped_data = []
+        self.result_queue = queue.Queue()
+        self.metrics = CrawlMetrics()
+        self.schema = DEFAULT_SCHEMA
+        self.scraping = False
         self.create_widgets()
 
     def create_widgets(self):
@@ -84,20 +521,36 @@ class ScraperApp(tk.Tk):
         self.url_entry.insert(0, "http://quotes.toscrape.com/")
         self.url_entry.pack(side=tk.LEFT, fill=tk.X, expand=True)
 
+        ttk.Label(url_frame, text="Max pages:").pack(side=tk.LEFT, padx=(10, 5))
+        self.max_pages_var = tk.IntVar(value=10)
+        ttk.Spinbox(url_frame, from_=1, to=10000, textvariable=self.max_pages_var, width=6).pack(side=tk.LEFT)
+
         self.scrape_button = ttk.Button(url_frame, text="Scrape", command=self.start_scraping_thread)
         self.scrape_button.pack(side=tk.LEFT, padx=(10, 0))
 
+        self.schema_button = ttk.Button(url_frame, text="Load Schema...", command=self.load_schema_file)
+        self.schema_button.pack(side=tk.LEFT, padx=(5, 0))
+
         # --- Results Frame ---
         results_frame = ttk.LabelFrame(main_frame, text="Scraped Data", padding="10")
         results_frame.pack(fill=tk.BOTH, expand=True, pady=5)
 
-        columns = ('Text', 'Author', 'Tags')
-        self.tree = ttk.Treeview(results_frame, columns=columns, show='headings')
+        self.results_view = VirtualTreeview(results_frame, self.schema.field_names)
+        self.results_view.pack(fill=tk.BOTH, expand=True)
 
-        for col in columns:
-            self.tree.heading(col, text=col)
-        
-        self.tree.pack(fill=tk.BOTH, expand=True)
+        # --- Telemetry Frame ---
+        telemetry_frame = ttk.LabelFrame(main_frame, text="Crawl Telemetry", padding="10")
+        telemetry_frame.pack(fill=tk.X, pady=5)
+
+        self.metric_vars = {}
+        metric_labels = [
+            ('pages_per_s', "Pages/s"), ('bytes', "Bytes"), ('avg_parse_ms', "Parse ms/page"),
+            ('queue_depth', "Queue depth"), ('p95_fetch_ms', "p95 fetch ms"), ('errors', "Errors"),
+        ]
+        for column, (key, label) in enumerate(metric_labels):
+            ttk.Label(telemetry_frame, text=label).grid(row=0, column=column, padx=8, sticky=tk.W)
+            self.metric_vars[key] = tk.StringVar(value="-")
+            ttk.Label(telemetry_frame, textvariable=self.metric_vars[key]).grid(row=1, column=column, padx=8, sticky=tk.W)
 
         # --- Actions & Status Frame ---
         action_frame = ttk.Frame(main_frame)
@@ -121,51 +574,129 @@ class ScraperApp(tk.Tk):
         self.status_label.config(text=f"Scraping {url}...")
         
         # Clear previous results
-        for i in self.tree.get_children():
-            self.tree.delete(i)
-        
-        self.scraped_data = []
+        self.results_view.clear()
+        self.scraped_data = self.results_view.records
+        self.result_queue = queue.Queue()
+
+        try:
+            max_pages = max(1, int(self.max_pages_var.get()))
+        except (tk.TclError, ValueError):
+            max_pages = 1
 
         # Run the scraping logic in a background thread
-        thread = threading.Thread(target=self.scrape_worker, args=(url,))
+        self.metrics.reset()
+        self.scraping = True
+        thread = threading.Thread(target=self.scrape_worker, args=(url, max_pages, self.result_queue))
         thread.daemon = True
         thread.start()
-
-    def scrape_worker(self, url):
-        """Worker function that performs the scraping."""
-        html, error = fetch_page(url)
+        self.after(self.POLL_INTERVAL_MS, self.poll_results)
+        self.after(self.METRICS_INTERVAL_MS, self.refresh_metrics)
+
+    def scrape_worker(self, url, max_pages, result_queue):
+        """
+        Worker function that performs the scraping.
+
+        Follows 'Next' links page by page and pushes each page's records onto
+        the result queue as soon as they are parsed. The worker never touches
+        Tk widgets; the UI thread drains the queue in poll_results().
+        """
+        pages, error = crawl(
+            [url], max_pages, self.metrics,
+            on_records=lambda data: result_queue.put(('records', data)),
+            on_progress=lambda done: result_queue.put(('progress', f"Scraped {done} page(s)...")),
+            schema=self.schema,
+        )
         if error:
-            self.update_ui_with_error(error)
-            return
+            result_queue.put(('error', error))
+        else:
+            result_queue.put(('done', pages))
+
+    def poll_results(self):
+        """Drains pending worker messages on the UI thread and reschedules itself."""
+        finished = False
+        for _ in range(self.MAX_BATCHES_PER_POLL):
+            try:
+                kind, payload = self.result_queue.get_nowait()
+            except queue.Empty:
+                break
+
+            if kind == 'records':
+                self.update_ui_with_results(payload)
+            elif kind == 'progress':
+                self.status_label.config(text=f"{payload} {len(self.scraped_data)} items so far.")
+            elif kind == 'error':
+                self.update_ui_with_error(payload)
+                finished = True
+                break
+            elif kind == 'done':
+                self.finish_scraping(payload)
+                finished = True
+                break
+
+        if finished:
+            self.scraping = False
+            self.refresh_metrics()
+        else:
+            self.after(self.POLL_INTERVAL_MS, self.poll_results)
+
+    def refresh_metrics(self):
+        """Samples the worker's metrics at a fixed rate while a crawl is running."""
+        snapshot = self.metrics.snapshot()
+        for key, var in self.metric_vars.items():
+            value = snapshot[key]
+            if key == 'errors':
+                value = ', '.join(f"{name}: {count}" for name, count in value.items()) or "0"
+            elif key == 'bytes':
+                value = f"{value / 1024:.1f} KB"
+            var.set(str(value))
+        if self.scraping:
+            self.after(self.METRICS_INTERVAL_MS, self.refresh_metrics)
+
+    def update_ui_with_results(self, records):
+        """Appends a batch of scraped records to the virtualized view."""
+        self.results_view.append(records)
+        self.save_button.config(state=tk.NORMAL)
 
-        data = parse_quotes(html)
-        if not data:
+    def finish_scraping(self, pages):
+        """Re-enables the controls once the worker has finished."""
+        if self.scraped_data:
+            self.status_label.config(text=f"Success! Found {len(self.scraped_data)} items on {pages} page(s).")
+        else:
             self.update_ui_with_error("No quotes found. The website structure may have changed.")
             return
-
-        self.scraped_data = data
-        self.after(0, self.update_ui_with_results)
-
-    def update_ui_with_results(self):
-        """Updates the Treeview with the scraped data from the main UI thread."""
-        if not self.scraped_data:
-            return
-
-        for item in self.scraped_data:
-            self.tree.insert('', tk.END, values=[item['Text'], item['Author'], item['Tags']])
-        
-        self.status_label.config(text=f"Success! Found {len(self.scraped_data)} items.")
-        self.save_button.config(state=tk.NORMAL)
         self.scrape_button.config(state=tk.NORMAL)
 
     def update_ui_with_error(self, message):
         """Displays an error message in the UI."""
-        self.after(0, lambda: messagebox.showerror("Scraping Error", message))
+        messagebox.showerror("Scraping Error", message)
         self.status_label.config(text=f"Error: {message}")
         self.scrape_button.config(state=tk.NORMAL)
+        if self.scraped_data:
+            self.save_button.config(state=tk.NORMAL)
+
+    def load_schema_file(self):
+        """Lets the user pick a JSON/YAML extraction schema for the next scrape."""
+        filepath = filedialog.askopenfilename(
+            filetypes=[("Schema files", "*.json *.yaml *.yml"), ("All files", "*.*")],
+            title="Load Extraction Schema"
+        )
+        if not filepath:
+            return
+
+        try:
+            self.schema = load_schema(filepath)
+        except (OSError, ValueError) as e:
+            messagebox.showerror("Schema Error", f"Could not load schema: {e}")
+            return
+
+        self.results_view.clear()
+        self.scraped_data = self.results_view.records
+        self.results_view.set_columns(self.schema.field_names)
+        self.save_button.config(state=tk.DISABLED)
+        self.status_label.config(text=f"Using schema '{self.schema.name}' ({os.path.basename(filepath)})")
 
     def save_to_csv(self):
-        """Saves the extracted data to a CSV file."""
+        """Merges the extracted data into a CSV file; existing rows are only touched if they changed."""
         if not self.scraped_data:
             messagebox.showinfo("No Data", "There is no data to save.")
             return
@@ -173,23 +704,107 @@ class ScraperApp(tk.Tk):
         filepath = filedialog.asksaveasfilename(
             defaultextension=".csv",
             filetypes=[("CSV files", "*.csv"), ("All files", "*.*")],
-            title="Save Scraped Data"
+            title="Save Scraped Data",
+            confirmoverwrite=False  # An existing file is merged into, not replaced
         )
 
         if not filepath:
             return # User cancelled the save dialog
 
         try:
-            with open(filepath, 'w', newline='', encoding='utf-8') as csvfile:
-                fieldnames = self.scraped_data[0].keys()
-                writer = csv.DictWriter(csvfile, fieldnames=fieldnames)
-                writer.writeheader()
-                writer.writerows(self.scraped_data)
-            messagebox.showinfo("Success", f"Data successfully saved to\n{os.path.abspath(filepath)}")
-            self.status_label.config(text=f"Data saved to {os.path.basename(filepath)}")
-        except IOError as e:
+            delta = upsert_csv(self.scraped_data, filepath, key_fields=self.schema.key_fields)
+        except (IOError, KeyError) as e:
             messagebox.showerror("Save Error", f"Could not save file: {e}")
+            return
+        summary = (f"{len(delta['inserted'])} new, {len(delta['updated'])} changed, "
+                   f"{delta['unchanged']} unchanged")
+        messagebox.showinfo("Success", f"Data merged into\n{os.path.abspath(filepath)}\n\n{summary}")
+        self.status_label.config(text=f"Data saved to {os.path.basename(filepath)}: {summary}")
+
+def run_headless(urls, max_pages, output, metrics_path=None, metrics_interval=1.0,
+                 concurrency=8, parse_workers=None, schema=None):
+    """
+    Crawls without a GUI, merging records into a CSV file.
+
+    Args:
+        urls (list): Seed URLs.
+        max_pages (int): Maximum number of pages to fetch.
+        output (str): CSV file to merge the records into.
+        metrics_path (str): Optional JSON-lines metrics file, '-' for stdout.
+        metrics_interval (float): Seconds between metrics lines.
+        concurrency (int): Maximum number of simultaneous requests.
+        parse_workers (int): Parser processes (None for one per core, 0 to parse inline).
+        schema (CompiledSchema): The extraction schema; defaults to quotes.toscrape.com.
+
+    Returns:
+        int: Process exit code.
+    """
+    schema = schema or DEFAULT_SCHEMA
+    metrics = CrawlMetrics()
+    records = []
+    reporter = None
+    stream = None
+    if metrics_path:
+        stream = sys.stdout if metrics_path == '-' else open(metrics_path, 'a', encoding='utf-8')
+        reporter = MetricsReporter(metrics, stream, metrics_interval)
+        reporter.start()
+
+    try:
+        pages, errors = asyncio.run(crawl_async(
+            urls, max_pages, metrics, on_records=records.extend,
+            concurrency=concurrency, parse_workers=parse_workers, schema=schema,
+        ))
+    finally:
+        if reporter:
+            reporter.stop()
+        if stream and stream is not sys.stdout:
+            stream.close()
+
+    for error in errors:
+        print(f"Error: {error}", file=sys.stderr)
+    if records:
+        delta = upsert_csv(records, output, key_fields=schema.key_fields)
+        print(f"Crawled {pages} page(s): {len(delta['inserted'])} new, "
+              f"{len(delta['updated'])} changed, {delta['unchanged']} unchanged -> {output}",
+              file=sys.stderr)
+    return 1 if errors and not records else 0
+
+def main(argv=None):
+    """Starts the GUI, or crawls headlessly when seed URLs are given."""
+    parser = argparse.ArgumentParser(description="Scrape quotes with a GUI, or headlessly when URLs are given.")
+    parser.add_argument('urls', nargs='*', help="seed URLs to crawl without the GUI")
+    parser.add_argument('--urls-file', help="read additional seed URLs from a file, one per line")
+    parser.add_argument('--max-pages', type=int, default=10, help="maximum pages to fetch (default: 10)")
+    parser.add_argument('--concurrency', type=int, default=8, help="simultaneous requests (default: 8)")
+    parser.add_argument('--parse-workers', type=int, default=None,
+                        help="HTML parser processes (default: one per core, 0 parses inline)")
+    parser.add_argument('--schema', help="JSON/YAML extraction schema (default: quotes.toscrape.com)")
+    parser.add_argument('--output', default='quotes.csv', help="CSV file to merge results into (default: quotes.csv)")
+    parser.add_argument('--metrics', help="write JSON-lines crawl metrics to this file ('-' for stdout)")
+    parser.add_argument('--metrics-interval', type=float, default=1.0, help="seconds between metrics lines")
+    args = parser.parse_args(argv)
+
+    urls = list(args.urls)
+    if args.urls_file:
+        with open(args.urls_file, 'r', encoding='utf-8') as f:
+            urls.extend(line.strip() for line in f if line.strip() and not line.startswith('#'))
+
+    schema = None
+    if args.schema:
+        try:
+            schema = load_schema(args.schema)
+        except (OSError, ValueError) as e:
+            parser.error(f"could not load schema: {e}")
+
+    if not urls:
+        app = ScraperApp()
+        if schema:
+            app.schema = schema
+            app.results_view.set_columns(schema.field_names)
+        app.mainloop()
+        return 0
+    return run_headless(urls, args.max_pages, args.output, args.metrics, args.metrics_interval,
+                        args.concurrency, args.parse_workers, schema)
 
 if __name__ == "__main__":
-    app = ScraperApp()
-    app.mainloop()
+    sys.exit(main())
@@ -1,5 +1,12 @@
 import requests
 import os
+from weather_cache import WeatherCache, endpoint_name
+
+# Point at weather_stub_server.py (e.g. http://127.0.0.1:8765/v1) to work offline
+API_BASE_URL = os.environ.get("WEATHER_API_BASE_URL", "http://api.weatherapi.com/v1")
+
+# Repeat lookups of a city within the TTL are answered from here without an API call
+weather_cache = WeatherCache()
 
 def get_weather_data(city, api_key):
     """
@@ -11,10 +18,10 @@ def get_weather_data(city, api_key):
 
     Returns:
         dict: A dictionary containing the weather data in JSON format,
-              or None if an error occurs.
+              or None if an error occurs. Recent responses come from the cache.
     """
     # API endpoint for current weather data
-    base_url = "http://api.weatherapi.com/v1/current.json"
+    base_url = f"{API_BASE_URL}/current.json"
     
     # Parameters for the API request
     params = {
@@ -22,6 +29,11 @@ def get_weather_data(city, api_key):
         'q': city
     }
 
+    endpoint = endpoint_name(base_url)
+    cached = weather_cache.get(endpoint, city, params, API_BASE_URL)
+    if cached is not None:
+        return cached
+
     try:
         # Make the GET request to the API
         response = requests.get(base_url, params=params)
@@ -30,7 +42,9 @@ def get_weather_data(city, api_key):
         response.raise_for_status()
         
         # Return the JSON response as a Python dictionary
-        return response.json()
+        data = response.json()
+        weather_cache.put(endpoint, city, data, params, API_BASE_URL)
+        return data
 
     except requests.exceptions.HTTPError as http_err:
         # WeatherAPI often returns error details in the JSON body even for HTTP errors
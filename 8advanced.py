@@ -8,6 +8,25 @@ import threading
 from datetime import datetime
 import json
 from io import BytesIO
+from concurrent.futures import ThreadPoolExecutor
+from icon_cache import IconDiskCache, PhotoImageLRU
+from weather_cache import WeatherCache
+from forecast_panel import ForecastPanel, icon_url, set_text
+from weather_dashboard import WeatherDashboard, CityFetcher, read_cities, API_BASE_URL, API_KEY
+
+REQUEST_TIMEOUT = 10
+FORECAST_DAYS = 3
+# Seconds a cached response stays valid, per WeatherAPI endpoint
+CACHE_TTLS = {'current': 10 * 60, 'forecast': 30 * 60}
+
+
+class WeatherFetchError(Exception):
+    """A failed weather lookup, with a title and message ready for an error dialog."""
+
+    def __init__(self, title, message):
+        super().__init__(message)
+        self.title = title
+        self.message = message
 
 class WeatherApp:
     def __init__(self, root):
@@ -17,7 +36,7 @@ class WeatherApp:
         self.root.resizable(False, False)
 
         # --- API Key ---
-        self.api_key = "e1be24f806884bf1ad664228252206"
+        self.api_key = API_KEY
         
         # --- Style ---
         self.style = ttk.Style(self.root)
@@ -25,6 +44,16 @@ class WeatherApp:
 
         # --- State ---
         self.recent_cities = []
+        self.request_id = 0  # Results of superseded searches are dropped
+
+        # --- Background fetching ---
+        # Network I/O runs on these threads; results come back through root.after()
+        self.session = requests.Session()
+        self.executor = ThreadPoolExecutor(max_workers=6, thread_name_prefix="weather")
+        self.icon_files = IconDiskCache()
+        self.icon_photos = PhotoImageLRU()
+        self.weather_cache = WeatherCache(ttls=CACHE_TTLS)
+        self.root.protocol("WM_DELETE_WINDOW", self.on_close)
 
         # --- Main Layout ---
         main_frame = ttk.Frame(self.root, padding="10")
@@ -44,7 +73,8 @@ class WeatherApp:
         self.city_entry.bind("<Return>", self.handle_search)
         
         search_button = ttk.Button(input_frame, text="Get Weather", command=self.handle_search)
-        search_button.pack(anchor="w")
+        search_button.pack(side="left")
+        ttk.Button(input_frame, text="Dashboard...", command=self.open_dashboard_dialog).pack(side="left", padx=5)
 
         history_frame = ttk.LabelFrame(top_frame, text="Recent Searches")
         history_frame.pack(side="right", fill="both", expand=True)
@@ -72,8 +102,9 @@ class WeatherApp:
         self.current_details_label.grid(row=1, column=1, sticky="w")
 
         # Forecast Frame
-        self.forecast_frame = ttk.LabelFrame(display_frame, text="3-Day Forecast", padding="10")
-        self.forecast_frame.pack(fill="both", expand=True)
+        self.forecast_panel = ForecastPanel(display_frame, base_url=API_BASE_URL, padding="10")
+        self.forecast_panel.pack(fill="both", expand=True)
+        self.current_weather_icon.icon_url = None
 
     def handle_search(self, event=None):
         city = self.city_var.get().strip()
@@ -91,27 +122,53 @@ class WeatherApp:
         self.fetch_and_display_weather(city)
         
     def fetch_weather_data(self, city):
-        base_url = "http://api.weatherapi.com/v1/forecast.json"
-        params = {'key': self.api_key, 'q': city, 'days': 3}
+        """Fetches the 3-day forecast; runs on a worker thread and raises WeatherFetchError on failure."""
+        base_url = f"{API_BASE_URL}/forecast.json"
+        params = {'key': self.api_key, 'q': city, 'days': FORECAST_DAYS}
         try:
-            response = requests.get(base_url, params=params)
+            response = self.session.get(base_url, params=params, timeout=REQUEST_TIMEOUT)
             response.raise_for_status()
-            return response.json()
+            data = response.json()
+            self.weather_cache.put('forecast', city, data, {'days': FORECAST_DAYS}, API_BASE_URL)
+            return data
         except requests.exceptions.HTTPError:
             try:
                 error_data = response.json()
                 msg = error_data.get('error', {}).get('message', 'Unknown HTTP error')
-                messagebox.showerror("API Error", f"Could not fetch weather data: {msg}")
+                raise WeatherFetchError("API Error", f"Could not fetch weather data: {msg}")
             except ValueError:
-                messagebox.showerror("API Error", "An unrecoverable HTTP error occurred.")
-            return None
+                raise WeatherFetchError("API Error", "An unrecoverable HTTP error occurred.")
         except requests.exceptions.RequestException as e:
-            messagebox.showerror("Network Error", f"A network error occurred: {e}")
-            return None
+            raise WeatherFetchError("Network Error", f"A network error occurred: {e}")
 
     def fetch_and_display_weather(self, city):
-        weather_data = self.fetch_weather_data(city)
-        if not weather_data:
+        """Starts fetching a city's weather in the background; the UI stays responsive."""
+        self.request_id += 1
+        request_id = self.request_id
+        cached = self.weather_cache.get('forecast', city, {'days': FORECAST_DAYS}, API_BASE_URL)
+        if cached is not None:
+            self.display_weather(request_id, city, cached)  # Fetched recently: no API call
+            return
+        self.current_weather_label.config(text=f"Loading weather for {city}...")
+        self.executor.submit(self._fetch_in_background, request_id, city)
+
+    def _fetch_in_background(self, request_id, city):
+        try:
+            weather_data = self.fetch_weather_data(city)
+        except WeatherFetchError as e:
+            self.root.after(0, self.show_fetch_error, request_id, e)
+            return
+        self.root.after(0, self.display_weather, request_id, city, weather_data)
+
+    def show_fetch_error(self, request_id, error):
+        if request_id != self.request_id:
+            return  # A newer search has started; its result is what matters
+        self.current_weather_label.config(text="Search for a city to begin.")
+        messagebox.showerror(error.title, error.message)
+
+    def display_weather(self, request_id, city, weather_data):
+        """Renders a fetched forecast on the Tk thread and starts loading its icons."""
+        if request_id != self.request_id:
             return
 
         # --- Update Current Weather ---
@@ -122,36 +179,30 @@ class WeatherApp:
         condition_text = f"{current['condition']['text']}"
         temp_text = f"{current['temp_c']}°C / {current['temp_f']}°F"
         
-        self.current_weather_label.config(text=f"{loc_text}\n{condition_text}\n{temp_text}")
+        set_text(self.current_weather_label, f"{loc_text}\n{condition_text}\n{temp_text}")
         details = (f"Humidity: {current['humidity']}%    |    "
                    f"Wind: {current['wind_kph']} kph    |    "
                    f"Feels like: {current['feelslike_c']}°C")
-        self.current_details_label.config(text=details)
-
-        icon_url = "https:" + current['condition']['icon']
-        self.update_image_from_url(self.current_weather_icon, icon_url)
+        set_text(self.current_details_label, details)
 
         # --- Update Forecast ---
-        for widget in self.forecast_frame.winfo_children():
-            widget.destroy()
-            
-        forecast_days = weather_data['forecast']['forecastday']
-        for i, day_data in enumerate(forecast_days):
-            day_frame = ttk.Frame(self.forecast_frame)
-            day_frame.grid(row=0, column=i, padx=10, pady=5, sticky="ns")
-            
-            date = day_data['date']
-            day = day_data['day']
-            
-            ttk.Label(day_frame, text=date, font=("Helvetica", 10, "bold")).pack()
-            
-            icon = ttk.Label(day_frame)
-            icon.pack()
-            self.update_image_from_url(icon, "https:" + day['condition']['icon'])
-            
-            ttk.Label(day_frame, text=day['condition']['text']).pack()
-            temp_range = f"H: {day['maxtemp_c']}°C\nL: {day['mintemp_c']}°C"
-            ttk.Label(day_frame, text=temp_range).pack()
+        # Widgets are reused; only changed labels are touched. The panel returns
+        # the labels whose icon changed, keyed by URL so each icon is fetched once
+        icon_targets = self.forecast_panel.update_days(weather_data['forecast']['forecastday'])
+        current_icon_url = icon_url(current['condition']['icon'], API_BASE_URL)
+        if current_icon_url != self.current_weather_icon.icon_url:
+            self.current_weather_icon.icon_url = current_icon_url
+            icon_targets.setdefault(current_icon_url, []).append(self.current_weather_icon)
+
+        # All icons download concurrently, so they appear after the slowest one, not the sum
+        for url, labels in icon_targets.items():
+            photo = self.icon_photos.get(url)
+            if photo is not None:
+                self.set_icon(labels, photo)  # Already decoded this run: no request, no decode
+                continue
+            future = self.executor.submit(self.load_icon, url)
+            future.add_done_callback(
+                lambda f, url=url, labels=labels: self.root.after(0, self.apply_icon, url, labels, f))
 
         # --- Update History ---
         city_title = city.title()
@@ -162,21 +213,76 @@ class WeatherApp:
                 self.recent_cities.pop()
                 self.history_listbox.delete(tk.END)
 
-    def update_image_from_url(self, label, url):
-        try:
-            response = requests.get(url, stream=True)
+    def load_icon(self, url):
+        """Reads an icon from the disk cache or downloads it, then decodes it; runs on a worker thread."""
+        data = self.icon_files.get(url)
+        if data is None:
+            response = self.session.get(url, timeout=REQUEST_TIMEOUT)
             response.raise_for_status()
-            img_data = response.content
-            img = Image.open(BytesIO(img_data))
+            data = response.content
+            self.icon_files.put(url, data)
+        img = Image.open(BytesIO(data))
+        img.load()
+        return url, img
+
+    def apply_icon(self, url, labels, future):
+        """Shows a loaded icon; PhotoImage must be created on the Tk thread."""
+        try:
+            url, img = future.result()
+        except Exception as e:
+            print(f"Failed to load image: {e}")
+            # Forget the URL so the next forecast with this icon tries to load it again
+            for label in labels:
+                if label.icon_url == url:
+                    label.icon_url = None
+            return
+        # A parallel search may already have decoded the same icon
+        photo = self.icon_photos.get(url)
+        if photo is None:
             photo = ImageTk.PhotoImage(img)
-            
+            self.icon_photos.put(url, photo)
+        # Skip labels that a newer search has pointed at a different icon
+        self.set_icon([label for label in labels if label.icon_url == url], photo)
+
+    def set_icon(self, labels, photo):
+        for label in labels:
             label.config(image=photo)
             label.image = photo
-        except Exception as e:
-            print(f"Failed to load image: {e}")
-            pass
+
+    def open_dashboard_dialog(self):
+        """Asks for a list of cities and opens the multi-city dashboard."""
+        dialog = tk.Toplevel(self.root)
+        dialog.title("Multi-City Dashboard")
+        dialog.geometry("360x320")
+        dialog.transient(self.root)
+
+        ttk.Label(dialog, text="Cities (one per line or comma separated):").pack(anchor="w", padx=10, pady=(10, 0))
+        text = tk.Text(dialog, height=12)
+        text.pack(fill="both", expand=True, padx=10, pady=5)
+        text.insert("1.0", "\n".join(self.recent_cities))
+
+        def open_dashboard():
+            cities = read_cities(text.get("1.0", tk.END).splitlines())
+            if not cities:
+                messagebox.showwarning("Input Error", "Please enter at least one city.", parent=dialog)
+                return
+            dialog.destroy()
+            WeatherDashboard(self.root, cities, CityFetcher(self.api_key, cache=self.weather_cache))
+
+        ttk.Button(dialog, text="Open Dashboard", command=open_dashboard).pack(pady=(0, 10))
+
+    def on_close(self):
+        # Don't wait here: running workers call root.after, which blocks until the Tk thread is free
+        self.executor.shutdown(wait=False, cancel_futures=True)
+        self.root.destroy()
+
+    def close(self):
+        """Waits for running fetches, which write to the cache, then closes it; call after mainloop returns."""
+        self.executor.shutdown(wait=True, cancel_futures=True)
+        self.weather_cache.close()
 
 if __name__ == "__main__":
     root = tk.Tk()
     app = WeatherApp(root)
     root.mainloop()
+    app.close()
@@ -1,25 +1,16 @@
-import requests
-import re
+import argparse
+import sys
+from shortener_services import ShortURLCache, SERVICES, ANY_SERVICE
+from async_shortener import AsyncShortener
+from url_validation import is_valid_url, validate_many
 
-def is_valid_url(url):
-    """
-    Validates the URL format using a regular expression.
-    Checks if the URL starts with http:// or https://.
-    """
-    # Regex to check for a valid URL format
-    regex = re.compile(
-        r'^(https?://)'  # http:// or https://
-        r'(?:(?:[A-Z0-9](?:[A-Z0-9-]{0,61}[A-Z0-9])?\.)+[A-Z]{2,6}\.?|'  # domain...
-        r'localhost|'  # localhost...
-        r'\d{1,3}\.\d{1,3}\.\d{1,3}\.\d{1,3})'  # ...or ip
-        r'(?::\d+)?'  # optional port
-        r'(?:/?|[/?]\S+)$', re.IGNORECASE)
-    
-    return re.match(regex, url) is not None
+# Pooled connections and a persistent cache: a URL is only ever sent to a service once.
+# A slow or failing service is abandoned for the next one instead of blocking.
+shortener = AsyncShortener(ShortURLCache())
 
 def shorten_url(long_url):
     """
-    Shortens a long URL using the TinyURL API.
+    Shortens a long URL with TinyURL, falling back to another service if TinyURL is slow or down.
 
     Args:
         long_url (str): The original, long URL.
@@ -27,18 +18,37 @@ def shorten_url(long_url):
     Returns:
         str: The shortened URL, or an error message if something goes wrong.
     """
-    api_url = f"http://tinyurl.com/api-create.php?url={long_url}"
-    
-    try:
-        response = requests.get(api_url)
-        response.raise_for_status()  # Raise an exception for bad status codes
-        return response.text
-    except requests.exceptions.HTTPError as http_err:
-        return f"Error: An HTTP error occurred - {http_err}"
-    except requests.exceptions.RequestException as req_err:
-        return f"Error: A network error occurred - {req_err}"
-    except Exception as err:
-        return f"Error: An unexpected error occurred - {err}"
+    result = shortener.shorten(long_url, "TinyURL")
+    if 'error' in result:
+        return f"Error: {result['error']}"
+    return result['short_url']
+
+def shorten_batch(lines, service="TinyURL"):
+    """
+    Shortens every valid URL in `lines` concurrently and prints one result per line.
+
+    Args:
+        lines (iterable): Text lines, one URL per line.
+        service (str): A service name, or 'Any' to spread the batch over all services.
+
+    Returns:
+        int: The number of URLs that could not be shortened.
+    """
+    urls = [line.strip() for line in lines if line.strip()]
+    verdicts = validate_many(urls)
+    valid = [url for url, ok in zip(urls, verdicts) if ok]
+    for url, ok in zip(urls, verdicts):
+        if not ok:
+            print(f"{url}\tError: Invalid URL format")
+
+    failures = len(urls) - len(valid)
+    for result in shortener.shorten_many(valid, service):
+        if 'error' in result:
+            failures += 1
+            print(f"{result['long_url']}\tError: {result['error']}")
+        else:
+            print(f"{result['long_url']}\t{result['short_url']}")
+    return failures
 
 def main():
     """
@@ -65,4 +75,18 @@ def main():
     print("\nThanks for using the URL shortener!")
 
 if __name__ == "__main__":
+    if len(sys.argv) > 1:
+        # Batch mode: python 9.py urls.txt [--service is.gd]
+        parser = argparse.ArgumentParser(description="Shorten a list of URLs, one per line.")
+        parser.add_argument('file', help="file with one URL per line ('-' for stdin)")
+        parser.add_argument('--service', default="TinyURL", choices=list(SERVICES) + [ANY_SERVICE])
+        args = parser.parse_args()
+        if args.file == '-':
+            failed = shorten_batch(sys.stdin, args.service)
+        else:
+            with open(args.file, 'r', encoding='utf-8') as f:
+                failed = shorten_batch(f, args.service)
+        shortener.close()
+        sys.exit(1 if failed else 0)
     main()
+    shortener.close()
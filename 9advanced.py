@@ -1,7 +1,13 @@
 import tkinter as tk
-from tkinter import ttk, messagebox
-import requests
-import re
+from tkinter import ttk, messagebox, filedialog
+import queue
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from shortener_services import ShortURLCache, SERVICES, ANY_SERVICE, local_store
+from async_shortener import AsyncShortener
+from local_shortener import serve_in_thread
+from url_validation import is_valid_url, validate_many
+from link_analytics import EventLog, AnalyticsStore
 try:
     import pyperclip
     PYPERCLIP_AVAILABLE = True
@@ -19,6 +25,15 @@ class URLShortenerApp:
         self.style = ttk.Style(self.root)
         self.style.theme_use('clam')
 
+        # One pooled async client with per-service timeouts, circuit breakers and
+        # failover, plus a persistent cache of short URLs
+        self.shortener = AsyncShortener(ShortURLCache())
+        self.redirect_server = None
+        # Created/resolved events are appended to a log and rolled up into daily counters on demand
+        self.events = EventLog()
+        self.analytics = AnalyticsStore()
+        self.analytics_executor = ThreadPoolExecutor(max_workers=1, thread_name_prefix="analytics")
+
         # --- Main Frame ---
         main_frame = ttk.Frame(self.root, padding="15")
         main_frame.pack(fill="both", expand=True)
@@ -34,7 +49,7 @@ class URLShortenerApp:
         
         ttk.Label(input_frame, text="Service:").grid(row=1, column=0, padx=5, pady=5, sticky="w")
         self.service_var = tk.StringVar(value="TinyURL")
-        service_menu = ttk.OptionMenu(input_frame, self.service_var, "TinyURL", "TinyURL", "is.gd", "Bitly", command=self.toggle_bitly_token)
+        service_menu = ttk.OptionMenu(input_frame, self.service_var, "TinyURL", *SERVICES, command=self.toggle_bitly_token)
         service_menu.grid(row=1, column=1, padx=5, pady=5, sticky="w")
 
         # Bitly Token (hidden by default)
@@ -45,8 +60,10 @@ class URLShortenerApp:
         # --- Action Frame ---
         action_frame = ttk.Frame(main_frame)
         action_frame.pack(fill="x", pady=10)
-        shorten_button = ttk.Button(action_frame, text="Shorten URL", command=self.handle_shorten)
-        shorten_button.pack()
+        self.shorten_button = ttk.Button(action_frame, text="Shorten URL", command=self.handle_shorten)
+        self.shorten_button.pack(side="left", expand=True, anchor="e", padx=5)
+        ttk.Button(action_frame, text="Batch...", command=self.open_batch_dialog).pack(side="left", padx=5)
+        ttk.Button(action_frame, text="Analytics...", command=self.open_analytics_dialog).pack(side="left", expand=True, anchor="w", padx=5)
 
         # --- Result Frame ---
         result_frame = ttk.LabelFrame(main_frame, text="Result", padding="10")
@@ -76,60 +93,198 @@ class URLShortenerApp:
             return
 
         service = self.service_var.get()
-        short_url = ""
+        if service == "Bitly" and not self.bitly_token_var.get().strip():
+            messagebox.showerror("Missing Token", "Bitly requires an API access token.")
+            return
+        self.shortener.bitly_token = self.bitly_token_var.get().strip()
+        if service == "Local" and not self.start_local_server():
+            return
 
-        try:
-            if service == "TinyURL":
-                short_url = self._shorten_tinyurl(long_url)
-            elif service == "is.gd":
-                short_url = self._shorten_isgd(long_url)
-            elif service == "Bitly":
-                token = self.bitly_token_var.get().strip()
-                if not token:
-                    messagebox.showerror("Missing Token", "Bitly requires an API access token.")
-                    return
-                short_url = self._shorten_bitly(long_url, token)
-            
-            self.short_url_var.set(short_url)
-            self.copy_button.config(state="normal" if PYPERCLIP_AVAILABLE else "disabled")
-
-        except Exception as e:
-            messagebox.showerror("Error", str(e))
+        # Shorten on the background loop so a slow service never freezes the window
+        self.shorten_button.config(state="disabled")
+        self.short_url_var.set("Shortening...")
+        self.check_shorten(self.shortener.submit(long_url, service))
+
+    def check_shorten(self, future):
+        if not future.done():
+            self.root.after(50, self.check_shorten, future)
+            return
+        self.shorten_button.config(state="normal")
+        result = future.result()
+        if 'error' in result:
+            messagebox.showerror("Error", result['error'])
             self.short_url_var.set("Failed to shorten URL.")
             self.copy_button.config(state="disabled")
+            return
+        self.record_created(result)
+        self.short_url_var.set(result['short_url'])
+        self.copy_button.config(state="normal" if PYPERCLIP_AVAILABLE else "disabled")
+
+    def open_batch_dialog(self):
+        """Shortens a pasted or loaded list of URLs concurrently, showing results as they arrive."""
+        dialog = tk.Toplevel(self.root)
+        dialog.title("Batch Shorten")
+        dialog.geometry("700x460")
+        dialog.transient(self.root)
+
+        ttk.Label(dialog, text="URLs (one per line):").pack(anchor="w", padx=10, pady=(10, 0))
+        text = tk.Text(dialog, height=8)
+        text.pack(fill="x", padx=10, pady=5)
+
+        controls = ttk.Frame(dialog)
+        controls.pack(fill="x", padx=10)
+        batch_service_var = tk.StringVar(value=ANY_SERVICE)
+        ttk.Label(controls, text="Service:").pack(side="left")
+        ttk.OptionMenu(controls, batch_service_var, ANY_SERVICE, ANY_SERVICE, *SERVICES).pack(side="left", padx=5)
+
+        def load_file():
+            path = filedialog.askopenfilename(parent=dialog, filetypes=[("Text files", "*.txt"), ("All files", "*.*")])
+            if path:
+                with open(path, 'r', encoding='utf-8') as f:
+                    text.delete("1.0", tk.END)
+                    text.insert("1.0", f.read())
+
+        columns = ("Long URL", "Short URL", "Service", "Status")
+        tree = ttk.Treeview(dialog, columns=columns, show="headings")
+        for col, width in zip(columns, (280, 180, 70, 120)):
+            tree.heading(col, text=col)
+            tree.column(col, width=width)
+        results = queue.SimpleQueue()
+        status_var = tk.StringVar()
+
+        def show_result(result):
+            status = result.get('error') or ("cached" if result['cached'] else "ok")
+            tree.insert('', 'end', values=(result['long_url'], result.get('short_url', ''), result['service'], status))
+
+        def poll(total):
+            if not dialog.winfo_exists():
+                return
+            done = len(tree.get_children())
+            try:
+                while True:
+                    show_result(results.get_nowait())
+                    done += 1
+            except queue.Empty:
+                pass
+            status_var.set(f"{done}/{total} done")
+            if done < total:
+                dialog.after(100, poll, total)
+            else:
+                shorten_button.config(state="normal")
+
+        def start():
+            urls = list(dict.fromkeys(line.strip() for line in text.get("1.0", tk.END).splitlines() if line.strip()))
+            verdicts = validate_many(urls)
+            invalid = [url for url, ok in zip(urls, verdicts) if not ok]
+            valid = [url for url, ok in zip(urls, verdicts) if ok]
+            tree.delete(*tree.get_children())
+            for url in invalid:
+                show_result({'long_url': url, 'service': '', 'error': "Invalid URL", 'cached': False})
+            self.shortener.bitly_token = self.bitly_token_var.get().strip()
+            service = batch_service_var.get()
+            if service == "Local" and not self.start_local_server():
+                return
+            def on_result(result):
+                self.record_created(result)
+                results.put(result)
+
+            # One batch at a time: a second run would share the results queue
+            # and the tree with the first.
+            shorten_button.config(state="disabled")
+            threading.Thread(target=self.shortener.shorten_many, args=(valid, service, on_result),
+                             daemon=True).start()
+            poll(len(urls))
+
+        ttk.Button(controls, text="Load File...", command=load_file).pack(side="left", padx=5)
+        shorten_button = ttk.Button(controls, text="Shorten All", command=start)
+        shorten_button.pack(side="left", padx=5)
+        ttk.Label(controls, textvariable=status_var).pack(side="right")
+        tree.pack(fill="both", expand=True, padx=10, pady=10)
+
+    def start_local_server(self):
+        """Starts the local redirect server once, so "Local" short links resolve."""
+        if self.redirect_server is not None:
+            return True
+        try:
+            store = local_store()
+            self.redirect_server = serve_in_thread(store, on_resolve=self.events.resolve_callback(store.base_url))
+        except OSError as e:
+            messagebox.showerror("Local Shortener",
+                                 f"Could not start the redirect server: {e}\n"
+                                 "Stop the other program using the port or run 'python local_shortener.py serve'.")
+            return False
+        return True
+
+    def record_created(self, result):
+        """Logs a 'created' event for a newly shortened URL; cache hits were logged when first created."""
+        if 'error' not in result and not result['cached']:
+            self.events.record_created(result['short_url'], result['long_url'], result['service'])
+
+    def open_analytics_dialog(self):
+        """Shows the most clicked links and daily totals, read from the rollup tables."""
+        dialog = tk.Toplevel(self.root)
+        dialog.title("Link Analytics")
+        dialog.geometry("700x420")
+        dialog.transient(self.root)
+
+        controls = ttk.Frame(dialog)
+        controls.pack(fill="x", padx=10, pady=(10, 0))
+        days_var = tk.StringVar(value="7")
+        ttk.Label(controls, text="Last days:").pack(side="left")
+        ttk.Spinbox(controls, from_=1, to=365, textvariable=days_var, width=5).pack(side="left", padx=5)
+        status_var = tk.StringVar()
+        ttk.Label(controls, textvariable=status_var).pack(side="right")
+
+        columns = ("Clicks", "Short URL", "Long URL")
+        tree = ttk.Treeview(dialog, columns=columns, show="headings")
+        for col, width in zip(columns, (70, 200, 400)):
+            tree.heading(col, text=col)
+            tree.column(col, width=width, anchor="e" if col == "Clicks" else "w")
+        tree.pack(fill="both", expand=True, padx=10, pady=10)
+
+        def load(days):
+            # Runs on the analytics thread: fold in new events, then query the rollups only
+            self.events.flush()
+            self.analytics.rollup(self.events.path)
+            return self.analytics.top_links(50, days), self.analytics.daily_totals(days)
+
+        def show(future):
+            if not dialog.winfo_exists():
+                return
+            if not future.done():
+                dialog.after(50, show, future)
+                return
+            try:
+                top, daily = future.result()
+            except Exception as e:
+                status_var.set(f"Could not load analytics: {e}")
+                return
+            tree.delete(*tree.get_children())
+            for row in top:
+                tree.insert('', 'end', values=(row['clicks'], row['link'], row['long_url'] or ''))
+            created = sum(day['created'] for day in daily)
+            clicks = sum(day['clicks'] for day in daily)
+            status_var.set(f"{created} links created, {clicks} clicks")
+
+        def refresh():
+            try:
+                days = max(1, int(days_var.get()))
+            except ValueError:
+                days = 7
+            status_var.set("Loading...")
+            show(self.analytics_executor.submit(load, days))
+
+        ttk.Button(controls, text="Refresh", command=refresh).pack(side="left", padx=5)
+        refresh()
 
-    def _shorten_tinyurl(self, url):
-        api_url = f"http://tinyurl.com/api-create.php?url={url}"
-        response = requests.get(api_url)
-        response.raise_for_status()
-        return response.text
-
-    def _shorten_isgd(self, url):
-        api_url = "https://is.gd/create.php"
-        params = {'format': 'json', 'url': url}
-        response = requests.get(api_url, params=params)
-        response.raise_for_status()
-        return response.json()['shorturl']
-
-    def _shorten_bitly(self, url, token):
-        api_url = "https://api-ssl.bitly.com/v4/shorten"
-        headers = {"Authorization": f"Bearer {token}"}
-        data = {"long_url": url}
-        response = requests.post(api_url, headers=headers, json=data)
-        if response.status_code == 403:
-             raise Exception("Bitly API Error: Forbidden. Check your API token and permissions.")
-        response.raise_for_status()
-        return response.json()['link']
+    def close(self):
+        self.shortener.close()
+        self.analytics_executor.shutdown(wait=True)
+        self.events.close()
+        self.analytics.close()
 
     def is_valid_url(self, url):
-        regex = re.compile(
-            r'^(https?://)'
-            r'(?:(?:[A-Z0-9](?:[A-Z0-9-]{0,61}[A-Z0-9])?\.)+[A-Z]{2,6}\.?|'
-            r'localhost|'
-            r'\d{1,3}\.\d{1,3}\.\d{1,3}\.\d{1,3})'
-            r'(?::\d+)?'
-            r'(?:/?|[/?]\S+)$', re.IGNORECASE)
-        return re.match(regex, url) is not None
+        return is_valid_url(url)
 
     def copy_to_clipboard(self):
         url_to_copy = self.short_url_var.get()
@@ -141,3 +296,4 @@ if __name__ == "__main__":
     root = tk.Tk()
     app = URLShortenerApp(root)
     root.mainloop()
+    app.close()
@@ -0,0 +1,482 @@
+"""
+Async URL shortening with one pooled client, circuit breakers and hedged failover.
+
+Every service call goes through a single aiohttp ClientSession, so
+connections to each provider are reused instead of being opened per call.
+On top of that each service gets:
+
+- its own timeout, so a hung provider costs at most that long,
+- a circuit breaker, so after a few consecutive failures the service is
+  skipped outright until a cool-down has passed,
+- hedged failover: if the preferred service has not answered within
+  ``hedge_delay`` seconds (or fails), the next available service is tried
+  in parallel and the first short URL to arrive wins.
+
+Together these bound the worst-case latency of a shortening even while a
+provider is down: roughly ``hedge_delay`` per slow service plus one
+timeout, and only ``hedge_delay`` once the breaker has opened.
+
+AsyncShortener runs its event loop on a background thread and offers
+blocking ``shorten`` / ``shorten_many`` methods, plus ``submit`` returning
+a Future for GUIs. It is the only shortening client; shortener_services
+provides the adapters and the cache it uses.
+Without aiohttp the requests-based adapters are run on worker threads.
+
+Usage:
+    python async_shortener.py https://example.com/a https://example.com/b [--service is.gd]
+    python async_shortener.py bench [--requests 200]
+"""
+
+import argparse
+import asyncio
+import sys
+import threading
+import time
+from concurrent.futures import Future
+from typing import Awaitable, Callable, Dict, Iterable, List, Optional, Tuple
+
+import requests
+
+from percentiles import percentile
+from rate_limit import TokenBucket
+from shortener_services import (SERVICES, PUBLIC_SERVICES, RATE_LIMITS, ANY_SERVICE, ShortenerError, ShortURLCache,
+                                local_store)
+try:
+    import aiohttp
+    AIOHTTP_AVAILABLE = True
+except ImportError:
+    AIOHTTP_AVAILABLE = False
+
+# Seconds before a call to each service is abandoned
+SERVICE_TIMEOUTS = {
+    "TinyURL": 5.0,
+    "is.gd": 5.0,
+    "Bitly": 8.0,
+    "Local": 2.0,
+}
+DEFAULT_TIMEOUT = 5.0
+HEDGE_DELAY = 1.0
+FAILURE_THRESHOLD = 3
+RESET_TIMEOUT = 30.0
+MAX_CONCURRENCY = 16
+
+_ATTEMPT_ERRORS = (requests.exceptions.RequestException, ShortenerError, ValueError, KeyError,
+                   asyncio.TimeoutError, OSError)
+if AIOHTTP_AVAILABLE:
+    _ATTEMPT_ERRORS += (aiohttp.ClientError,)
+
+
+async def shorten_tinyurl_async(session, url, token=None):
+    async with session.get("https://tinyurl.com/api-create.php", params={'url': url}) as response:
+        response.raise_for_status()
+        return (await response.text()).strip()
+
+
+async def shorten_isgd_async(session, url, token=None):
+    async with session.get("https://is.gd/create.php", params={'format': 'json', 'url': url}) as response:
+        response.raise_for_status()
+        data = await response.json(content_type=None)
+    if 'shorturl' not in data:
+        raise ShortenerError(f"is.gd error: {data.get('errormessage', 'unknown error')}")
+    return data['shorturl']
+
+
+async def shorten_bitly_async(session, url, token=None):
+    if not token:
+        raise ShortenerError("Bitly requires an API access token.")
+    async with session.post("https://api-ssl.bitly.com/v4/shorten", headers={"Authorization": f"Bearer {token}"},
+                            json={"long_url": url}) as response:
+        if response.status == 403:
+            raise ShortenerError("Bitly API Error: Forbidden. Check your API token and permissions.")
+        response.raise_for_status()
+        return (await response.json())['link']
+
+
+async def shorten_local_async(session, url, token=None):
+    # A local SQLite insert; kept off the event loop all the same
+    return await asyncio.to_thread(local_store().shorten_url, url)
+
+
+ASYNC_SERVICES: Dict[str, Callable[..., Awaitable[str]]] = {
+    "TinyURL": shorten_tinyurl_async,
+    "is.gd": shorten_isgd_async,
+    "Bitly": shorten_bitly_async,
+    "Local": shorten_local_async,
+}
+
+
+class CircuitBreaker:
+    """
+    Stops calling a service after repeated failures.
+
+    Closed: calls go through. After ``failure_threshold`` consecutive
+    failures the breaker opens and ``allow`` returns False. Once
+    ``reset_timeout`` seconds have passed a single trial call is let
+    through (half-open); its success closes the breaker, its failure opens
+    it again. Only used from the event loop thread, so it needs no lock.
+    """
+
+    CLOSED, OPEN, HALF_OPEN = 'closed', 'open', 'half-open'
+
+    def __init__(self, failure_threshold: int = FAILURE_THRESHOLD, reset_timeout: float = RESET_TIMEOUT):
+        self.failure_threshold = max(1, failure_threshold)
+        self.reset_timeout = reset_timeout
+        self.state = self.CLOSED
+        self.failures = 0
+        self.opened_at = 0.0
+
+    def allow(self) -> bool:
+        if self.state == self.CLOSED:
+            return True
+        if self.state == self.OPEN and time.monotonic() - self.opened_at >= self.reset_timeout:
+            self.state = self.HALF_OPEN
+            return True
+        return False  # Open, or half-open with the trial call still running
+
+    def record_success(self):
+        self.state = self.CLOSED
+        self.failures = 0
+
+    def record_failure(self):
+        self.failures += 1
+        if self.state == self.HALF_OPEN or self.failures >= self.failure_threshold:
+            self.state = self.OPEN
+            self.opened_at = time.monotonic()
+
+    def release(self):
+        """Gives back a half-open trial that was cancelled before it finished."""
+        if self.state == self.HALF_OPEN:
+            self.state = self.OPEN
+
+
+class AsyncShortener:
+    """
+    Shortens URLs over a shared async client with timeouts, circuit breakers and hedging.
+
+    Args:
+        cache: Optional ShortURLCache; None disables caching.
+        bitly_token: Access token used for Bitly.
+        timeouts: Seconds per service, merged over SERVICE_TIMEOUTS.
+        hedge_delay: Seconds to wait for a service before also trying the next one.
+        failover: Whether to fall back to other services at all.
+        rate_limits: Requests per second per service name.
+        max_concurrency: URLs shortened at the same time by ``shorten_many``.
+        failure_threshold: Consecutive failures (or hedged-over slow calls) that open a breaker.
+        reset_timeout: Seconds an open breaker waits before letting a trial call through.
+        adapters: Async adapters per service name, merged over ASYNC_SERVICES.
+        services: Services to fail over between, in order; defaults to the public ones.
+    """
+
+    def __init__(self, cache: Optional[ShortURLCache] = None, bitly_token: str = "",
+                 timeouts: Optional[Dict[str, float]] = None, hedge_delay: float = HEDGE_DELAY,
+                 failover: bool = True, rate_limits: Optional[Dict[str, float]] = None,
+                 max_concurrency: int = MAX_CONCURRENCY, failure_threshold: int = FAILURE_THRESHOLD,
+                 reset_timeout: float = RESET_TIMEOUT, adapters: Optional[Dict[str, Callable]] = None,
+                 services: Optional[List[str]] = None):
+        self.cache = cache
+        self.bitly_token = bitly_token
+        self.timeouts = dict(SERVICE_TIMEOUTS, **(timeouts or {}))
+        self.hedge_delay = hedge_delay
+        self.failover = failover
+        self.max_concurrency = max(1, max_concurrency)
+        limits = dict(RATE_LIMITS, **(rate_limits or {}))
+        self.buckets = {name: TokenBucket(rate, capacity=max(1.0, rate)) for name, rate in limits.items()}
+        self.adapters = dict(ASYNC_SERVICES, **(adapters or {}))
+        self.services = list(services or PUBLIC_SERVICES)
+        self.breakers = {name: CircuitBreaker(failure_threshold, reset_timeout) for name in self.adapters}
+        self.session = None
+        self._requests_session = None
+        self._loop: Optional[asyncio.AbstractEventLoop] = None
+        self._loop_lock = threading.Lock()
+
+    # --- Event loop thread ---
+
+    def _ensure_loop(self) -> asyncio.AbstractEventLoop:
+        with self._loop_lock:
+            if self._loop is None:
+                loop = asyncio.new_event_loop()
+                threading.Thread(target=loop.run_forever, name="async-shortener", daemon=True).start()
+                self._loop = loop
+            return self._loop
+
+    def submit(self, long_url: str, service: str) -> Future:
+        """Starts shortening on the background loop and returns a Future of the result dict."""
+        return asyncio.run_coroutine_threadsafe(self.shorten_async(long_url, service), self._ensure_loop())
+
+    def shorten(self, long_url: str, service: str) -> Dict:
+        """Blocking version of ``shorten_async``."""
+        return self.submit(long_url, service).result()
+
+    def shorten_many(self, long_urls: Iterable[str], service: str = ANY_SERVICE,
+                     on_result: Optional[Callable[[Dict], None]] = None) -> List[Dict]:
+        """Blocking version of ``shorten_many_async``; ``on_result`` runs on the loop thread."""
+        coro = self.shorten_many_async(long_urls, service, on_result)
+        return asyncio.run_coroutine_threadsafe(coro, self._ensure_loop()).result()
+
+    def close(self):
+        if self._loop is None:
+            return
+        asyncio.run_coroutine_threadsafe(self.close_async(), self._loop).result()
+        self._loop.call_soon_threadsafe(self._loop.stop)
+        self._loop = None
+
+    async def close_async(self):
+        """Closes the pooled client; use directly when driving the coroutines from your own loop."""
+        if self.session is not None:
+            await self.session.close()
+            self.session = None
+        if self._requests_session is not None:
+            self._requests_session.close()
+            self._requests_session = None
+
+    # --- Coroutines ---
+
+    def available_services(self) -> List[str]:
+        """Public services that can be used right now (Bitly needs a token)."""
+        return [name for name in self.services if name != "Bitly" or self.bitly_token]
+
+    def _candidates(self, service: str, prefer: Optional[str] = None) -> List[str]:
+        """The preferred service followed by the services to fail over to, in order."""
+        others = self.available_services()
+        if service == ANY_SERVICE:
+            if prefer in others:
+                start = others.index(prefer)
+                return others[start:] + others[:start]
+            return others
+        if not self.failover or service not in others:
+            return [service]  # e.g. "Local", whose links are not interchangeable with public ones
+        return [service] + [name for name in others if name != service]
+
+    def _get_session(self):
+        if not AIOHTTP_AVAILABLE:
+            if self._requests_session is None:
+                self._requests_session = requests.Session()
+            return self._requests_session
+        if self.session is None or self.session.closed:
+            connector = aiohttp.TCPConnector(limit=self.max_concurrency * 2, limit_per_host=self.max_concurrency,
+                                             keepalive_timeout=30)
+            self.session = aiohttp.ClientSession(connector=connector)
+        return self.session
+
+    async def _attempt(self, name: str, long_url: str) -> str:
+        """One call to one service, bounded by its timeout and reported to its breaker."""
+        breaker = self.breakers[name]
+        bucket = self.buckets.get(name)
+        wait = bucket.reserve(1) if bucket else 0
+        if wait:
+            await asyncio.sleep(wait)
+        timeout = self.timeouts.get(name, DEFAULT_TIMEOUT)
+        adapter = self.adapters[name]
+        if not AIOHTTP_AVAILABLE and adapter is ASYNC_SERVICES.get(name):
+            # Fall back to the blocking requests adapter on a worker thread
+            call = asyncio.to_thread(SERVICES[name], self._get_session(), long_url, token=self.bitly_token,
+                                     timeout=timeout)
+        else:
+            call = adapter(self._get_session(), long_url, token=self.bitly_token)
+        try:
+            short_url = await asyncio.wait_for(call, timeout)
+        except asyncio.CancelledError:
+            breaker.release()  # Lost a hedge race; says nothing about the service
+            raise
+        except asyncio.TimeoutError:
+            breaker.record_failure()
+            raise asyncio.TimeoutError(f"no answer within {timeout:g}s") from None
+        except _ATTEMPT_ERRORS:
+            breaker.record_failure()
+            raise
+        breaker.record_success()
+        return short_url
+
+    async def _hedged(self, long_url: str, candidates: List[str]) -> Tuple[Optional[str], Optional[str], List[str]]:
+        """Returns (service, short_url, errors); service is None when every candidate failed."""
+        remaining = list(candidates)
+        running: Dict[asyncio.Task, str] = {}
+        errors: List[str] = []
+        slow = set()
+
+        def launch_next() -> bool:
+            while remaining:
+                name = remaining.pop(0)
+                if name not in self.adapters:
+                    errors.append(f"{name}: unknown service")
+                elif self.breakers[name].allow():
+                    running[asyncio.ensure_future(self._attempt(name, long_url))] = name
+                    return True
+                else:
+                    errors.append(f"{name}: circuit open")
+            return False
+
+        launch_next()
+        try:
+            while running:
+                done, _ = await asyncio.wait(running, timeout=self.hedge_delay if remaining else None,
+                                             return_when=asyncio.FIRST_COMPLETED)
+                if not done:
+                    # Too slow: count it against the service's breaker and hedge with the next one
+                    for task, name in running.items():
+                        if task not in slow:
+                            slow.add(task)
+                            self.breakers[name].record_failure()
+                    launch_next()
+                    continue
+                for task in done:
+                    name = running.pop(task)
+                    try:
+                        return name, task.result(), errors
+                    except _ATTEMPT_ERRORS as e:
+                        errors.append(f"{name}: {str(e) or type(e).__name__}")
+                        launch_next()  # Failed: fail over right away
+            return None, None, errors
+        finally:
+            for task in running:
+                task.cancel()
+
+    def _cached(self, long_url: str, service: str) -> Optional[Tuple[str, str]]:
+        """A cached (service, short_url) that satisfies a request for `service`."""
+        if not self.cache:
+            return None
+        if service == ANY_SERVICE:
+            # Only public services: a "Local" link works only while its redirect server runs
+            return self.cache.get_any(long_url, self._candidates(service))
+        hit = self.cache.get(long_url, service)
+        if hit is None and self.failover:
+            # A failover answer is cached under the service that produced it; any
+            # service this request could have failed over to is just as good
+            hit = self.cache.get_any(long_url, self._candidates(service))
+        return hit
+
+    async def shorten_async(self, long_url: str, service: str, prefer: Optional[str] = None) -> Dict:
+        """
+        Shortens one URL and returns a result dict.
+
+        The result has ``long_url``, ``service`` (the one that answered),
+        ``short_url`` (or ``error``) and ``cached``. Errors are returned,
+        not raised. With ``service=ANY_SERVICE``, ``prefer`` names the
+        available service to try first.
+        """
+        hit = self._cached(long_url, service)
+        if hit:
+            return {'long_url': long_url, 'service': hit[0], 'short_url': hit[1], 'cached': True}
+
+        candidates = self._candidates(service, prefer)
+        if not candidates:
+            return {'long_url': long_url, 'service': service, 'error': "No shortening service is available.",
+                    'cached': False}
+        winner, short_url, errors = await self._hedged(long_url, candidates)
+        if winner is None:
+            return {'long_url': long_url, 'service': service, 'error': "; ".join(errors), 'cached': False}
+
+        if self.cache:
+            self.cache.put(winner, long_url, short_url)
+        return {'long_url': long_url, 'service': winner, 'short_url': short_url, 'cached': False}
+
+    async def shorten_many_async(self, long_urls: Iterable[str], service: str = ANY_SERVICE,
+                                 on_result: Optional[Callable[[Dict], None]] = None) -> List[Dict]:
+        """
+        Shortens a batch concurrently and returns the results in input order.
+
+        Duplicate URLs are shortened once. With ``service=ANY_SERVICE`` a URL
+        cached under any service is reused, and each uncached URL starts on
+        the next available service in turn, so the batch is spread over
+        every provider's rate limit.
+        """
+        unique = list(dict.fromkeys(url.strip() for url in long_urls if url.strip()))
+        services = self.available_services()
+        semaphore = asyncio.Semaphore(self.max_concurrency)
+
+        async def one(i, url):
+            prefer = services[i % len(services)] if service == ANY_SERVICE and services else None
+            async with semaphore:
+                result = await self.shorten_async(url, service, prefer)
+            if on_result:
+                on_result(result)
+            return result
+
+        return list(await asyncio.gather(*(one(i, url) for i, url in enumerate(unique))))
+
+
+def benchmark(requests_count: int = 200, hedge_delay: float = 0.3, outage_timeout: float = 2.0):
+    """
+    Simulates a provider outage with in-process fake services and prints latency percentiles.
+
+    "down" never answers, "slow" answers after 50-800 ms and "backup"
+    after 40 ms. Each configuration prefers "down".
+    """
+    import random
+
+    async def down(session, url, token=None):
+        await asyncio.sleep(3600)
+
+    async def slow(session, url, token=None):
+        await asyncio.sleep(random.uniform(0.05, 0.8))
+        return "https://slow.example/" + str(hash(url) % 10000)
+
+    async def backup(session, url, token=None):
+        await asyncio.sleep(0.04)
+        return "https://backup.example/" + str(hash(url) % 10000)
+
+    adapters = {"down": down, "slow": slow, "backup": backup}
+    timeouts = {"down": outage_timeout, "slow": outage_timeout, "backup": outage_timeout}
+    configs = [
+        ("timeouts only", dict(failover=False, hedge_delay=hedge_delay, failure_threshold=10 ** 9)),
+        ("failover, no breaker", dict(hedge_delay=outage_timeout, failure_threshold=10 ** 9)),
+        ("breaker + hedging", dict(hedge_delay=hedge_delay)),
+    ]
+    for label, options in configs:
+        shortener = AsyncShortener(adapters=adapters, timeouts=timeouts, services=list(adapters), **options)
+
+        async def timed(url):
+            started = time.perf_counter()
+            result = await shortener.shorten_async(url, "down")
+            return time.perf_counter() - started, 'error' not in result
+
+        async def run():
+            semaphore = asyncio.Semaphore(16)
+
+            async def one(i):
+                async with semaphore:
+                    return await timed(f"https://example.com/{label}/{i}")
+            try:
+                return await asyncio.gather(*(one(i) for i in range(requests_count)))
+            finally:
+                await shortener.close_async()
+
+        results = asyncio.run(run())
+        latencies = [latency for latency, _ in results]
+        succeeded = sum(ok for _, ok in results)
+        print(f"{label:<22} p50 {percentile(latencies, 50) * 1000:6.0f} ms  "
+              f"p99 {percentile(latencies, 99) * 1000:6.0f} ms  {succeeded}/{requests_count} shortened")
+
+
+def main(argv=None) -> int:
+    argv = sys.argv[1:] if argv is None else argv
+    if argv[:1] == ['bench']:
+        parser = argparse.ArgumentParser(description="Measure shortening latency during a simulated outage.")
+        parser.add_argument('--requests', type=int, default=200)
+        parser.add_argument('--hedge-delay', type=float, default=0.3)
+        args = parser.parse_args(argv[1:])
+        benchmark(args.requests, args.hedge_delay)
+        return 0
+
+    parser = argparse.ArgumentParser(description="Shorten URLs with failover between services.")
+    parser.add_argument('urls', nargs='+')
+    parser.add_argument('--service', default="TinyURL", choices=list(SERVICES) + [ANY_SERVICE])
+    parser.add_argument('--hedge-delay', type=float, default=HEDGE_DELAY,
+                        help=f"seconds before also trying the next service (default: {HEDGE_DELAY})")
+    parser.add_argument('--no-failover', action='store_true')
+    args = parser.parse_args(argv)
+
+    shortener = AsyncShortener(hedge_delay=args.hedge_delay, failover=not args.no_failover)
+    failed = 0
+    for result in shortener.shorten_many(args.urls, args.service):
+        if 'error' in result:
+            failed += 1
+            print(f"{result['long_url']}\tError: {result['error']}")
+        else:
+            print(f"{result['long_url']}\t{result['short_url']}\t{result['service']}")
+    shortener.close()
+    return 1 if failed else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,282 @@
+"""
+Non-interactive batch downloads for cron jobs and bulk fetches.
+
+Reads URLs from a file or stdin, one per line. Lines starting with '#' are
+comments. A line may also be a JSON object such as
+``{"url": "...", "format": "137", "output": "music"}`` to override the format
+or output folder for one URL.
+
+Validation and metadata extraction run in a thread pool. Each URL is handed
+to a separate download pool as soon as its metadata is ready, so downloads
+start before the whole list has been extracted. A video listed more than
+once is downloaded once; the other lines are skipped as duplicates. Every
+URL gets one JSON line in the result log, and the exit status is 1 if any
+download failed.
+
+Usage:
+    python batch_download.py urls.txt [--workers 3] [--log results.jsonl]
+    cat urls.txt | python batch_download.py - --quality 720p
+"""
+
+import argparse
+import json
+import logging
+import os
+import sys
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor, as_completed
+from typing import Callable, Dict, Iterable, Iterator, List, Optional, TextIO
+
+import yt_dlp
+
+from download_archive import DownloadArchive, downloaded_filepath
+from format_selection import DEFAULT_QUALITY, select_format, fallback_format_spec
+from metadata_cache import MetadataCache, extract_with_cache, download_with_cache
+from url_validation import is_youtube_url
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_LOG = "batch_results.jsonl"
+DEFAULT_OUTPUT = "downloads"
+
+DOWNLOADED = 'downloaded'
+SKIPPED = 'skipped'
+INVALID = 'invalid'
+FAILED = 'failed'
+
+
+def read_batch(stream: TextIO) -> Iterator[Dict]:
+    """
+    Yields one item per URL from a text stream.
+
+    Each item is a dict with at least ``url`` and the 1-based ``line``; JSON
+    lines may add ``format`` and ``output``.
+    """
+    for number, line in enumerate(stream, 1):
+        line = line.strip()
+        if not line or line.startswith('#'):
+            continue
+        if line.startswith('{'):
+            try:
+                item = json.loads(line)
+            except ValueError as e:
+                yield {'url': line, 'line': number, 'error': f"Invalid JSON: {e}"}
+                continue
+            if not isinstance(item, dict):
+                yield {'url': line, 'line': number, 'error': "Expected a JSON object"}
+                continue
+            item['line'] = number
+            yield item
+        else:
+            yield {'url': line, 'line': number}
+
+
+class ResultLog:
+    """Appends one JSON object per line; safe to use from several threads."""
+
+    def __init__(self, path: Optional[str]):
+        self._lock = threading.Lock()
+        self._file = open(path, 'a', encoding='utf-8') if path else None
+
+    def write(self, record: Dict):
+        if self._file is None:
+            return
+        line = json.dumps(record, ensure_ascii=False)
+        with self._lock:
+            self._file.write(line + '\n')
+            self._file.flush()
+
+    def close(self):
+        if self._file:
+            self._file.close()
+
+
+class BatchDownloader:
+    """
+    Validates, extracts and downloads a list of URLs with bounded parallelism.
+
+    Args:
+        output_dir: Default folder for downloads.
+        workers: Number of downloads running at the same time.
+        extract_workers: Number of URLs validated and extracted at the same time.
+        quality: Preferred quality for items without an explicit format.
+        archive: Optional DownloadArchive; archived videos are skipped and
+            new downloads are recorded.
+        cache: Optional MetadataCache shared by extraction and download.
+        log: Optional ResultLog receiving one record per URL.
+        validate: Callable deciding whether a URL is accepted.
+    """
+
+    def __init__(self, output_dir: str = DEFAULT_OUTPUT, workers: int = 3, extract_workers: int = 8,
+                 quality: str = DEFAULT_QUALITY, archive: Optional[DownloadArchive] = None,
+                 cache: Optional[MetadataCache] = None, log: Optional[ResultLog] = None,
+                 validate: Callable[[str], bool] = is_youtube_url):
+        self.output_dir = output_dir
+        self.workers = max(1, workers)
+        self.extract_workers = max(1, extract_workers)
+        self.quality = quality
+        self.archive = archive
+        self.cache = cache
+        self.log = log or ResultLog(None)
+        self.validate = validate
+        self._local = threading.local()
+
+    def run(self, items: Iterable[Dict]) -> List[Dict]:
+        """Processes all items and returns their result records in input order."""
+        items = list(items)
+        results: List[Optional[Dict]] = [None] * len(items)
+
+        with ThreadPoolExecutor(self.extract_workers, thread_name_prefix='extract') as extractors, \
+                ThreadPoolExecutor(self.workers, thread_name_prefix='download') as downloaders:
+            prepared = {extractors.submit(self.prepare, item): index for index, item in enumerate(items)}
+            downloads = {}
+            claimed: Dict[tuple, Dict] = {}  # (extractor, video ID) -> the item downloading it
+            for future in as_completed(prepared):
+                index = prepared[future]
+                item, info, result = future.result()
+                if result is None and info.get('id'):
+                    # The same video listed twice (or as youtu.be and watch?v=) would race on one output file
+                    key = (str(info.get('extractor_key', 'youtube')).lower(), info['id'])
+                    first = claimed.setdefault(key, item)
+                    if first is not item:
+                        result = self.record(item, SKIPPED, id=info['id'], title=info.get('title'),
+                                             reason="duplicate in batch", duplicate_of=first.get('line'))
+                if result is not None:
+                    results[index] = self.finish(result)
+                else:
+                    downloads[downloaders.submit(self.download, item, info)] = index
+            for future in as_completed(downloads):
+                results[downloads[future]] = self.finish(future.result())
+        return results
+
+    def prepare(self, item: Dict):
+        """
+        Validates an item and extracts its metadata.
+
+        Returns ``(item, info, result)`` where ``result`` is a finished record
+        if the item needs no download, or None if it should be downloaded.
+        """
+        url = str(item.get('url', '')).strip()
+        if item.get('error'):
+            return item, None, self.record(item, INVALID, error=item['error'])
+        if not url or not self.validate(url):
+            return item, None, self.record(item, INVALID, error="Invalid YouTube URL")
+
+        archived = self.archive.get_url(url) if self.archive else None
+        if archived:
+            return item, None, self.record(item, SKIPPED, filepath=archived['file_path'],
+                                           id=archived['video_id'], reason="already downloaded")
+        try:
+            info = extract_with_cache(self._probe(), url, self.cache)
+        except Exception as e:
+            return item, None, self.record(item, FAILED, error=str(e), error_type=type(e).__name__,
+                                           stage='extract')
+        if info.get('_type') == 'playlist':
+            return item, None, self.record(item, INVALID, title=info.get('title'),
+                                           error="Playlists are not supported in batch files; list the videos instead")
+        if self.archive and info.get('id') and (str(info.get('extractor_key', 'youtube')).lower(), info['id']) in self.archive:
+            return item, None, self.record(item, SKIPPED, id=info['id'], title=info.get('title'),
+                                           reason="already downloaded")
+        return item, info, None
+
+    def download(self, item: Dict, info: Dict) -> Dict:
+        """Downloads one prepared item and returns its result record."""
+        url = item['url'].strip()
+        output_dir = os.path.join(self.output_dir, item['output']) if item.get('output') else self.output_dir
+        os.makedirs(output_dir, exist_ok=True)
+
+        choice = select_format(info, item.get('format'), item.get('quality') or self.quality)
+        ydl_opts = {
+            'format': fallback_format_spec(item.get('quality') or self.quality),
+            'outtmpl': os.path.join(output_dir, '%(title)s.%(ext)s'),
+            'quiet': True,
+            'no_warnings': True,
+            'noprogress': True,
+            'continuedl': True,
+        }
+        if choice:
+            ydl_opts.update(choice.ydl_options())
+
+        started = time.monotonic()
+        try:
+            with yt_dlp.YoutubeDL(ydl_opts) as ydl:
+                result = download_with_cache(ydl, url, self.cache)
+                filepath = downloaded_filepath(result, ydl)
+        except Exception as e:
+            return self.record(item, FAILED, id=info.get('id'), title=info.get('title'), error=str(e),
+                               error_type=type(e).__name__, stage='download',
+                               elapsed=round(time.monotonic() - started, 3))
+
+        if self.archive:
+            self.archive.add_info(result, filepath)
+        size = os.path.getsize(filepath) if filepath and os.path.exists(filepath) else None
+        return self.record(item, DOWNLOADED, id=result.get('id'), title=result.get('title'), filepath=filepath,
+                           format=choice.format_spec if choice else ydl_opts['format'], bytes=size,
+                           elapsed=round(time.monotonic() - started, 3))
+
+    def record(self, item: Dict, status: str, **fields) -> Dict:
+        record = {'url': item.get('url'), 'line': item.get('line'), 'status': status}
+        record.update({key: value for key, value in fields.items() if value is not None})
+        return record
+
+    def finish(self, record: Dict) -> Dict:
+        record['finished_at'] = time.strftime('%Y-%m-%dT%H:%M:%S%z')
+        self.log.write(record)
+        detail = record.get('filepath') or record.get('error') or record.get('reason') or ''
+        logger.info(f"[{record['status'].upper()}] {record['url']} {detail}".rstrip())
+        return record
+
+    def _probe(self):
+        """One quiet YoutubeDL per extraction thread, reused across URLs."""
+        ydl = getattr(self._local, 'ydl', None)
+        if ydl is None:
+            ydl = self._local.ydl = yt_dlp.YoutubeDL({'quiet': True, 'no_warnings': True})
+        return ydl
+
+
+def main(argv=None, validate: Callable[[str], bool] = is_youtube_url) -> int:
+    """Command-line entry point; also used by the interactive downloaders when given arguments."""
+    parser = argparse.ArgumentParser(description="Download a list of YouTube URLs without prompts.")
+    parser.add_argument('input', nargs='?', default='-', help="file with one URL or JSON object per line ('-' for stdin)")
+    parser.add_argument('-o', '--output-dir', default=DEFAULT_OUTPUT, help=f"download folder (default: {DEFAULT_OUTPUT})")
+    parser.add_argument('-w', '--workers', type=int, default=3, help="parallel downloads (default: 3)")
+    parser.add_argument('--extract-workers', type=int, default=8, help="parallel metadata extractions (default: 8)")
+    parser.add_argument('-q', '--quality', default=DEFAULT_QUALITY, help=f"preferred quality (default: {DEFAULT_QUALITY})")
+    parser.add_argument('--log', default=DEFAULT_LOG, help=f"JSONL result log, appended to (default: {DEFAULT_LOG})")
+    parser.add_argument('--no-archive', action='store_true', help="download even if a video is in the archive")
+    args = parser.parse_args(argv)
+
+    logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(levelname)s - %(message)s')
+
+    if args.input == '-':
+        items = list(read_batch(sys.stdin))
+    else:
+        try:
+            with open(args.input, 'r', encoding='utf-8') as f:
+                items = list(read_batch(f))
+        except OSError as e:
+            print(f"Could not read {args.input}: {e}", file=sys.stderr)
+            return 2
+
+    archive = None if args.no_archive else DownloadArchive()
+    cache = MetadataCache()
+    log = ResultLog(args.log)
+    try:
+        batch = BatchDownloader(args.output_dir, workers=args.workers, extract_workers=args.extract_workers,
+                                quality=args.quality, archive=archive, cache=cache, log=log, validate=validate)
+        results = batch.run(items)
+    finally:
+        log.close()
+        cache.close()
+        if archive:
+            archive.close()
+
+    counts = {status: sum(1 for r in results if r['status'] == status)
+              for status in (DOWNLOADED, SKIPPED, INVALID, FAILED)}
+    print(", ".join(f"{count} {status}" for status, count in counts.items()))
+    return 1 if counts[FAILED] else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,308 @@
+"""
+Multi-connection, resumable HTTP downloads with a shared bandwidth limit.
+
+A file is split into byte ranges that are fetched in parallel over pooled
+connections and written into a preallocated ``.part`` file. Progress of
+every range is saved to a ``.part.json`` sidecar, so an interrupted download
+resumes where each range stopped, as long as the server still reports the
+same size and ETag/Last-Modified. A TokenBucket can be shared between any
+number of downloads to cap their combined throughput.
+
+Servers without range support fall back to a single streamed connection.
+
+Usage:
+    python chunked_download.py URL OUTPUT [--fragments 8] [--rate 2M]
+"""
+
+import argparse
+import hashlib
+import json
+import os
+import sys
+import threading
+import time
+from typing import Callable, Dict, List, Optional
+
+import requests
+
+from rate_limit import TokenBucket
+
+READ_SIZE = 64 * 1024
+STATE_SAVE_INTERVAL = 1.0
+MIN_FRAGMENT_SIZE = 1024 * 1024
+
+
+class DownloadIntegrityError(Exception):
+    """Raised when the downloaded data does not match what the server announced."""
+
+
+class DownloadCancelledError(Exception):
+    """Raised when a download is stopped through its cancel event."""
+
+
+def bandwidth_bucket(rate: float) -> TokenBucket:
+    """A TokenBucket counting bytes, with room for at least one full read."""
+    return TokenBucket(rate, capacity=max(rate, READ_SIZE))
+
+
+def parse_rate(value: str) -> float:
+    """Parses a rate like '500K', '2MB/s' or '1048576' into bytes per second; raises ValueError."""
+    value = str(value).strip().upper()
+    if value.endswith('/S'):
+        value = value[:-2]
+    if value.endswith('B'):
+        value = value[:-1]
+    multipliers = {'K': 1024, 'M': 1024 ** 2, 'G': 1024 ** 3}
+    if value and value[-1] in multipliers:
+        return float(value[:-1]) * multipliers[value[-1]]
+    return float(value or 0)
+
+
+class ChunkedDownloader:
+    """
+    Downloads one URL to `dest` using parallel range requests.
+
+    Args:
+        url: The file URL.
+        dest: Final path; data goes to ``dest + '.part'`` until complete.
+        fragments: Number of parallel range requests.
+        bucket: Optional TokenBucket shared with other downloads.
+        headers: Extra request headers (e.g. yt-dlp's ``http_headers``).
+        progress: Optional callback ``(downloaded, total, speed)``.
+        cancel_event: Optional threading.Event that stops the download.
+        expected_size: Optional size the file must have when complete.
+        expected_sha256: Optional checksum the file must have when complete.
+    """
+
+    def __init__(self, url: str, dest: str, fragments: int = 4, bucket: Optional[TokenBucket] = None,
+                 headers: Optional[Dict] = None, progress: Optional[Callable[[int, Optional[int], float], None]] = None,
+                 cancel_event: Optional[threading.Event] = None, expected_size: Optional[int] = None,
+                 expected_sha256: Optional[str] = None, session: Optional[requests.Session] = None):
+        self.url = url
+        self.dest = dest
+        self.part_path = dest + '.part'
+        self.state_path = dest + '.part.json'
+        self.fragments = max(1, int(fragments))
+        self.bucket = bucket
+        self.headers = dict(headers or {})
+        self.progress = progress
+        self.cancel_event = cancel_event or threading.Event()
+        self.expected_size = expected_size
+        self.expected_sha256 = expected_sha256
+        self.session = session or requests.Session()
+        adapter = requests.adapters.HTTPAdapter(pool_connections=1, pool_maxsize=self.fragments)
+        self.session.mount('http://', adapter)
+        self.session.mount('https://', adapter)
+
+        self._lock = threading.Lock()
+        self._ranges: List[List[int]] = []
+        self._size: Optional[int] = None
+        self._validator = ''
+        self._downloaded = 0
+        self._started = 0.0
+        self._resumed_from = 0
+        self._last_save = 0.0
+        self._errors: List[BaseException] = []
+
+    def run(self) -> str:
+        """Performs (or resumes) the download and returns the final path."""
+        size, validator, ranged = self._probe()
+        if self.expected_size and size and size != self.expected_size:
+            raise DownloadIntegrityError(f"Server reports {size} bytes, expected {self.expected_size}")
+
+        if not ranged or not size:
+            self._download_single(size)
+        else:
+            self._prepare_ranges(size, validator)
+            self._download_ranges()
+
+        self._verify(size)
+        os.replace(self.part_path, self.dest)
+        if os.path.exists(self.state_path):
+            os.remove(self.state_path)
+        return self.dest
+
+    def _probe(self):
+        """Finds the size, a validator and whether byte ranges are supported."""
+        response = self.session.get(self.url, headers=dict(self.headers, Range='bytes=0-0'), stream=True, timeout=30)
+        try:
+            response.raise_for_status()
+            validator = response.headers.get('ETag') or response.headers.get('Last-Modified') or ''
+            if response.status_code == 206 and '/' in response.headers.get('Content-Range', ''):
+                total = response.headers['Content-Range'].rsplit('/', 1)[1]
+                return (int(total) if total.isdigit() else None), validator, True
+            length = response.headers.get('Content-Length')
+            return (int(length) if length and length.isdigit() else None), validator, False
+        finally:
+            response.close()
+
+    def _prepare_ranges(self, size: int, validator: str):
+        state = self._load_state()
+        # Only resume if the server still describes the same file; signed media
+        # URLs change between extractions, so the URL itself is not compared when
+        # an ETag/Last-Modified validator is available.
+        if (state and state.get('url_size') == size and state.get('validator') == validator
+                and (validator or state.get('url') == self.url)
+                and os.path.exists(self.part_path) and os.path.getsize(self.part_path) == size):
+            self._ranges = state['ranges']
+        else:
+            count = max(1, min(self.fragments, size // MIN_FRAGMENT_SIZE or 1))
+            step = size // count
+            self._ranges = [[i * step, (size - 1) if i == count - 1 else (i + 1) * step - 1, 0] for i in range(count)]
+            with open(self.part_path, 'wb') as f:
+                f.truncate(size)
+        self._validator = validator
+        self._size = size
+        self._downloaded = sum(done for _, _, done in self._ranges)
+        self._save_state(force=True)
+
+    def _download_ranges(self):
+        self._started = time.monotonic()
+        self._resumed_from = self._downloaded
+        threads = []
+        for index, (start, end, done) in enumerate(self._ranges):
+            if start + done > end:
+                continue
+            thread = threading.Thread(target=self._fetch_range, args=(index,), daemon=True)
+            thread.start()
+            threads.append(thread)
+        try:
+            for thread in threads:
+                thread.join()
+        finally:
+            self._save_state(force=True)
+        if self.cancel_event.is_set():
+            raise DownloadCancelledError(self.url)
+        if self._errors:
+            raise self._errors[0]
+
+    def _fetch_range(self, index: int):
+        start, end, done = self._ranges[index]
+        offset = start + done
+        try:
+            headers = dict(self.headers, Range=f'bytes={offset}-{end}')
+            with self.session.get(self.url, headers=headers, stream=True, timeout=30) as response:
+                response.raise_for_status()
+                content_range = response.headers.get('Content-Range', '')
+                if response.status_code != 206 or not content_range.startswith(f'bytes {offset}-'):
+                    raise DownloadIntegrityError(f"Server ignored range {offset}-{end} ({content_range or response.status_code})")
+
+                with open(self.part_path, 'r+b') as f:
+                    f.seek(offset)
+                    for chunk in response.iter_content(READ_SIZE):
+                        if self.cancel_event.is_set() or self._errors:
+                            return
+                        chunk = chunk[:end - offset + 1]
+                        if self.bucket:
+                            self.bucket.consume(len(chunk))
+                        f.write(chunk)
+                        offset += len(chunk)
+                        self._advance(index, len(chunk))
+                        if offset > end:
+                            break
+            if offset <= end:
+                raise DownloadIntegrityError(f"Range {start}-{end} ended early at byte {offset}")
+        except Exception as e:
+            with self._lock:
+                self._errors.append(e)
+
+    def _download_single(self, size: Optional[int]):
+        """Streams the whole file over one connection, appending to an existing .part when possible."""
+        self._started = time.monotonic()
+        existing = os.path.getsize(self.part_path) if os.path.exists(self.part_path) else 0
+        headers = dict(self.headers)
+        if existing and size:
+            headers['Range'] = f'bytes={existing}-'
+
+        with self.session.get(self.url, headers=headers, stream=True, timeout=30) as response:
+            response.raise_for_status()
+            resumed = response.status_code == 206
+            mode = 'ab' if resumed else 'wb'
+            self._downloaded = self._resumed_from = existing if resumed else 0
+            self._size = size
+            with open(self.part_path, mode) as f:
+                for chunk in response.iter_content(READ_SIZE):
+                    if self.cancel_event.is_set():
+                        raise DownloadCancelledError(self.url)
+                    if self.bucket:
+                        self.bucket.consume(len(chunk))
+                    f.write(chunk)
+                    self._advance(None, len(chunk))
+
+    def _advance(self, index: Optional[int], amount: int):
+        with self._lock:
+            if index is not None:
+                self._ranges[index][2] += amount
+            self._downloaded += amount
+            downloaded = self._downloaded
+        self._save_state()
+        if self.progress:
+            elapsed = max(time.monotonic() - self._started, 1e-6)
+            self.progress(downloaded, self._size, (downloaded - self._resumed_from) / elapsed)
+
+    def _verify(self, size: Optional[int]):
+        actual = os.path.getsize(self.part_path)
+        if size and actual != size:
+            raise DownloadIntegrityError(f"Downloaded {actual} bytes, expected {size}")
+        if self.expected_sha256:
+            digest = hashlib.sha256()
+            with open(self.part_path, 'rb') as f:
+                for chunk in iter(lambda: f.read(1024 * 1024), b''):
+                    digest.update(chunk)
+            if digest.hexdigest() != self.expected_sha256.lower():
+                raise DownloadIntegrityError("SHA-256 checksum mismatch")
+
+    def _load_state(self) -> Optional[Dict]:
+        try:
+            with open(self.state_path, 'r') as f:
+                return json.load(f)
+        except (OSError, ValueError):
+            return None
+
+    def _save_state(self, force: bool = False):
+        if not self._ranges:
+            return
+        now = time.monotonic()
+        with self._lock:
+            if not force and now - self._last_save < STATE_SAVE_INTERVAL:
+                return
+            self._last_save = now
+            state = {'url': self.url, 'url_size': self._size, 'validator': self._validator,
+                     'ranges': [list(r) for r in self._ranges]}
+            temp_path = self.state_path + '.tmp'
+            with open(temp_path, 'w') as f:
+                json.dump(state, f)
+            os.replace(temp_path, self.state_path)
+
+
+def main(argv=None) -> int:
+    """Command-line entry point, mainly for checking servers and limits by hand."""
+    parser = argparse.ArgumentParser(description="Download a file over several range requests.")
+    parser.add_argument('url')
+    parser.add_argument('output')
+    parser.add_argument('--fragments', type=int, default=4, help="parallel range requests (default: 4)")
+    parser.add_argument('--rate', default='0', help="bandwidth limit, e.g. 500K or 2M (default: unlimited)")
+    parser.add_argument('--sha256', help="expected SHA-256 of the complete file")
+    args = parser.parse_args(argv)
+
+    def show(done, total, speed):
+        percent = f"{100 * done / total:5.1f}%" if total else f"{done} bytes"
+        print(f"\r{percent} at {speed / 1024:.0f} KiB/s", end='', flush=True)
+
+    downloader = ChunkedDownloader(args.url, args.output, fragments=args.fragments,
+                                   bucket=bandwidth_bucket(parse_rate(args.rate)), progress=show,
+                                   expected_sha256=args.sha256)
+    try:
+        print(f"\nSaved to {downloader.run()}")
+        return 0
+    except KeyboardInterrupt:
+        downloader.cancel_event.set()
+        print("\nInterrupted; run again to resume.")
+        return 130
+    except (requests.exceptions.RequestException, DownloadIntegrityError, OSError) as e:
+        print(f"\nDownload failed: {e}")
+        return 1
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,223 @@
+"""
+Persistent archive of downloaded videos.
+
+Every finished download is recorded in SQLite, keyed by extractor and video
+ID, together with the file path and a SHA-256 checksum. All keys are loaded
+into an in-memory set at startup so "was this already downloaded?" is an
+O(1) check that the downloaders make before any extract_info or download.
+
+Usage:
+    python download_archive.py list
+    python download_archive.py verify [--workers N]
+"""
+
+import argparse
+import hashlib
+import os
+import sqlite3
+import sys
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from typing import Dict, List, Optional, Tuple
+from urllib.parse import urlparse, parse_qs
+
+from url_validation import YOUTUBE_HOSTS, YOUTUBE_ID, YOUTUBE_PATH_ID
+
+DEFAULT_ARCHIVE = "download_archive.db"
+CHUNK_SIZE = 1024 * 1024
+
+
+def extract_video_id(url: str) -> Optional[Tuple[str, str]]:
+    """
+    Returns (extractor, video_id) for a single-video URL without any network access.
+
+    Only YouTube URLs are recognized; playlists and unknown sites return None.
+    """
+    try:
+        parsed = urlparse(url.strip())
+    except (AttributeError, ValueError):
+        return None
+
+    host = parsed.netloc.lower().split(':')[0]
+    video_id = None
+    if host == 'youtu.be':
+        video_id = parsed.path.lstrip('/').split('/')[0]
+    elif host in YOUTUBE_HOSTS:
+        if parsed.path == '/watch':
+            video_id = parse_qs(parsed.query).get('v', [None])[0]
+        else:
+            match = YOUTUBE_PATH_ID.match(parsed.path)
+            video_id = match.group(1) if match else None
+
+    if video_id and YOUTUBE_ID.match(video_id):
+        return 'youtube', video_id
+    return None
+
+
+def downloaded_filepath(info: Dict, ydl=None) -> Optional[str]:
+    """Returns the final file path from a yt-dlp info dict returned by a download."""
+    requested = info.get('requested_downloads') or []
+    if requested and requested[-1].get('filepath'):
+        return requested[-1]['filepath']
+    if info.get('filepath'):
+        return info['filepath']
+    return ydl.prepare_filename(info) if ydl else None
+
+
+def file_checksum(path: str) -> str:
+    """Returns the SHA-256 hex digest of a file, read in 1 MB chunks."""
+    digest = hashlib.sha256()
+    with open(path, 'rb') as f:
+        for chunk in iter(lambda: f.read(CHUNK_SIZE), b''):
+            digest.update(chunk)
+    return digest.hexdigest()
+
+
+class DownloadArchive:
+    """SQLite-backed archive with an in-memory set of (extractor, video_id) keys."""
+
+    def __init__(self, path: str = DEFAULT_ARCHIVE):
+        self.path = path
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(path, check_same_thread=False)
+        self._conn.execute(
+            """CREATE TABLE IF NOT EXISTS downloads (
+                   extractor TEXT NOT NULL,
+                   video_id TEXT NOT NULL,
+                   file_path TEXT,
+                   checksum TEXT,
+                   size INTEGER,
+                   downloaded_at REAL,
+                   PRIMARY KEY (extractor, video_id)
+               )"""
+        )
+        self._conn.commit()
+        self._keys = {(extractor, video_id) for extractor, video_id
+                      in self._conn.execute("SELECT extractor, video_id FROM downloads")}
+
+    def __contains__(self, key: Tuple[str, str]) -> bool:
+        return (key[0].lower(), key[1]) in self._keys
+
+    def __len__(self) -> int:
+        return len(self._keys)
+
+    def contains_url(self, url: str) -> bool:
+        """True if the URL points at a video that is already archived."""
+        key = extract_video_id(url)
+        return key is not None and key in self._keys
+
+    def video_ids(self, extractor: str = 'youtube') -> set:
+        """All archived video IDs for one extractor."""
+        extractor = extractor.lower()
+        return {video_id for key_extractor, video_id in self._keys if key_extractor == extractor}
+
+    def get(self, extractor: str, video_id: str) -> Optional[Dict]:
+        """Returns the archived record for a video, or None."""
+        extractor = extractor.lower()
+        if (extractor, video_id) not in self._keys:
+            return None
+        with self._lock:
+            row = self._conn.execute(
+                "SELECT file_path, checksum, size, downloaded_at FROM downloads WHERE extractor = ? AND video_id = ?",
+                (extractor, video_id)).fetchone()
+        if row is None:
+            return None
+        return {'extractor': extractor, 'video_id': video_id, 'file_path': row[0],
+                'checksum': row[1], 'size': row[2], 'downloaded_at': row[3]}
+
+    def get_url(self, url: str) -> Optional[Dict]:
+        """Returns the archived record for a video URL, or None."""
+        key = extract_video_id(url)
+        return self.get(*key) if key else None
+
+    def add(self, extractor: str, video_id: str, file_path: Optional[str]):
+        """Records a finished download, hashing the file if it exists."""
+        extractor = extractor.lower()
+        checksum = size = None
+        if file_path and os.path.exists(file_path):
+            checksum = file_checksum(file_path)
+            size = os.path.getsize(file_path)
+        with self._lock:
+            self._conn.execute(
+                "INSERT OR REPLACE INTO downloads VALUES (?, ?, ?, ?, ?, ?)",
+                (extractor, video_id, file_path, checksum, size, time.time()))
+            self._conn.commit()
+            self._keys.add((extractor, video_id))
+
+    def add_info(self, info: Dict, file_path: Optional[str]):
+        """Records a finished download from its yt-dlp info dict."""
+        extractor = info.get('extractor_key') or info.get('extractor') or 'youtube'
+        if info.get('id'):
+            self.add(extractor, info['id'], file_path)
+
+    def remove(self, extractor: str, video_id: str):
+        """Forgets a video so it will be downloaded again."""
+        extractor = extractor.lower()  # Stored lowercased by add()
+        with self._lock:
+            self._conn.execute("DELETE FROM downloads WHERE extractor = ? AND video_id = ?", (extractor, video_id))
+            self._conn.commit()
+            self._keys.discard((extractor, video_id))
+
+    def records(self) -> List[Dict]:
+        """All archived records, newest first."""
+        with self._lock:
+            rows = self._conn.execute(
+                "SELECT extractor, video_id, file_path, checksum, size, downloaded_at "
+                "FROM downloads ORDER BY downloaded_at DESC").fetchall()
+        keys = ('extractor', 'video_id', 'file_path', 'checksum', 'size', 'downloaded_at')
+        return [dict(zip(keys, row)) for row in rows]
+
+    def verify(self, max_workers: Optional[int] = None) -> List[Dict]:
+        """
+        Re-hashes every archived file in parallel.
+
+        Returns one result per record with ``status`` set to 'ok', 'missing',
+        'mismatch' or 'unhashed' (no checksum was recorded).
+        """
+        def check(record):
+            path = record['file_path']
+            if not path or not os.path.exists(path):
+                return dict(record, status='missing')
+            if not record['checksum']:
+                return dict(record, status='unhashed')
+            actual = file_checksum(path)
+            return dict(record, status='ok' if actual == record['checksum'] else 'mismatch')
+
+        # hashlib releases the GIL on large buffers, so threads hash in parallel
+        with ThreadPoolExecutor(max_workers=max_workers or os.cpu_count()) as executor:
+            return list(executor.map(check, self.records()))
+
+    def close(self):
+        with self._lock:
+            self._conn.close()
+
+
+def main(argv=None) -> int:
+    """Command-line entry point for listing and verifying the archive."""
+    parser = argparse.ArgumentParser(description="Inspect or verify the download archive.")
+    parser.add_argument('command', choices=['list', 'verify'])
+    parser.add_argument('--db', default=DEFAULT_ARCHIVE, help=f"archive database (default: {DEFAULT_ARCHIVE})")
+    parser.add_argument('--workers', type=int, default=None, help="parallel hashing threads (default: one per core)")
+    args = parser.parse_args(argv)
+
+    archive = DownloadArchive(args.db)
+    try:
+        if args.command == 'list':
+            for record in archive.records():
+                print(f"{record['extractor']} {record['video_id']}  {record['file_path']}")
+            print(f"{len(archive)} archived video(s)")
+            return 0
+
+        results = archive.verify(args.workers)
+        problems = [r for r in results if r['status'] != 'ok']
+        for result in problems:
+            print(f"[{result['status'].upper()}] {result['extractor']} {result['video_id']}: {result['file_path']}")
+        print(f"Verified {len(results)} file(s): {len(results) - len(problems)} ok, {len(problems)} with problems")
+        return 1 if problems else 0
+    finally:
+        archive.close()
+
+
+if __name__ == "__main__":
+    sys.exit(main())
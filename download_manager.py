@@ -0,0 +1,313 @@
+"""
+Bounded, persistent download queue for the YouTube downloader front-ends.
+
+Jobs are kept in a priority queue (lower priority value first, FIFO within
+the same priority), persisted to a JSON file so an interrupted batch picks
+up where it left off, and run by a fixed pool of worker threads. Each job
+moves through queued -> running -> done/failed/cancelled.
+"""
+
+import heapq
+import itertools
+import json
+import logging
+import os
+import threading
+import time
+import uuid
+from concurrent.futures import ThreadPoolExecutor
+from dataclasses import dataclass, field, fields
+from typing import Callable, Dict, Iterable, List, Optional, Tuple
+
+logger = logging.getLogger(__name__)
+
+QUEUED = 'queued'
+RUNNING = 'running'
+DONE = 'done'
+FAILED = 'failed'
+CANCELLED = 'cancelled'
+FINISHED_STATES = (DONE, FAILED, CANCELLED)
+
+
+class JobCancelled(Exception):
+    """Raised inside a running job once its cancellation has been requested."""
+
+
+@dataclass
+class DownloadJob:
+    """A single URL to download and its current state."""
+    url: str
+    download_path: str
+    format_spec: str = 'best'
+    priority: int = 0
+    title: str = ''
+    job_id: str = field(default_factory=lambda: uuid.uuid4().hex[:12])
+    state: str = QUEUED
+    progress: float = 0.0
+    speed: str = ''
+    eta: str = ''
+    error: str = ''
+    filename: str = ''
+    created: float = field(default_factory=time.time)
+    extra: Dict = field(default_factory=dict)
+    cancel_event: threading.Event = field(default_factory=threading.Event, repr=False, compare=False)
+
+    def check_cancelled(self):
+        """Raises JobCancelled if the job should stop; call from progress hooks."""
+        if self.cancel_event.is_set():
+            raise JobCancelled(self.job_id)
+
+    def to_dict(self) -> Dict:
+        """Returns the persistable fields of the job."""
+        return {f.name: getattr(self, f.name) for f in fields(self) if f.name != 'cancel_event'}
+
+    @classmethod
+    def from_dict(cls, data: Dict) -> 'DownloadJob':
+        known = {f.name for f in fields(cls)} - {'cancel_event'}
+        return cls(**{key: value for key, value in data.items() if key in known})
+
+
+class DownloadManager:
+    """
+    Runs download jobs on a bounded pool of worker threads.
+
+    Args:
+        run_job: Callable that performs one download. It should update the
+            job's progress fields, call ``notify(job)`` as it goes and raise
+            on failure. Raising after ``job.cancel_event`` is set marks the
+            job cancelled instead of failed.
+        max_workers: Maximum number of jobs running at the same time.
+        queue_file: Optional JSON file the unfinished queue is persisted to.
+        on_update: Optional callback invoked (from worker threads) with a job
+            whenever its state or progress changes.
+    """
+
+    def __init__(self, run_job: Callable[[DownloadJob], None], max_workers: int = 3,
+                 queue_file: Optional[str] = None, on_update: Optional[Callable[[DownloadJob], None]] = None):
+        self.run_job = run_job
+        self.max_workers = max(1, int(max_workers))
+        self.queue_file = queue_file
+        self.on_update = on_update
+
+        self.jobs: Dict[str, DownloadJob] = {}
+        self._heap: List = []
+        self._sequence = itertools.count()
+        self._lock = threading.Lock()
+        self._has_work = threading.Condition(self._lock)
+        self._save_lock = threading.Lock()
+        self._workers: List[threading.Thread] = []
+        self._stopping = False
+
+        self._load_queue()
+
+    def start(self):
+        """Starts the worker threads."""
+        with self._lock:
+            if self._workers:
+                return
+            self._stopping = False
+            for i in range(self.max_workers):
+                worker = threading.Thread(target=self._worker_loop, name=f"download-worker-{i}", daemon=True)
+                worker.start()
+                self._workers.append(worker)
+
+    def shutdown(self, wait: bool = False):
+        """Stops taking new jobs. Unfinished jobs stay in the persisted queue."""
+        with self._has_work:
+            self._stopping = True
+            self._has_work.notify_all()
+        self._save_queue()
+        if wait:
+            for worker in self._workers:
+                worker.join()
+        self._workers = []
+
+    def submit(self, url: str, download_path: str, format_spec: str = 'best', priority: int = 0,
+               title: str = '', **extra) -> DownloadJob:
+        """Adds a URL to the queue and returns its job."""
+        job = DownloadJob(url=url, download_path=download_path, format_spec=format_spec,
+                          priority=priority, title=title, extra=extra)
+        with self._has_work:
+            self._enqueue(job)
+            self._has_work.notify()
+        self._save_queue()
+        self.notify(job)
+        return job
+
+    def cancel(self, job_id: str) -> bool:
+        """Cancels a queued or running job. Returns False if it already finished."""
+        with self._lock:
+            job = self.jobs.get(job_id)
+            if job is None or job.state in FINISHED_STATES:
+                return False
+            job.cancel_event.set()
+            if job.state == QUEUED:
+                job.state = CANCELLED
+        self._save_queue()
+        self.notify(job)
+        return True
+
+    def list_jobs(self) -> List[DownloadJob]:
+        """Returns all known jobs in queue order."""
+        with self._lock:
+            return sorted(self.jobs.values(), key=lambda job: (job.priority, job.created))
+
+    def pending_count(self) -> int:
+        """Number of jobs that are queued or running."""
+        with self._lock:
+            return sum(1 for job in self.jobs.values() if job.state in (QUEUED, RUNNING))
+
+    def known_video_ids(self) -> set:
+        """IDs of videos that are queued, running or already downloaded."""
+        with self._lock:
+            return {job.extra['video_id'] for job in self.jobs.values()
+                    if job.extra.get('video_id') and job.state not in (FAILED, CANCELLED)}
+
+    def notify(self, job: DownloadJob):
+        """Reports a change in a job to the update callback."""
+        if self.on_update:
+            try:
+                self.on_update(job)
+            except Exception as e:
+                logger.error(f"Download update callback failed: {e}")
+
+    def _enqueue(self, job: DownloadJob):
+        self.jobs[job.job_id] = job
+        heapq.heappush(self._heap, (job.priority, next(self._sequence), job.job_id))
+
+    def _next_job(self) -> Optional[DownloadJob]:
+        with self._has_work:
+            while True:
+                if self._stopping:
+                    return None
+                while self._heap:
+                    _, _, job_id = heapq.heappop(self._heap)
+                    job = self.jobs.get(job_id)
+                    if job and job.state == QUEUED:
+                        job.state = RUNNING
+                        return job
+                self._has_work.wait()
+
+    def _worker_loop(self):
+        while True:
+            job = self._next_job()
+            if job is None:
+                return
+            self._save_queue()
+            self.notify(job)
+
+            try:
+                self.run_job(job)
+                job.state = DONE
+                job.progress = 100.0
+            except Exception as e:
+                if job.cancel_event.is_set():
+                    job.state = CANCELLED
+                else:
+                    job.state = FAILED
+                    job.error = str(e)
+                    logger.error(f"Download failed for {job.url}: {e}")
+
+            self._save_queue()
+            self.notify(job)
+
+    def _load_queue(self):
+        if not self.queue_file or not os.path.exists(self.queue_file):
+            return
+        try:
+            with open(self.queue_file, 'r') as f:
+                saved = json.load(f)
+        except (OSError, ValueError) as e:
+            logger.error(f"Error loading download queue: {e}")
+            return
+
+        for data in saved:
+            job = DownloadJob.from_dict(data)
+            if job.state == RUNNING:
+                job.state = QUEUED  # Interrupted mid-download; start it again
+                job.progress = 0.0
+            if job.state == QUEUED:
+                self._enqueue(job)
+
+    def _save_queue(self):
+        if not self.queue_file:
+            return
+        with self._lock:
+            pending = [job.to_dict() for job in self.jobs.values() if job.state in (QUEUED, RUNNING)]
+        try:
+            with self._save_lock:
+                temp_file = self.queue_file + '.tmp'
+                with open(temp_file, 'w') as f:
+                    json.dump(pending, f, indent=4)
+                os.replace(temp_file, self.queue_file)
+        except OSError as e:
+            logger.error(f"Error saving download queue: {e}")
+
+
+def playlist_entry_url(entry: Dict) -> Optional[str]:
+    """Returns a downloadable URL for a flat playlist entry."""
+    url = entry.get('webpage_url') or entry.get('url')
+    if url and '://' in url:
+        return url
+    video_id = entry.get('id') or url
+    if not video_id:
+        return None
+    if entry.get('ie_key', 'Youtube') == 'Youtube':
+        return f"https://www.youtube.com/watch?v={video_id}"
+    return url
+
+
+def expand_playlist(entries: Iterable[Dict], extract_info: Callable[[str], Dict],
+                    skip_ids: Iterable[str] = (), max_workers: int = 4) -> Tuple[List[Dict], List[str], List[Tuple[Dict, str]]]:
+    """
+    Resolves flat playlist entries into full metadata concurrently.
+
+    Entries whose ID is in ``skip_ids`` (or repeats earlier in the playlist)
+    are skipped without being extracted.
+
+    Args:
+        entries: Flat entries as returned by yt-dlp with ``extract_flat``.
+        extract_info: Callable taking an entry URL and returning its metadata,
+            e.g. ``lambda url: ydl.extract_info(url, download=False)``.
+        skip_ids: Video IDs that were already downloaded or queued.
+        max_workers: Number of entries resolved at the same time.
+
+    Returns:
+        A tuple ``(resolved, skipped_ids, failures)``. ``resolved`` keeps
+        playlist order and each item has ``webpage_url`` set.
+    """
+    seen = set(skip_ids)
+    pending = []
+    skipped = []
+    for entry in entries or []:
+        if not entry:
+            continue
+        video_id = entry.get('id')
+        if video_id and video_id in seen:
+            skipped.append(video_id)
+            continue
+        if video_id:
+            seen.add(video_id)
+        pending.append(entry)
+
+    def resolve(entry):
+        url = playlist_entry_url(entry)
+        if not url:
+            raise ValueError("Playlist entry has no URL or ID")
+        info = extract_info(url) or {}
+        info.setdefault('id', entry.get('id'))
+        info.setdefault('title', entry.get('title', ''))
+        info.setdefault('webpage_url', url)
+        return info
+
+    resolved = []
+    failures = []
+    with ThreadPoolExecutor(max_workers=max(1, max_workers)) as executor:
+        futures = [(entry, executor.submit(resolve, entry)) for entry in pending]
+        for entry, future in futures:
+            try:
+                resolved.append(future.result())
+            except Exception as e:
+                logger.error(f"Could not resolve playlist entry {entry.get('id')}: {e}")
+                failures.append((entry, str(e)))
+    return resolved, skipped, failures
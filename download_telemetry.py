@@ -0,0 +1,251 @@
+"""
+Structured per-job download telemetry.
+
+Each finished download job is written as one JSON object per line to a log
+that rotates by size. A record holds the bytes transferred, duration,
+average and peak speed, retries and, for failures, the error class, so
+throughput and failure rates can be computed instead of read from prose.
+
+Usage:
+    python download_telemetry.py summary [--log download_telemetry.jsonl] [--since 24h]
+"""
+
+import argparse
+import json
+import logging
+import logging.handlers
+import os
+import re
+import sys
+import threading
+import time
+from typing import Dict, Iterable, Iterator, List, Optional
+
+from percentiles import percentile
+
+DEFAULT_TELEMETRY_LOG = "download_telemetry.jsonl"
+DEFAULT_MAX_BYTES = 5 * 1024 * 1024
+DEFAULT_BACKUP_COUNT = 5
+
+logger = logging.getLogger(__name__)
+
+_RETRY_MESSAGE = re.compile(r'\bretrying\b', re.IGNORECASE)
+
+
+class TelemetryLog:
+    """Writes one JSON record per line to a size-rotated file; thread-safe."""
+
+    def __init__(self, path: str = DEFAULT_TELEMETRY_LOG, max_bytes: int = DEFAULT_MAX_BYTES,
+                 backup_count: int = DEFAULT_BACKUP_COUNT):
+        self.path = path
+        # RotatingFileHandler does the locking and rollover; records are preformatted JSON
+        self._handler = logging.handlers.RotatingFileHandler(path, maxBytes=max_bytes,
+                                                             backupCount=backup_count, encoding='utf-8')
+        self._handler.setFormatter(logging.Formatter('%(message)s'))
+
+    def write(self, record: Dict):
+        message = json.dumps(record, ensure_ascii=False, separators=(',', ':'))
+        self._handler.handle(logging.makeLogRecord({'msg': message, 'levelno': logging.INFO,
+                                                    'levelname': 'INFO'}))
+
+    def close(self):
+        self._handler.close()
+
+
+class JobTelemetry:
+    """
+    Collects the measurements of one download job.
+
+    Feed it yt-dlp progress dicts through ``progress``; it can also be passed
+    as yt-dlp's ``logger`` option, where it counts retry messages and passes
+    every message on to this module's logger.
+    """
+
+    def __init__(self, job_id: str, url: str, **fields):
+        self.job_id = job_id
+        self.url = url
+        self.fields = fields
+        self.started = time.time()
+        self.retries = 0
+        self.peak_speed = 0.0
+        self.exception: Optional[BaseException] = None
+        self._bytes_by_file: Dict[str, int] = {}
+        self._lock = threading.Lock()
+
+    @property
+    def bytes(self) -> int:
+        with self._lock:
+            return sum(self._bytes_by_file.values())
+
+    def progress(self, d: Dict):
+        """Records a yt-dlp style progress dict; merged downloads report each stream separately."""
+        downloaded = d.get('downloaded_bytes')
+        if d.get('status') == 'finished' and downloaded is None:
+            downloaded = d.get('total_bytes')
+        with self._lock:
+            if downloaded is not None:
+                self._bytes_by_file[d.get('filename') or ''] = int(downloaded)
+            speed = d.get('speed')
+            if speed and speed > self.peak_speed:
+                self.peak_speed = float(speed)
+
+    def retried(self):
+        with self._lock:
+            self.retries += 1
+
+    def failed(self, error: BaseException):
+        """Remembers the exception that ended the download."""
+        self.exception = error
+
+    # yt-dlp logger interface
+    def _count(self, msg):
+        if _RETRY_MESSAGE.search(msg):
+            self.retried()
+
+    def debug(self, msg):
+        self._count(msg)
+        logger.debug(f"[{self.job_id}] {msg}")
+
+    def info(self, msg):
+        self._count(msg)
+        logger.info(f"[{self.job_id}] {msg}")
+
+    def warning(self, msg):
+        self._count(msg)
+        logger.warning(f"[{self.job_id}] {msg}")
+
+    def error(self, msg):
+        self._count(msg)
+        logger.error(f"[{self.job_id}] {msg}")
+
+    def to_record(self, status: str) -> Dict:
+        """Builds the JSON record for a job that ended with `status`."""
+        finished = time.time()
+        duration = max(finished - self.started, 0.0)
+        total = self.bytes
+        record = {
+            'event': 'download',
+            'ts': round(finished, 3),
+            'job_id': self.job_id,
+            'url': self.url,
+            'status': status,
+            'bytes': total,
+            'duration_s': round(duration, 3),
+            'avg_speed': round(total / duration, 1) if duration and total else 0.0,
+            'peak_speed': round(self.peak_speed, 1),
+            'retries': self.retries,
+        }
+        record.update(self.fields)
+        if self.exception is not None:
+            record['error_class'] = type(self.exception).__name__
+            record['error'] = str(self.exception)
+        return record
+
+
+def log_files(path: str) -> List[str]:
+    """The log and its rotated backups, oldest first."""
+    backups = []
+    index = 1
+    while os.path.exists(f"{path}.{index}"):
+        backups.append(f"{path}.{index}")
+        index += 1
+    files = list(reversed(backups))
+    if os.path.exists(path):
+        files.append(path)
+    return files
+
+
+def read_records(paths: Iterable[str], since: Optional[float] = None,
+                 until: Optional[float] = None) -> Iterator[Dict]:
+    """Yields download records from the files whose timestamp is in [since, until)."""
+    for path in paths:
+        with open(path, 'r', encoding='utf-8') as f:
+            for line in f:
+                try:
+                    record = json.loads(line)
+                except ValueError:
+                    continue
+                if record.get('event') != 'download':
+                    continue
+                ts = record.get('ts', 0)
+                if (since is None or ts >= since) and (until is None or ts < until):
+                    yield record
+
+
+def summarize(records: Iterable[Dict], percentiles=(50, 90, 95, 99)) -> Dict:
+    """
+    Aggregates download records.
+
+    Throughput percentiles are computed over the average speed of completed
+    downloads in bytes per second. Skipped jobs count towards neither the
+    failure rate nor throughput.
+    """
+    records = list(records)
+    attempted = [r for r in records if r.get('status') in ('done', 'failed', 'cancelled')]
+    done = [r for r in attempted if r['status'] == 'done']
+    failed = [r for r in attempted if r['status'] == 'failed']
+    speeds = sorted(r['avg_speed'] for r in done if r.get('avg_speed'))
+
+    error_classes: Dict[str, int] = {}
+    for r in failed:
+        name = r.get('error_class', 'Unknown')
+        error_classes[name] = error_classes.get(name, 0) + 1
+
+    total_bytes = sum(r.get('bytes', 0) for r in done)
+    total_time = sum(r.get('duration_s', 0) for r in done)
+    return {
+        'jobs': len(records),
+        'done': len(done),
+        'failed': len(failed),
+        'cancelled': sum(1 for r in attempted if r['status'] == 'cancelled'),
+        'skipped': len(records) - len(attempted),
+        'failure_rate': round(len(failed) / len(attempted), 4) if attempted else 0.0,
+        'bytes': total_bytes,
+        'retries': sum(r.get('retries', 0) for r in records),
+        'mean_speed': round(total_bytes / total_time, 1) if total_time else 0.0,
+        'throughput': {f"p{p}": percentile(speeds, p) for p in percentiles} if speeds else {},
+        'peak_speed': max((r.get('peak_speed', 0) for r in done), default=0),
+        'error_classes': error_classes,
+    }
+
+
+def parse_window(value: str) -> float:
+    """Parses a window like '30m', '24h', '7d' or a number of seconds."""
+    match = re.fullmatch(r'\s*(\d+(?:\.\d+)?)\s*([smhd]?)\s*', value or '')
+    if not match:
+        raise argparse.ArgumentTypeError(f"Invalid time window: {value!r}")
+    return float(match.group(1)) * {'': 1, 's': 1, 'm': 60, 'h': 3600, 'd': 86400}[match.group(2)]
+
+
+def main(argv=None) -> int:
+    """Command-line entry point for aggregating the telemetry log."""
+    parser = argparse.ArgumentParser(description="Summarize download telemetry.")
+    parser.add_argument('command', choices=['summary'])
+    parser.add_argument('--log', default=DEFAULT_TELEMETRY_LOG, help=f"telemetry log (default: {DEFAULT_TELEMETRY_LOG})")
+    parser.add_argument('--since', type=parse_window, help="only jobs from this window, e.g. 24h or 7d")
+    parser.add_argument('--json', action='store_true', help="print the summary as JSON")
+    args = parser.parse_args(argv)
+
+    files = log_files(args.log)
+    if not files:
+        print(f"No telemetry found at {args.log}")
+        return 1
+    since = time.time() - args.since if args.since else None
+    summary = summarize(read_records(files, since=since))
+
+    if args.json:
+        print(json.dumps(summary, indent=2))
+        return 0
+    print(f"Jobs: {summary['jobs']} ({summary['done']} done, {summary['failed']} failed, "
+          f"{summary['cancelled']} cancelled, {summary['skipped']} skipped)")
+    print(f"Failure rate: {summary['failure_rate']:.1%}  Retries: {summary['retries']}")
+    print(f"Downloaded: {summary['bytes'] / 1_000_000:.1f} MB at {summary['mean_speed'] / 1_000_000:.2f} MB/s overall")
+    for name, speed in summary['throughput'].items():
+        print(f"  {name} throughput: {speed / 1_000_000:.2f} MB/s")
+    for name, count in sorted(summary['error_classes'].items(), key=lambda item: -item[1]):
+        print(f"  {name}: {count}")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
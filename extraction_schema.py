@@ -0,0 +1,228 @@
+"""
+Declarative extraction schemas for the web scraper.
+
+A schema describes what to pull out of a page without any code:
+
+    {
+        "name": "quotes",
+        "record": "div.quote",
+        "fields": {
+            "Text": "span.text",
+            "Author": {"selector": "small.author"},
+            "Tags": {"selector": "a.tag", "many": true, "join": ", "},
+            "Link": {"selector": "a", "attr": "href", "transforms": ["absolute_url"]}
+        },
+        "next": "li.next > a[href]",
+        "key": ["Text", "Author"]
+    }
+
+``record`` selects one element per record, each field is looked up inside
+it, and ``next`` optionally points at the pagination link. Schemas can be
+written as JSON or, when PyYAML is installed, YAML.
+
+All CSS selectors are compiled once with soupsieve when the schema is
+loaded, so extracting from each page only runs precompiled matchers.
+"""
+
+import json
+import logging
+import os
+import re
+from urllib.parse import urljoin
+
+import soupsieve as sv
+from bs4 import BeautifulSoup
+
+try:
+    import yaml
+    YAML_AVAILABLE = True
+except ImportError:
+    YAML_AVAILABLE = False
+
+logger = logging.getLogger(__name__)
+
+
+class SchemaError(ValueError):
+    """Raised when a schema definition is invalid."""
+
+
+def _strip_quotes(value):
+    return value.strip().strip('"“”‘’\'')
+
+
+def _number(convert, junk):
+    """A transform that parses a number out of text, or returns None if it is not one number (e.g. '1-2')."""
+    def transform(value):
+        cleaned = re.sub(junk, '', value)
+        if not cleaned:
+            return None  # 'N/A', '—' and other text without digits
+        try:
+            return convert(cleaned)
+        except ValueError:
+            return None
+    return transform
+
+
+# A transform returns None for a value it cannot handle; the field then falls back to its default
+TRANSFORMS = {
+    'strip': str.strip,
+    'lower': str.lower,
+    'upper': str.upper,
+    'collapse_whitespace': lambda value: ' '.join(value.split()),
+    'strip_quotes': _strip_quotes,
+    'int': _number(int, r'[^\d-]'),
+    'float': _number(float, r'[^\d.-]'),
+}
+
+
+class CompiledField:
+    """A single field: a precompiled selector plus how to turn matches into a value."""
+
+    def __init__(self, name, spec):
+        if isinstance(spec, str):
+            spec = {'selector': spec}
+        if not isinstance(spec, dict):
+            raise SchemaError(f"Field '{name}' must be a selector string or an object")
+
+        self.name = name
+        self.selector = spec.get('selector')
+        self.matcher = _compile(self.selector, f"field '{name}'") if self.selector else None
+        self.attr = spec.get('attr')
+        self.many = bool(spec.get('many', False))
+        self.join = spec.get('join')
+        self.default = spec.get('default', '')
+        self.absolute_url = False
+        self.transforms = []
+
+        for transform in spec.get('transforms', []):
+            if transform == 'absolute_url':
+                self.absolute_url = True
+            elif transform in TRANSFORMS:
+                self.transforms.append(TRANSFORMS[transform])
+            else:
+                raise SchemaError(f"Unknown transform '{transform}' in field '{name}'")
+
+    def extract(self, element, page_url=None):
+        """Extracts this field's value from a record element."""
+        if self.matcher is None:
+            matches = [element]
+        elif self.many:
+            matches = self.matcher.select(element)
+        else:
+            match = self.matcher.select_one(element)
+            matches = [match] if match is not None else []
+
+        values = [self._value_of(match, page_url) for match in matches]
+        values = [value for value in values if value is not None]
+        if not values:
+            return [] if self.many and self.join is None else self.default
+        if not self.many:
+            return values[0]
+        return self.join.join(str(value) for value in values) if self.join is not None else values
+
+    def _value_of(self, match, page_url):
+        if self.attr:
+            value = match.get(self.attr)
+            if isinstance(value, list):
+                value = ' '.join(value)
+            if value is None:
+                return None
+        else:
+            value = match.get_text(strip=True)
+
+        if self.absolute_url and page_url:
+            value = urljoin(page_url, value)
+        for transform in self.transforms:
+            try:
+                value = transform(value)
+            except (ValueError, TypeError, AttributeError) as e:
+                logger.warning(f"Field '{self.name}': could not transform {value!r}: {e}")
+                return None
+            if value is None:
+                logger.debug(f"Field '{self.name}': transform dropped the value")
+                return None
+        return value
+
+
+class CompiledSchema:
+    """A schema whose selectors have been compiled and can be reused across pages."""
+
+    def __init__(self, spec):
+        if not isinstance(spec, dict) or 'record' not in spec or 'fields' not in spec:
+            raise SchemaError("A schema needs a 'record' selector and a 'fields' mapping")
+
+        self.spec = spec
+        self.name = spec.get('name', 'unnamed')
+        self.record_matcher = _compile(spec['record'], 'record')
+        self.fields = [CompiledField(name, field) for name, field in spec['fields'].items()]
+        self.next_matcher = _compile(spec['next'], 'next') if spec.get('next') else None
+        self.key_fields = self._resolve_key(spec.get('key'))
+
+    def _resolve_key(self, key):
+        """Checks that every key field is a schema field; names match case-insensitively."""
+        if not key:
+            return tuple(self.field_names)
+        if isinstance(key, str):
+            key = [key]
+        by_name = {name.lower(): name for name in self.field_names}
+        unknown = [name for name in key if str(name).lower() not in by_name]
+        if unknown:
+            raise SchemaError(f"Key field(s) {unknown} are not in fields {self.field_names}")
+        return tuple(by_name[str(name).lower()] for name in key)
+
+    @property
+    def field_names(self):
+        """The output columns, in schema order."""
+        return [field.name for field in self.fields]
+
+    def extract(self, html_content, page_url=None):
+        """
+        Extracts all records and the next-page link from an HTML document.
+
+        Args:
+            html_content (str): The HTML content of the page.
+            page_url (str): The page's URL, used to resolve relative links.
+
+        Returns:
+            tuple: (list of record dictionaries, absolute next-page URL or None)
+        """
+        if not html_content:
+            return [], None
+
+        soup = BeautifulSoup(html_content, 'html.parser')
+        records = [
+            {field.name: field.extract(element, page_url) for field in self.fields}
+            for element in self.record_matcher.select(soup)
+        ]
+
+        next_url = None
+        if self.next_matcher is not None and page_url:
+            link = self.next_matcher.select_one(soup)
+            if link is not None and link.get('href'):
+                next_url = urljoin(page_url, link['href'])
+        return records, next_url
+
+
+def _compile(selector, where):
+    try:
+        return sv.compile(selector)
+    except sv.SelectorSyntaxError as e:
+        raise SchemaError(f"Invalid CSS selector for {where}: {selector!r} ({e})") from e
+
+
+def load_schema_spec(path):
+    """Reads a schema definition from a JSON or YAML file."""
+    with open(path, 'r', encoding='utf-8') as f:
+        if os.path.splitext(path)[1].lower() in ('.yaml', '.yml'):
+            if not YAML_AVAILABLE:
+                raise SchemaError("PyYAML is required to read YAML schemas (pip install pyyaml)")
+            try:
+                return yaml.safe_load(f)
+            except yaml.YAMLError as e:
+                raise SchemaError(f"Invalid YAML schema: {e}") from e
+        return json.load(f)
+
+
+def load_schema(path):
+    """Reads and compiles a schema file."""
+    return CompiledSchema(load_schema_spec(path))
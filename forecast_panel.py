@@ -0,0 +1,102 @@
+"""
+Reusable forecast panel for the weather apps.
+
+The panel creates one slot of widgets per forecast day the first time it is
+needed and keeps those widgets for the lifetime of the window. A new
+forecast only reconfigures labels whose text or icon actually changed, so
+searching does not flicker and does not create widgets that Tk has to
+garbage-collect later.
+"""
+
+import tkinter as tk
+from tkinter import ttk
+from typing import Dict, List
+from urllib.parse import urljoin
+
+
+def set_text(label, text):
+    """Updates a label's text only if it differs; returns True if it changed."""
+    if str(label.cget('text')) == text:
+        return False
+    label.config(text=text)
+    return True
+
+
+def icon_url(icon, base_url):
+    """
+    The full URL of a condition icon.
+
+    WeatherAPI returns protocol-relative CDN URLs ('//cdn.weatherapi.com/...'),
+    which are loaded over https; other paths, such as weather_stub_server's,
+    are resolved against the API root so offline runs stay offline.
+    """
+    if icon.startswith('//'):
+        return "https:" + icon
+    return urljoin(base_url, icon)
+
+
+class DaySlot:
+    """
+    The widgets for one forecast day.
+
+    ``icon_label.icon_url`` is the icon the label shows or is loading; the
+    caller resets it to None if loading fails, so the next update retries.
+    """
+
+    def __init__(self, parent, column):
+        self.frame = ttk.Frame(parent)
+        self.frame.grid(row=0, column=column, padx=10, pady=5, sticky="ns")
+        self.date_label = ttk.Label(self.frame, font=("Helvetica", 10, "bold"))
+        self.date_label.pack()
+        self.icon_label = ttk.Label(self.frame)
+        self.icon_label.pack()
+        self.icon_label.icon_url = None
+        self.condition_label = ttk.Label(self.frame)
+        self.condition_label.pack()
+        self.temp_label = ttk.Label(self.frame)
+        self.temp_label.pack()
+        self.visible = True
+
+    def show(self, visible):
+        if visible != self.visible:
+            self.frame.grid() if visible else self.frame.grid_remove()
+            self.visible = visible
+
+
+class ForecastPanel(ttk.LabelFrame):
+    """
+    A LabelFrame showing one column per forecast day.
+
+    Call ``update_days`` with WeatherAPI ``forecastday`` entries. It returns
+    the icons that need (re)loading as ``{url: [label, ...]}``, so the caller
+    decides how to fetch images; icons that did not change are left alone.
+    If a fetch fails, set the labels' ``icon_url`` back to None so the next
+    update asks for the icon again instead of leaving the label blank.
+    ``base_url`` is the API root that icon paths are resolved against.
+    """
+
+    def __init__(self, master, text="3-Day Forecast", base_url="", **kwargs):
+        super().__init__(master, text=text, **kwargs)
+        self.base_url = base_url
+        self.slots: List[DaySlot] = []
+
+    def update_days(self, forecast_days: List[Dict]) -> Dict[str, List[tk.Widget]]:
+        icons_needed: Dict[str, List[tk.Widget]] = {}
+        while len(self.slots) < len(forecast_days):
+            self.slots.append(DaySlot(self, len(self.slots)))
+
+        for i, slot in enumerate(self.slots):
+            if i >= len(forecast_days):
+                slot.show(False)
+                continue
+            day = forecast_days[i]['day']
+            set_text(slot.date_label, forecast_days[i]['date'])
+            set_text(slot.condition_label, day['condition']['text'])
+            set_text(slot.temp_label, f"H: {day['maxtemp_c']}°C\nL: {day['mintemp_c']}°C")
+
+            url = icon_url(day['condition']['icon'], self.base_url)
+            if url != slot.icon_label.icon_url:
+                slot.icon_label.icon_url = url
+                icons_needed.setdefault(url, []).append(slot.icon_label)
+            slot.show(True)
+        return icons_needed
@@ -0,0 +1,272 @@
+"""
+Format selection for the YouTube downloaders.
+
+Turns a user's choice (a format_id picked from the format list, or a
+preferred quality such as "1080p") into concrete yt-dlp format IDs. When
+ffmpeg is installed, the best video-only stream is paired with an audio
+stream and merged locally, which is how YouTube serves everything above
+720p. Among streams of the same resolution the one with the fewest
+expected bytes wins, so a more efficient codec is preferred over a larger
+file of the same quality.
+
+Selection works on an info dict that was already extracted, so a dry run
+that reports the expected download size costs no extra network requests.
+
+Usage:
+    python format_selection.py URL [--quality 1080p] [--format-id 137]
+"""
+
+import argparse
+import re
+import shutil
+import sys
+from dataclasses import dataclass
+from typing import Dict, List, Optional
+
+DEFAULT_QUALITY = "1080p"
+# Audio above this bitrate adds bytes without an audible difference for video
+AUDIO_TARGET_ABR = 160
+
+# Audio containers that can be merged into each video container without re-encoding
+COMPATIBLE_AUDIO = {
+    'mp4': ('m4a', 'mp4'),
+    'webm': ('webm',),
+}
+
+
+def ffmpeg_available() -> bool:
+    """True if ffmpeg is on the PATH, so separate streams can be merged."""
+    return shutil.which('ffmpeg') is not None
+
+
+def parse_quality(quality) -> Optional[int]:
+    """
+    Returns the maximum video height for a quality setting.
+
+    Accepts '1080p', '1080', 1080 or a resolution like '1920x1080'.
+    'best' and unrecognized values mean no limit (None).
+    """
+    if isinstance(quality, int):
+        return quality
+    text = str(quality or '').strip().lower()
+    match = re.fullmatch(r'\d+x(\d+)', text) or re.fullmatch(r'(\d+)p?', text)
+    return int(match.group(1)) if match else None
+
+
+def has_video(fmt: Dict) -> bool:
+    return fmt.get('vcodec') != 'none'
+
+
+def has_audio(fmt: Dict) -> bool:
+    return fmt.get('acodec') != 'none'
+
+
+def estimate_size(fmt: Optional[Dict], duration: Optional[float] = None) -> Optional[int]:
+    """Expected size of a format in bytes, from its filesize or bitrate."""
+    if not fmt:
+        return 0
+    size = fmt.get('filesize') or fmt.get('filesize_approx')
+    if size:
+        return int(size)
+    if fmt.get('tbr') and duration:
+        return int(fmt['tbr'] * 1000 / 8 * duration)
+    return None
+
+
+@dataclass
+class FormatChoice:
+    """The streams picked for a download."""
+    video: Optional[Dict]
+    audio: Optional[Dict] = None
+    duration: Optional[float] = None
+
+    @property
+    def format_spec(self) -> str:
+        """The yt-dlp format string, e.g. '137+140' or '18'."""
+        ids = [fmt['format_id'] for fmt in (self.video, self.audio) if fmt]
+        return '+'.join(ids)
+
+    @property
+    def needs_merge(self) -> bool:
+        return self.video is not None and self.audio is not None
+
+    @property
+    def merge_format(self) -> Optional[str]:
+        """Container for the merged file: mp4 when both streams fit, otherwise mkv."""
+        if not self.needs_merge:
+            return None
+        video_ext = self.video.get('ext')
+        if self.audio.get('ext') in COMPATIBLE_AUDIO.get(video_ext, ()):
+            return video_ext
+        return 'mkv'
+
+    @property
+    def expected_bytes(self) -> Optional[int]:
+        """Total expected download size, or None if a stream's size is unknown."""
+        sizes = [estimate_size(fmt, self.duration) for fmt in (self.video, self.audio) if fmt]
+        return None if not sizes or None in sizes else sum(sizes)
+
+    def ydl_options(self) -> Dict:
+        """Options to merge into a YoutubeDL's params for this choice."""
+        options = {'format': self.format_spec}
+        if self.merge_format:
+            options['merge_output_format'] = self.merge_format
+        return options
+
+    def describe(self) -> str:
+        """A one-line human readable summary."""
+        parts = []
+        for label, fmt in (('video', self.video), ('audio', self.audio)):
+            if fmt:
+                detail = fmt.get('resolution') or (f"{fmt.get('abr', '?')}k" if label == 'audio' else '')
+                parts.append(f"{label} {fmt['format_id']} ({fmt.get('ext')}, {detail})")
+        size = self.expected_bytes
+        size_text = f"{size / 1_000_000:.1f} MB" if size is not None else "unknown size"
+        merge = f", merged to {self.merge_format} with ffmpeg" if self.needs_merge else ""
+        return f"{' + '.join(parts)}: {size_text}{merge}"
+
+
+def _size_key(fmt: Dict, duration) -> float:
+    size = estimate_size(fmt, duration)
+    return size if size is not None else float('inf')
+
+
+def best_audio(formats: List[Dict], video: Optional[Dict] = None, duration=None) -> Optional[Dict]:
+    """
+    Picks the audio-only stream to pair with a video stream.
+
+    Prefers containers that merge into the video's container without
+    re-encoding, then the highest bitrate up to AUDIO_TARGET_ABR, then the
+    smallest file.
+    """
+    audio = [fmt for fmt in formats if has_audio(fmt) and not has_video(fmt)]
+    if not audio:
+        return None
+    compatible = COMPATIBLE_AUDIO.get(video.get('ext') if video else None, ())
+
+    def rank(fmt):
+        abr = fmt.get('abr') or 0
+        return (fmt.get('ext') in compatible, min(abr, AUDIO_TARGET_ABR), -_size_key(fmt, duration))
+    return max(audio, key=rank)
+
+
+def available_video_formats(info: Dict, allow_merge: Optional[bool] = None) -> List[Dict]:
+    """
+    Formats a user can pick from, highest resolution first.
+
+    Video-only formats are included only when they can be merged with audio.
+    """
+    if allow_merge is None:
+        allow_merge = ffmpeg_available()
+    formats = [fmt for fmt in info.get('formats') or [] if has_video(fmt)
+               and (has_audio(fmt) or allow_merge)]
+    return sorted(formats, key=lambda fmt: (fmt.get('height') or 0, fmt.get('fps') or 0), reverse=True)
+
+
+def choose_for_format_id(info: Dict, format_id: str, allow_merge: Optional[bool] = None) -> Optional[FormatChoice]:
+    """Builds the choice for a specific format_id, adding audio if it is video-only."""
+    if allow_merge is None:
+        allow_merge = ffmpeg_available()
+    formats = info.get('formats') or []
+    video = next((fmt for fmt in formats if str(fmt.get('format_id')) == str(format_id)), None)
+    if video is None:
+        return None
+    duration = info.get('duration')
+    if has_audio(video) or not has_video(video) or not allow_merge:
+        return FormatChoice(video, duration=duration)
+    return FormatChoice(video, best_audio(formats, video, duration), duration=duration)
+
+
+def choose_for_quality(info: Dict, quality=DEFAULT_QUALITY, allow_merge: Optional[bool] = None) -> Optional[FormatChoice]:
+    """
+    Picks the streams for a preferred quality.
+
+    Takes the highest resolution not above the quality limit (or the lowest
+    available if everything is above it), then the stream of that resolution
+    with the fewest expected bytes.
+    """
+    candidates = available_video_formats(info, allow_merge)
+    if not candidates:
+        return None
+    duration = info.get('duration')
+    max_height = parse_quality(quality)
+
+    if max_height:
+        within = [fmt for fmt in candidates if (fmt.get('height') or 0) <= max_height]
+        candidates = within or [min(candidates, key=lambda fmt: fmt.get('height') or 0)]
+    height = max(fmt.get('height') or 0 for fmt in candidates)
+    same_height = [fmt for fmt in candidates if (fmt.get('height') or 0) == height]
+
+    # Prefer merging a video-only stream (higher quality per byte) over a progressive one
+    video = min(same_height, key=lambda fmt: (has_audio(fmt), -(fmt.get('fps') or 0), _size_key(fmt, duration)))
+    if has_audio(video):
+        return FormatChoice(video, duration=duration)
+    return FormatChoice(video, best_audio(info.get('formats') or [], video, duration), duration=duration)
+
+
+def select_format(info: Dict, selection: Optional[str] = None, quality=DEFAULT_QUALITY,
+                  allow_merge: Optional[bool] = None) -> Optional[FormatChoice]:
+    """
+    Resolves a user's selection to concrete streams.
+
+    Args:
+        info: A video's info dict from extract_info.
+        selection: A format_id, or a quality/resolution such as '720p' or
+            '1280x720'. Empty or 'best' falls back to ``quality``.
+        quality: The preferred quality used when nothing was selected.
+        allow_merge: Whether separate video and audio may be merged;
+            defaults to whether ffmpeg is installed.
+
+    Returns:
+        A FormatChoice, or None if the video lists no formats.
+    """
+    if selection and selection != 'best':
+        choice = choose_for_format_id(info, selection, allow_merge)
+        if choice:
+            return choice
+        if parse_quality(selection):
+            return choose_for_quality(info, selection, allow_merge)
+    return choose_for_quality(info, quality, allow_merge)
+
+
+def fallback_format_spec(quality=DEFAULT_QUALITY, allow_merge: Optional[bool] = None) -> str:
+    """A yt-dlp format string for when the formats are not known in advance."""
+    if allow_merge is None:
+        allow_merge = ffmpeg_available()
+    height = parse_quality(quality)
+    limit = f"[height<=?{height}]" if height else ""
+    if allow_merge:
+        return f"bestvideo{limit}+bestaudio/best{limit}"
+    return f"best{limit}"
+
+
+def main(argv=None) -> int:
+    """Command-line dry run: shows which streams would be downloaded and their size."""
+    import yt_dlp
+
+    parser = argparse.ArgumentParser(description="Show which formats would be downloaded for a video.")
+    parser.add_argument('url')
+    parser.add_argument('--quality', default=DEFAULT_QUALITY, help=f"preferred quality (default: {DEFAULT_QUALITY})")
+    parser.add_argument('--format-id', help="a specific format_id instead of a quality")
+    parser.add_argument('--no-merge', action='store_true', help="only consider formats with both video and audio")
+    args = parser.parse_args(argv)
+
+    with yt_dlp.YoutubeDL({'quiet': True, 'no_warnings': True}) as ydl:
+        try:
+            info = ydl.extract_info(args.url, download=False)
+        except yt_dlp.utils.DownloadError as e:
+            print(f"Could not extract video information: {e}")
+            return 1
+
+    choice = select_format(info, args.format_id, args.quality, allow_merge=False if args.no_merge else None)
+    if choice is None:
+        print("No downloadable formats found")
+        return 1
+    print(info.get('title', args.url))
+    print(f"format: {choice.format_spec}")
+    print(choice.describe())
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,79 @@
+"""
+Two-tier cache for weather condition icons.
+
+WeatherAPI uses a small, fixed set of icon URLs, so each one only has to be
+downloaded once ever and decoded once per run:
+
+- IconDiskCache keeps the raw image bytes on disk, keyed by URL, so icons
+  survive restarts without another network request.
+- PhotoImageLRU keeps decoded ImageTk.PhotoImage objects in memory, so an
+  icon that is already loaded is shown without decoding it again.
+"""
+
+import hashlib
+import os
+import threading
+from collections import OrderedDict
+from typing import Optional
+from urllib.parse import urlparse
+
+DEFAULT_ICON_DIR = "icon_cache"
+DEFAULT_MAX_PHOTOS = 64
+
+
+class IconDiskCache:
+    """Raw icon bytes stored as files named after a hash of the URL; thread-safe."""
+
+    def __init__(self, directory: str = DEFAULT_ICON_DIR):
+        self.directory = directory
+        os.makedirs(directory, exist_ok=True)
+
+    def path_for(self, url: str) -> str:
+        ext = os.path.splitext(urlparse(url).path)[1] or '.img'
+        return os.path.join(self.directory, hashlib.sha1(url.encode('utf-8')).hexdigest() + ext)
+
+    def get(self, url: str) -> Optional[bytes]:
+        try:
+            with open(self.path_for(url), 'rb') as f:
+                return f.read()
+        except OSError:
+            return None
+
+    def put(self, url: str, data: bytes):
+        path = self.path_for(url)
+        # Unique temp name so two threads fetching the same icon don't clash
+        temp_path = f"{path}.{threading.get_ident()}.tmp"
+        try:
+            with open(temp_path, 'wb') as f:
+                f.write(data)
+            os.replace(temp_path, path)
+        except OSError as e:
+            print(f"Could not cache icon {url}: {e}")
+
+
+class PhotoImageLRU:
+    """
+    Least-recently-used cache of decoded PhotoImages.
+
+    Tk objects must only be touched from the Tk thread, so this class is not
+    thread-safe and should only be used there.
+    """
+
+    def __init__(self, max_entries: int = DEFAULT_MAX_PHOTOS):
+        self.max_entries = max_entries
+        self._photos = OrderedDict()
+
+    def __contains__(self, url: str) -> bool:
+        return url in self._photos
+
+    def get(self, url: str):
+        photo = self._photos.get(url)
+        if photo is not None:
+            self._photos.move_to_end(url)
+        return photo
+
+    def put(self, url: str, photo):
+        self._photos[url] = photo
+        self._photos.move_to_end(url)
+        while len(self._photos) > self.max_entries:
+            self._photos.popitem(last=False)
@@ -0,0 +1,294 @@
+"""
+Click analytics for short links.
+
+Events go to an append-only JSON-lines log: one "created" event per new
+short link and one "resolved" event per redirect served by the local
+shortener. Writing an event is a buffered append, cheap enough for the
+redirect server's hot path.
+
+A rollup job reads the log from where the previous run stopped and folds
+the new events into per-link, per-day counters in SQLite. The byte offset
+is saved in the same transaction as the counters, so every event is
+counted exactly once even if a rollup is interrupted. All queries read the
+rollup tables; the raw log is never scanned to answer them.
+
+Only links created with the "Local" service produce click events; public
+services redirect on their own servers.
+
+Usage:
+    python link_analytics.py rollup [--log link_events.jsonl] [--db link_analytics.db]
+    python link_analytics.py top [--days 7] [--limit 10]
+    python link_analytics.py daily [--days 30]
+    python link_analytics.py stats http://127.0.0.1:8080/1
+"""
+
+import argparse
+import json
+import os
+import sqlite3
+import sys
+import threading
+import time
+from collections import Counter
+from typing import Callable, Dict, List, Optional
+
+DEFAULT_EVENT_LOG = "link_events.jsonl"
+DEFAULT_ANALYTICS_DB = "link_analytics.db"
+FLUSH_EVENTS = 1000
+FLUSH_INTERVAL = 1.0
+
+CREATED = 'created'
+RESOLVED = 'resolved'
+
+
+def day_of(timestamp: float) -> str:
+    return time.strftime('%Y-%m-%d', time.localtime(timestamp))
+
+
+class EventLog:
+    """
+    Appends link events to a JSON-lines file; thread-safe.
+
+    Events are buffered and written every ``FLUSH_EVENTS`` events, every
+    ``FLUSH_INTERVAL`` seconds by a background thread, and on ``flush`` or
+    ``close``.
+    """
+
+    def __init__(self, path: str = DEFAULT_EVENT_LOG):
+        self.path = path
+        self._lock = threading.Lock()
+        self._file = open(path, 'a', encoding='utf-8')
+        self._buffer: List[str] = []
+        self._closed = threading.Event()
+        threading.Thread(target=self._flush_periodically, name="event-log", daemon=True).start()
+
+    def record(self, event: str, link: str, **fields):
+        self._append(json.dumps(dict(ts=round(time.time(), 3), event=event, link=link, **fields), ensure_ascii=False))
+
+    def _append(self, line: str):
+        with self._lock:
+            self._buffer.append(line + '\n')
+            if len(self._buffer) >= FLUSH_EVENTS:
+                self._flush_locked()
+
+    def record_created(self, link: str, long_url: str, service: str):
+        self.record(CREATED, link, long_url=long_url, service=service)
+
+    def record_resolved(self, link: str, found: bool = True):
+        # Called for every redirect, so the line is formatted by hand instead of through a dict
+        self._append(f'{{"ts": {time.time():.3f}, "event": "{RESOLVED}", "link": {json.dumps(link, ensure_ascii=False)}, '
+                     f'"found": {"true" if found else "false"}}}')
+
+    def resolve_callback(self, base_url: str) -> Callable[[str, bool], None]:
+        """An ``on_resolve(code, found)`` callback for local_shortener.RedirectServer."""
+        return lambda code, found: self.record_resolved(base_url + code, found)
+
+    def _flush_locked(self):
+        if self._buffer:
+            self._file.write(''.join(self._buffer))
+            self._file.flush()
+            self._buffer.clear()
+
+    def _flush_periodically(self):
+        while not self._closed.wait(FLUSH_INTERVAL):
+            self.flush()
+
+    def flush(self):
+        with self._lock:
+            if not self._file.closed:
+                self._flush_locked()
+
+    def close(self):
+        self._closed.set()
+        with self._lock:
+            self._flush_locked()
+            self._file.close()
+
+
+class AnalyticsStore:
+    """Per-link, per-day counters rolled up from an EventLog; safe to share between threads."""
+
+    def __init__(self, path: str = DEFAULT_ANALYTICS_DB):
+        self.path = path
+        self._lock = threading.Lock()
+        self._rollup_lock = threading.Lock()  # Two rollups must not read from the same offset
+        self._conn = sqlite3.connect(path, check_same_thread=False)
+        self._conn.row_factory = sqlite3.Row
+        self._conn.executescript(
+            """CREATE TABLE IF NOT EXISTS links (
+                   link TEXT PRIMARY KEY,
+                   long_url TEXT,
+                   service TEXT,
+                   created_at REAL
+               );
+               CREATE TABLE IF NOT EXISTS daily_counts (
+                   link TEXT NOT NULL,
+                   day TEXT NOT NULL,
+                   created INTEGER NOT NULL DEFAULT 0,
+                   clicks INTEGER NOT NULL DEFAULT 0,
+                   misses INTEGER NOT NULL DEFAULT 0,
+                   PRIMARY KEY (link, day)
+               );
+               CREATE INDEX IF NOT EXISTS daily_counts_day ON daily_counts (day);
+               CREATE TABLE IF NOT EXISTS rollup_state (
+                   log_path TEXT PRIMARY KEY,
+                   offset INTEGER NOT NULL,
+                   updated_at REAL NOT NULL
+               );"""
+        )
+        self._conn.commit()
+
+    def rollup(self, log_path: str = DEFAULT_EVENT_LOG) -> int:
+        """
+        Folds events appended to `log_path` since the last rollup into the counters.
+
+        Returns the number of events processed. A trailing line that is
+        still being written is left for the next run; a log that shrank
+        (replaced or truncated) is read again from the start.
+        """
+        with self._rollup_lock:
+            return self._rollup(log_path)
+
+    def _rollup(self, log_path: str) -> int:
+        key = os.path.abspath(log_path)
+        with self._lock:
+            row = self._conn.execute("SELECT offset FROM rollup_state WHERE log_path = ?", (key,)).fetchone()
+        offset = row['offset'] if row else 0
+        if not os.path.exists(log_path):
+            return 0
+        if os.path.getsize(log_path) < offset:
+            offset = 0
+
+        counts: Counter = Counter()
+        links: Dict[str, tuple] = {}
+        days: Dict[int, str] = {}  # Minute -> day, so localtime runs once per minute of events
+        events = 0
+        with open(log_path, 'rb') as f:
+            f.seek(offset)
+            for line in f:
+                if not line.endswith(b'\n'):
+                    break
+                offset += len(line)
+                try:
+                    event = json.loads(line)
+                    link, ts = event['link'], float(event['ts'])
+                except (ValueError, KeyError, TypeError):
+                    continue
+                events += 1
+                minute = int(ts // 60)
+                day = days.get(minute)
+                if day is None:
+                    day = days[minute] = day_of(ts)
+                if event.get('event') == CREATED:
+                    counts[link, day, 'created'] += 1
+                    links.setdefault(link, (link, event.get('long_url'), event.get('service'), ts))
+                elif event.get('event') == RESOLVED:
+                    counts[link, day, 'clicks' if event.get('found', True) else 'misses'] += 1
+
+        per_day: Dict[tuple, Dict[str, int]] = {}
+        for (link, day, field), count in counts.items():
+            per_day.setdefault((link, day), {'created': 0, 'clicks': 0, 'misses': 0})[field] = count
+        with self._lock, self._conn:
+            self._conn.executemany("INSERT OR IGNORE INTO links VALUES (?, ?, ?, ?)", links.values())
+            self._conn.executemany(
+                """INSERT INTO daily_counts (link, day, created, clicks, misses) VALUES (?, ?, ?, ?, ?)
+                   ON CONFLICT (link, day) DO UPDATE SET created = created + excluded.created,
+                       clicks = clicks + excluded.clicks, misses = misses + excluded.misses""",
+                [(link, day, c['created'], c['clicks'], c['misses']) for (link, day), c in per_day.items()])
+            self._conn.execute("INSERT OR REPLACE INTO rollup_state VALUES (?, ?, ?)", (key, offset, time.time()))
+        return events
+
+    # --- Queries (rollup tables only) ---
+
+    def _query(self, sql: str, params=()) -> List[Dict]:
+        with self._lock:
+            return [dict(row) for row in self._conn.execute(sql, params)]
+
+    def link_stats(self, link: str, days: Optional[int] = None) -> Optional[Dict]:
+        """Totals and a per-day breakdown for one link, or None if it was never seen."""
+        since = _since_day(days)
+        per_day = self._query("SELECT day, clicks, misses FROM daily_counts WHERE link = ? AND day >= ? ORDER BY day",
+                              (link, since))
+        info = self._query("SELECT long_url, service, created_at FROM links WHERE link = ?", (link,))
+        if not per_day and not info:
+            return None
+        stats = dict(info[0]) if info else {'long_url': None, 'service': None, 'created_at': None}
+        stats.update(link=link, clicks=sum(d['clicks'] for d in per_day),
+                     misses=sum(d['misses'] for d in per_day), days=per_day)
+        return stats
+
+    def top_links(self, limit: int = 10, days: Optional[int] = None) -> List[Dict]:
+        """The most clicked links, optionally only counting the last `days` days."""
+        return self._query(
+            """SELECT c.link, l.long_url, l.service, SUM(c.clicks) AS clicks
+               FROM daily_counts c LEFT JOIN links l ON l.link = c.link
+               WHERE c.day >= ? GROUP BY c.link HAVING SUM(c.clicks) > 0
+               ORDER BY clicks DESC, c.link LIMIT ?""", (_since_day(days), limit))
+
+    def daily_totals(self, days: Optional[int] = None) -> List[Dict]:
+        """Links created and clicks served per day."""
+        return self._query(
+            """SELECT day, SUM(created) AS created, SUM(clicks) AS clicks, SUM(misses) AS misses
+               FROM daily_counts WHERE day >= ? GROUP BY day ORDER BY day""", (_since_day(days),))
+
+    def close(self):
+        with self._lock:
+            self._conn.close()
+
+
+def _since_day(days: Optional[int]) -> str:
+    # Counters are keyed by 'YYYY-MM-DD', so an empty string matches every day
+    return day_of(time.time() - (days - 1) * 86400) if days else ''
+
+
+def main(argv=None) -> int:
+    """Command-line entry point for the rollup job and the queries."""
+    parser = argparse.ArgumentParser(description="Roll up and query short-link analytics.")
+    parser.add_argument('command', choices=['rollup', 'top', 'daily', 'stats'])
+    parser.add_argument('link', nargs='?', help="short URL for 'stats'")
+    parser.add_argument('--log', default=DEFAULT_EVENT_LOG, help=f"event log (default: {DEFAULT_EVENT_LOG})")
+    parser.add_argument('--db', default=DEFAULT_ANALYTICS_DB, help=f"rollup database (default: {DEFAULT_ANALYTICS_DB})")
+    parser.add_argument('--days', type=int, help="only count the last N days")
+    parser.add_argument('--limit', type=int, default=10, help="links listed by 'top' (default: 10)")
+    parser.add_argument('--no-rollup', action='store_true', help="query without rolling up new events first")
+    parser.add_argument('--json', action='store_true', help="print results as JSON")
+    args = parser.parse_args(argv)
+    if args.command == 'stats' and not args.link:
+        parser.error("'stats' needs a short URL")
+
+    store = AnalyticsStore(args.db)
+    if args.command == 'rollup' or not args.no_rollup:
+        started = time.perf_counter()
+        events = store.rollup(args.log)
+        if args.command == 'rollup':
+            print(f"Rolled up {events} events in {time.perf_counter() - started:.2f}s")
+            return 0
+
+    if args.command == 'top':
+        result = store.top_links(args.limit, args.days)
+    elif args.command == 'daily':
+        result = store.daily_totals(args.days)
+    else:
+        result = store.link_stats(args.link, args.days)
+        if result is None:
+            print(f"No events for {args.link}")
+            return 1
+
+    if args.json:
+        print(json.dumps(result, indent=2))
+    elif args.command == 'top':
+        for row in result:
+            print(f"{row['clicks']:>8}  {row['link']}  {row['long_url'] or ''}")
+    elif args.command == 'daily':
+        for row in result:
+            print(f"{row['day']}  created {row['created']:>6}  clicks {row['clicks']:>8}  misses {row['misses']:>6}")
+    else:
+        print(f"{result['link']} -> {result['long_url']} ({result['service']})")
+        print(f"Clicks: {result['clicks']}  Misses: {result['misses']}")
+        for row in result['days']:
+            print(f"  {row['day']}  {row['clicks']:>8}")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
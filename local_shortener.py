@@ -0,0 +1,334 @@
+"""
+Self-hosted URL shortener: base62 codes, SQLite storage and an asyncio redirect server.
+
+Links are stored in SQLite with an integer primary key; the short code is
+that ID in base62, so creating a link needs no collision checks. Every
+link is also kept in two in-memory dicts (code -> URL and URL -> code), so
+resolving a redirect or re-shortening a known URL never touches the
+database.
+
+The redirect server is a minimal HTTP/1.1 server on asyncio streams with
+keep-alive. It answers ``GET /<code>`` with a 302 to the long URL, and
+``HEAD`` with the same headers and no body. Only URLs that pass
+url_validation.is_valid_url are stored, so a URL can never smuggle a CR/LF
+into the ``Location`` header.
+
+Usage:
+    python local_shortener.py serve [--port 8080] [--events link_events.jsonl]
+    python local_shortener.py shorten https://example.com/some/long/path
+    python local_shortener.py bench [--requests 100000] [--connections 64]
+"""
+
+import argparse
+import asyncio
+import os
+import re
+import sqlite3
+import string
+import sys
+import threading
+import time
+from typing import Callable, Dict, Optional
+
+from link_analytics import EventLog
+from url_validation import is_valid_url
+
+DEFAULT_DB = "local_links.db"
+DEFAULT_HOST = "127.0.0.1"
+DEFAULT_PORT = 8080
+BASE_URL = os.environ.get("LOCAL_SHORTENER_URL", f"http://{DEFAULT_HOST}:{DEFAULT_PORT}/")
+
+ALPHABET = string.digits + string.ascii_letters
+_INDEX = {char: i for i, char in enumerate(ALPHABET)}
+_CODE = re.compile(r'[0-9A-Za-z]{1,11}\Z')  # 11 base62 digits cover any SQLite rowid
+
+
+def base62_encode(number: int) -> str:
+    if number < 0:
+        raise ValueError("Only non-negative numbers can be encoded")
+    if number == 0:
+        return ALPHABET[0]
+    chars = []
+    while number:
+        number, rem = divmod(number, 62)
+        chars.append(ALPHABET[rem])
+    return ''.join(reversed(chars))
+
+
+def is_code(code: str) -> bool:
+    """True if `code` could be a short code, so '/favicon.ico' and the like are not counted as misses."""
+    return _CODE.match(code) is not None
+
+
+def base62_decode(code: str) -> int:
+    number = 0
+    for char in code:
+        number = number * 62 + _INDEX[char]
+    return number
+
+
+class LinkStore:
+    """SQLite-backed links with an in-memory index in both directions; thread-safe."""
+
+    def __init__(self, path: str = DEFAULT_DB, base_url: str = BASE_URL):
+        self.path = path
+        self.base_url = base_url if base_url.endswith('/') else base_url + '/'
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(path, check_same_thread=False)
+        self._conn.execute(
+            """CREATE TABLE IF NOT EXISTS links (
+                   id INTEGER PRIMARY KEY AUTOINCREMENT,
+                   long_url TEXT NOT NULL UNIQUE,
+                   created_at REAL NOT NULL
+               )"""
+        )
+        self._conn.commit()
+        self.by_code: Dict[str, str] = {}
+        self.by_url: Dict[str, str] = {}
+        for link_id, long_url in self._conn.execute("SELECT id, long_url FROM links"):
+            if not is_valid_url(long_url):
+                continue  # Stored before URLs were validated; never redirect to it
+            code = base62_encode(link_id)
+            self.by_code[code] = long_url
+            self.by_url[long_url] = code
+
+    def __len__(self) -> int:
+        return len(self.by_code)
+
+    def shorten(self, long_url: str) -> str:
+        """Returns the code for a URL, creating it if needed; raises ValueError for an invalid URL."""
+        code = self.by_url.get(long_url)
+        if code is not None:
+            return code
+        if not is_valid_url(long_url):
+            raise ValueError(f"Not a valid http(s) URL: {long_url!r}")
+        with self._lock:
+            code = self.by_url.get(long_url)  # Another thread may have added it meanwhile
+            if code is None:
+                cursor = self._conn.execute("INSERT INTO links (long_url, created_at) VALUES (?, ?)",
+                                            (long_url, time.time()))
+                self._conn.commit()
+                code = base62_encode(cursor.lastrowid)
+                self.by_code[code] = long_url
+                self.by_url[long_url] = code
+        return code
+
+    def shorten_url(self, long_url: str) -> str:
+        """Returns the full short URL for a long URL."""
+        return self.base_url + self.shorten(long_url)
+
+    def resolve(self, code: str) -> Optional[str]:
+        """Returns the long URL for a code, or None; never queries the database."""
+        return self.by_code.get(code)
+
+    def close(self):
+        with self._lock:
+            self._conn.close()
+
+
+_NOT_FOUND = (b"HTTP/1.1 404 Not Found\r\nContent-Type: text/plain\r\n"
+              b"Content-Length: 9\r\n\r\nNot Found")
+_NOT_FOUND_HEAD = _NOT_FOUND[:-len(b"Not Found")]  # Same headers, no body
+_BAD_REQUEST = (b"HTTP/1.1 400 Bad Request\r\nContent-Length: 0\r\nConnection: close\r\n\r\n")
+
+
+class RedirectServer:
+    """
+    Answers ``GET /<code>`` with a redirect to the stored URL.
+
+    Args:
+        store: The LinkStore to resolve codes from.
+        on_resolve: Optional callback ``(code, found)`` called for every
+            request for a well-formed code, e.g. to record click analytics.
+    """
+
+    def __init__(self, store: LinkStore, on_resolve: Optional[Callable[[str, bool], None]] = None):
+        self.store = store
+        self.on_resolve = on_resolve
+        self.server: Optional[asyncio.AbstractServer] = None
+
+    async def start(self, host: str = DEFAULT_HOST, port: int = DEFAULT_PORT):
+        self.server = await asyncio.start_server(self.handle, host, port, backlog=1024)
+        return self.server
+
+    async def handle(self, reader: asyncio.StreamReader, writer: asyncio.StreamWriter):
+        try:
+            while True:
+                try:
+                    head = await reader.readuntil(b"\r\n\r\n")
+                except (asyncio.IncompleteReadError, asyncio.LimitOverrunError, ConnectionError):
+                    return
+                request_line, _, headers = head.partition(b"\r\n")
+                parts = request_line.split(b" ")
+                if len(parts) != 3 or parts[0] not in (b"GET", b"HEAD"):
+                    writer.write(_BAD_REQUEST)
+                    return
+
+                code = parts[1][1:].split(b"?", 1)[0].decode('ascii', 'replace')
+                long_url = self.store.resolve(code)
+                if self.on_resolve and (long_url is not None or is_code(code)):
+                    self.on_resolve(code, long_url is not None)
+                if long_url is None:
+                    writer.write(_NOT_FOUND if parts[0] == b"GET" else _NOT_FOUND_HEAD)
+                else:
+                    writer.write(b"HTTP/1.1 302 Found\r\nLocation: " + long_url.encode('utf-8')
+                                 + b"\r\nContent-Length: 0\r\n\r\n")
+
+                if parts[2] == b"HTTP/1.0" or b"connection: close" in headers.lower():
+                    return
+                # Only wait for the socket when its buffer fills, so pipelined requests stay cheap
+                if writer.transport.get_write_buffer_size() > 65536:
+                    await writer.drain()
+        finally:
+            writer.close()
+
+    def close(self):
+        if self.server:
+            self.server.close()
+
+
+def serve_in_thread(store: LinkStore, host: str = DEFAULT_HOST, port: int = DEFAULT_PORT,
+                    on_resolve: Optional[Callable[[str, bool], None]] = None) -> RedirectServer:
+    """Starts the redirect server on its own event loop in a daemon thread."""
+    server = RedirectServer(store, on_resolve)
+    started = threading.Event()
+    errors = []
+
+    def run():
+        loop = asyncio.new_event_loop()
+        try:
+            loop.run_until_complete(server.start(host, port))
+        except OSError as e:
+            errors.append(e)
+            started.set()
+            return
+        started.set()
+        loop.run_forever()
+
+    threading.Thread(target=run, name="redirect-server", daemon=True).start()
+    started.wait()
+    if errors:
+        raise errors[0]
+    return server
+
+
+async def _bench_client(host, port, codes, count, pipeline):
+    """Sends `count` keep-alive requests in batches of `pipeline` and returns how many redirected."""
+    reader, writer = await asyncio.open_connection(host, port)
+    redirects = 0
+    sent = 0
+    try:
+        while sent < count:
+            batch = min(pipeline, count - sent)
+            writer.write(b"".join(f"GET /{codes[(sent + i) % len(codes)]} HTTP/1.1\r\nHost: x\r\n\r\n".encode()
+                                  for i in range(batch)))
+            sent += batch
+            for _ in range(batch):
+                head = await reader.readuntil(b"\r\n\r\n")
+                if head.startswith(b"HTTP/1.1 302"):
+                    redirects += 1
+                elif b"Content-Length: 9" in head:
+                    await reader.readexactly(9)
+    finally:
+        writer.close()
+    return redirects
+
+
+def _bench_server(path, port, ready):
+    store = LinkStore(path)
+    loop = asyncio.new_event_loop()
+    loop.run_until_complete(RedirectServer(store).start(DEFAULT_HOST, port))
+    ready.set()
+    loop.run_forever()
+
+
+def benchmark(requests: int = 100000, connections: int = 64, pipeline: int = 16, links: int = 10000,
+              port: int = 8099) -> float:
+    """
+    Measures redirects per second for a server running in its own process (one core).
+
+    Returns the measured rate.
+    """
+    import multiprocessing
+    import tempfile
+
+    path = os.path.join(tempfile.mkdtemp(), "bench_links.db")
+    store = LinkStore(path)
+    codes = [store.shorten(f"https://example.com/page/{i}") for i in range(links)]
+    store.close()
+
+    ready = multiprocessing.Event()
+    process = multiprocessing.Process(target=_bench_server, args=(path, port, ready), daemon=True)
+    process.start()
+    ready.wait(10)
+
+    async def run():
+        per_client = requests // connections
+        return await asyncio.gather(*(_bench_client(DEFAULT_HOST, port, codes, per_client, pipeline)
+                                      for _ in range(connections)))
+
+    try:
+        started = time.perf_counter()
+        redirected = sum(asyncio.run(run()))
+        elapsed = time.perf_counter() - started
+    finally:
+        process.terminate()
+        process.join()
+    rate = redirected / elapsed
+    print(f"{redirected} redirects over {connections} connections in {elapsed:.2f}s: {rate:,.0f} req/s")
+    return rate
+
+
+def main(argv=None) -> int:
+    parser = argparse.ArgumentParser(description="Local URL shortener and redirect server.")
+    sub = parser.add_subparsers(dest='command', required=True)
+    serve_parser = sub.add_parser('serve', help="run the redirect server")
+    serve_parser.add_argument('--host', default=DEFAULT_HOST)
+    serve_parser.add_argument('--port', type=int, default=DEFAULT_PORT)
+    serve_parser.add_argument('--events', help="append a click event per redirect to this log")
+    shorten_parser = sub.add_parser('shorten', help="create short links")
+    shorten_parser.add_argument('urls', nargs='+')
+    bench_parser = sub.add_parser('bench', help="measure redirect throughput")
+    bench_parser.add_argument('--requests', type=int, default=100000)
+    bench_parser.add_argument('--connections', type=int, default=64)
+    bench_parser.add_argument('--pipeline', type=int, default=16, help="requests in flight per connection")
+    for p in (serve_parser, shorten_parser):
+        p.add_argument('--db', default=DEFAULT_DB)
+    args = parser.parse_args(argv)
+
+    if args.command == 'bench':
+        benchmark(args.requests, args.connections, args.pipeline)
+        return 0
+
+    store = LinkStore(args.db)
+    if args.command == 'shorten':
+        failed = 0
+        for url in args.urls:
+            try:
+                print(f"{url}\t{store.shorten_url(url)}")
+            except ValueError as e:
+                print(f"Error: {e}", file=sys.stderr)
+                failed += 1
+        return 1 if failed else 0
+
+    events = EventLog(args.events) if args.events else None
+    on_resolve = events.resolve_callback(store.base_url) if events else None
+
+    async def run():
+        server = await RedirectServer(store, on_resolve).start(args.host, args.port)
+        print(f"Redirecting {len(store)} links at http://{args.host}:{args.port}/")
+        async with server:
+            await server.serve_forever()
+
+    try:
+        asyncio.run(run())
+    except KeyboardInterrupt:
+        pass
+    finally:
+        if events:
+            events.close()
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
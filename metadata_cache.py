@@ -0,0 +1,129 @@
+"""
+On-disk cache of yt-dlp video metadata.
+
+extract_info() takes seconds per URL, and the downloaders used to call it
+twice: once to show formats and again inside the download. This cache keeps
+the sanitized info dict in SQLite, keyed by the normalized video ID, so the
+download phase can reuse what the info phase fetched. Entries expire after
+a TTL (stream URLs inside the info dict stop working after a few hours) and
+the least recently used entries are evicted once the cache is full.
+"""
+
+import json
+import sqlite3
+import threading
+import time
+from typing import Dict, Optional
+
+from yt_dlp.utils import DownloadError, ReExtractInfo
+
+from download_archive import extract_video_id
+
+DEFAULT_CACHE_FILE = "metadata_cache.db"
+DEFAULT_TTL = 3600
+DEFAULT_MAX_ENTRIES = 500
+
+
+def cache_key(url: str) -> str:
+    """Normalizes a URL to 'extractor:video_id', or the stripped URL if the ID is unknown."""
+    key = extract_video_id(url)
+    return f"{key[0]}:{key[1]}" if key else url.strip()
+
+
+class MetadataCache:
+    """A TTL'd, size-bounded LRU cache of info dicts stored in SQLite."""
+
+    def __init__(self, path: str = DEFAULT_CACHE_FILE, ttl: float = DEFAULT_TTL,
+                 max_entries: int = DEFAULT_MAX_ENTRIES):
+        self.path = path
+        self.ttl = ttl
+        self.max_entries = max_entries
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(path, check_same_thread=False)
+        self._conn.execute(
+            """CREATE TABLE IF NOT EXISTS metadata (
+                   key TEXT PRIMARY KEY,
+                   info TEXT NOT NULL,
+                   fetched_at REAL NOT NULL,
+                   last_access REAL NOT NULL
+               )"""
+        )
+        self._conn.execute("CREATE INDEX IF NOT EXISTS metadata_last_access ON metadata (last_access)")
+        self._conn.commit()
+
+    def get(self, url: str) -> Optional[Dict]:
+        """Returns a fresh cached info dict for the URL, or None."""
+        key = cache_key(url)
+        now = time.time()
+        with self._lock:
+            row = self._conn.execute("SELECT info, fetched_at FROM metadata WHERE key = ?", (key,)).fetchone()
+            if row is None:
+                return None
+            if now - row[1] > self.ttl:
+                self._conn.execute("DELETE FROM metadata WHERE key = ?", (key,))
+                self._conn.commit()
+                return None
+            self._conn.execute("UPDATE metadata SET last_access = ? WHERE key = ?", (now, key))
+            self._conn.commit()
+        return json.loads(row[0])
+
+    def put(self, url: str, info: Dict):
+        """Stores a JSON-serializable info dict and evicts the least recently used overflow."""
+        now = time.time()
+        with self._lock:
+            self._conn.execute("INSERT OR REPLACE INTO metadata VALUES (?, ?, ?, ?)",
+                               (cache_key(url), json.dumps(info), now, now))
+            self._conn.execute(
+                """DELETE FROM metadata WHERE key IN (
+                       SELECT key FROM metadata ORDER BY last_access DESC LIMIT -1 OFFSET ?
+                   )""", (self.max_entries,))
+            self._conn.commit()
+
+    def invalidate(self, url: str):
+        """Drops the cached entry for a URL."""
+        with self._lock:
+            self._conn.execute("DELETE FROM metadata WHERE key = ?", (cache_key(url),))
+            self._conn.commit()
+
+    def purge_expired(self):
+        """Removes every entry older than the TTL."""
+        with self._lock:
+            self._conn.execute("DELETE FROM metadata WHERE fetched_at < ?", (time.time() - self.ttl,))
+            self._conn.commit()
+
+    def close(self):
+        with self._lock:
+            self._conn.close()
+
+
+def extract_with_cache(ydl, url: str, cache: Optional[MetadataCache]) -> Dict:
+    """
+    Returns video metadata, extracting only on a cache miss.
+
+    Single-video results are cached; playlists are returned but not cached.
+    """
+    if cache:
+        info = cache.get(url)
+        if info is not None:
+            return info
+
+    info = ydl.extract_info(url, download=False)
+    if cache and info and info.get('_type', 'video') == 'video':
+        cache.put(url, ydl.sanitize_info(info, remove_private_keys=True))
+    return info
+
+
+def download_with_cache(ydl, url: str, cache: Optional[MetadataCache]) -> Dict:
+    """
+    Downloads a video, reusing cached metadata instead of extracting it again.
+
+    If the cached stream URLs have expired the download fails; the entry is
+    then dropped and the video is extracted and downloaded from scratch.
+    """
+    cached = cache.get(url) if cache else None
+    if cached is not None:
+        try:
+            return ydl.process_ie_result(cached, download=True)
+        except (DownloadError, ReExtractInfo):
+            cache.invalidate(url)
+    return ydl.extract_info(url, download=True)
@@ -0,0 +1,20 @@
+"""
+Nearest-rank percentiles for the metrics printed by the downloader,
+scraper and shortener tools.
+"""
+
+from typing import Iterable
+
+
+def percentile(values: Iterable[float], percent: float) -> float:
+    """
+    Nearest-rank `percent` percentile (0-100) of `values`, or 0 if there are none.
+
+    The values need not be sorted; an already sorted list is sorted again
+    in linear time.
+    """
+    ordered = sorted(values)
+    if not ordered:
+        return 0
+    rank = max(1, -(-len(ordered) * percent // 100))
+    return ordered[min(int(rank), len(ordered)) - 1]
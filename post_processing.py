@@ -0,0 +1,198 @@
+"""
+Post-download processing in a process pool.
+
+Finished downloads are handed to a PostProcessor, which runs a list of steps
+on each file in worker processes while the download workers move on to the
+next video. Built-in steps:
+
+    audio      extract the audio track (ffmpeg), e.g. {"codec": "mp3"}
+    thumbnail  grab a JPEG frame (ffmpeg), e.g. {"at": 5}
+    checksum   SHA-256 of the file
+    remux      change the container without re-encoding (ffmpeg), e.g. {"format": "mkv"}
+
+Steps are plain module-level functions ``step(path, options) -> result``, so
+new ones can be added with ``register_step`` and pickled into the pool.
+"""
+
+import logging
+import os
+import shutil
+import subprocess
+from concurrent.futures import ProcessPoolExecutor
+from typing import Callable, Dict, List, Optional, Tuple, Union
+
+from download_archive import file_checksum
+
+logger = logging.getLogger(__name__)
+
+AUDIO_EXTENSIONS = {'mp3': 'mp3', 'aac': 'm4a', 'copy': 'm4a', 'opus': 'opus', 'flac': 'flac', 'wav': 'wav'}
+AUDIO_ENCODERS = {'mp3': 'libmp3lame', 'aac': 'aac', 'copy': 'copy', 'opus': 'libopus', 'flac': 'flac', 'wav': 'pcm_s16le'}
+
+
+class PostProcessingError(Exception):
+    """Raised when a processing step fails."""
+
+
+def _ffmpeg(args: List[str]):
+    ffmpeg = shutil.which('ffmpeg')
+    if ffmpeg is None:
+        raise PostProcessingError("ffmpeg was not found on the PATH")
+    result = subprocess.run([ffmpeg, '-hide_banner', '-loglevel', 'error', '-y'] + args,
+                            stdout=subprocess.DEVNULL, stderr=subprocess.PIPE, text=True)
+    if result.returncode != 0:
+        raise PostProcessingError(result.stderr.strip().splitlines()[-1] if result.stderr.strip()
+                                  else f"ffmpeg exited with status {result.returncode}")
+
+
+def extract_audio(path: str, options: Dict) -> str:
+    """Writes the audio track next to the video and returns its path."""
+    codec = options.get('codec', 'mp3')
+    if codec not in AUDIO_ENCODERS:
+        raise PostProcessingError(f"Unsupported audio codec '{codec}'")
+    output = os.path.splitext(path)[0] + '.' + AUDIO_EXTENSIONS[codec]
+    args = ['-i', path, '-vn', '-c:a', AUDIO_ENCODERS[codec]]
+    if codec == 'mp3':
+        args += ['-q:a', str(options.get('quality', 2))]
+    _ffmpeg(args + [output])
+    return output
+
+
+def make_thumbnail(path: str, options: Dict) -> str:
+    """Saves one frame as a JPEG next to the video and returns its path."""
+    output = os.path.splitext(path)[0] + '.jpg'
+    args = ['-ss', str(options.get('at', 5)), '-i', path, '-frames:v', '1']
+    if options.get('width'):
+        args += ['-vf', f"scale={int(options['width'])}:-2"]
+    _ffmpeg(args + [output])
+    return output
+
+
+def checksum(path: str, options: Dict) -> str:
+    """Returns the file's SHA-256 hex digest."""
+    return file_checksum(path)
+
+
+def remux(path: str, options: Dict) -> str:
+    """Copies all streams into another container and returns the new path."""
+    fmt = options.get('format', 'mkv')
+    output = os.path.splitext(path)[0] + '.' + fmt
+    if output == path:
+        return path
+    _ffmpeg(['-i', path, '-map', '0', '-c', 'copy', output])
+    if options.get('delete_original'):
+        os.remove(path)
+    return output
+
+
+STEPS: Dict[str, Callable[[str, Dict], object]] = {
+    'audio': extract_audio,
+    'thumbnail': make_thumbnail,
+    'checksum': checksum,
+    'remux': remux,
+}
+
+
+def register_step(name: str, func: Callable[[str, Dict], object]):
+    """Adds a processing step. ``func`` must be a module-level function so it can be pickled."""
+    STEPS[name] = func
+
+
+def parse_steps(config: Union[List, Dict, None], skip_invalid: bool = False) -> List[Tuple[str, Dict]]:
+    """
+    Normalizes a step configuration to ``[(name, options), ...]``.
+
+    Accepts a list of names (``["checksum", "thumbnail"]``) or a mapping of
+    names to options (``{"audio": {"codec": "mp3"}}``). An unknown step or
+    malformed options raise ValueError, or with ``skip_invalid`` are logged
+    and left out so the valid steps still run.
+    """
+    if not config:
+        return []
+    items = config.items() if isinstance(config, dict) else ((name, {}) for name in config)
+    steps = []
+    for name, options in items:
+        try:
+            if name not in STEPS:
+                raise ValueError(f"Unknown post-processing step '{name}' (known: {', '.join(sorted(STEPS))})")
+            try:
+                options = dict(options or {})
+            except (TypeError, ValueError):
+                raise ValueError(f"Options for post-processing step '{name}' must be an object, not {options!r}")
+        except ValueError as e:
+            if not skip_invalid:
+                raise
+            logger.warning(f"{e}; skipping it")
+            continue
+        steps.append((name, options))
+    return steps
+
+
+def run_steps(path: str, steps: List[Tuple[Callable, Dict, str]]) -> Dict:
+    """
+    Runs the steps on one file inside a worker process.
+
+    A failing step is recorded and the remaining steps still run. A step that
+    returns a new path (remux) makes later steps work on that file.
+    """
+    results = {'path': path, 'steps': {}, 'errors': {}}
+    for func, options, name in steps:
+        try:
+            result = func(path, options)
+            results['steps'][name] = result
+            if name == 'remux' and isinstance(result, str):
+                path = results['path'] = result
+        except Exception as e:
+            results['errors'][name] = f"{type(e).__name__}: {e}"
+    return results
+
+
+class PostProcessor:
+    """
+    Runs configured steps on finished downloads in a process pool.
+
+    Args:
+        steps: Step configuration, see ``parse_steps``.
+        skip_invalid: Leave out (and log) unknown steps instead of raising.
+        mp_context: Optional multiprocessing context for the pool, e.g.
+            ``multiprocessing.get_context('spawn')`` from a threaded GUI.
+        max_workers: Number of worker processes (default: one per core).
+        on_done: Optional callback ``(key, results)``, called from a
+            background thread when a file has been processed.
+    """
+
+    def __init__(self, steps: Union[List, Dict], max_workers: Optional[int] = None,
+                 on_done: Optional[Callable[[object, Dict], None]] = None, skip_invalid: bool = False,
+                 mp_context=None):
+        self.steps = [(STEPS[name], options, name) for name, options in parse_steps(steps, skip_invalid)]
+        self.on_done = on_done
+        self._executor = (ProcessPoolExecutor(max_workers=max_workers, mp_context=mp_context)
+                          if self.steps else None)
+
+    def __bool__(self) -> bool:
+        return bool(self.steps)
+
+    def submit(self, key, path: str):
+        """Queues a file for processing; returns the future, or None if there is nothing to do."""
+        if not self._executor or not path or not os.path.exists(path):
+            return None
+        future = self._executor.submit(run_steps, path, self.steps)
+        future.add_done_callback(lambda f: self._finished(key, path, f))
+        return future
+
+    def _finished(self, key, path, future):
+        try:
+            results = future.result()
+        except Exception as e:
+            # The worker process itself died; report it like a failed step
+            results = {'path': path, 'steps': {}, 'errors': {'pool': f"{type(e).__name__}: {e}"}}
+        for name, error in results['errors'].items():
+            logger.error(f"Post-processing step '{name}' failed for {path}: {error}")
+        if self.on_done:
+            try:
+                self.on_done(key, results)
+            except Exception as e:
+                logger.error(f"Post-processing callback failed: {e}")
+
+    def shutdown(self, wait: bool = True):
+        if self._executor:
+            self._executor.shutdown(wait=wait, cancel_futures=not wait)
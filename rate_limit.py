@@ -0,0 +1,45 @@
+"""
+A thread-safe token bucket shared by the download, weather and shortener tools.
+
+The unit of a token is up to the caller: bytes for bandwidth limits,
+requests for API rate limits.
+"""
+
+import threading
+import time
+from typing import Optional
+
+
+class TokenBucket:
+    """
+    Thread-safe token bucket allowing `rate` tokens per second.
+
+    `capacity` is the largest burst; it defaults to one second's worth of
+    tokens. Consumers may go into debt for a large request and then sleep
+    it off, so the long-run rate across all threads sharing the bucket
+    stays at `rate`. A rate of 0 disables limiting.
+    """
+
+    def __init__(self, rate: float, capacity: Optional[float] = None):
+        self.rate = float(rate)
+        self.capacity = float(capacity if capacity is not None else max(rate, 1.0))
+        self._tokens = self.capacity
+        self._last = time.monotonic()
+        self._lock = threading.Lock()
+
+    def reserve(self, amount: float) -> float:
+        """Takes `amount` tokens and returns how many seconds the caller must wait before using them."""
+        if self.rate <= 0:
+            return 0.0
+        with self._lock:
+            now = time.monotonic()
+            self._tokens = min(self.capacity, self._tokens + (now - self._last) * self.rate)
+            self._last = now
+            self._tokens -= amount
+            return -self._tokens / self.rate if self._tokens < 0 else 0.0
+
+    def consume(self, amount: float):
+        """Blocks until `amount` tokens may be used."""
+        wait = self.reserve(amount)
+        if wait:
+            time.sleep(wait)
@@ -0,0 +1,249 @@
+"""
+Incremental CSV storage for scraped records.
+
+Keeps a content-hash index over an existing CSV file so that a re-scrape
+only appends records that are new and rewrites rows whose content actually
+changed, instead of overwriting the whole dataset on every run.
+
+Records are identified by a key built from a subset of their fields
+(``text`` and ``author`` for quotes) and compared by a digest of all fields.
+
+The index lives in a SQLite file next to the CSV (``quotes.csv.index.db``)
+together with the CSV's size and modification time. While those still
+match, a merge only looks up the keys of the scraped records, so its cost
+grows with the new batch rather than with the stored dataset. If the CSV
+was changed by anything else, the index is rebuilt with one scan.
+"""
+
+import csv
+import hashlib
+import json
+import os
+import sqlite3
+
+DEFAULT_KEY_FIELDS = ('text', 'author')
+INDEX_SUFFIX = '.index.db'
+
+
+def _hash_values(values):
+    """Returns a stable SHA-1 hex digest for a sequence of field values."""
+    joined = '\x1f'.join('' if value is None else str(value).strip() for value in values)
+    return hashlib.sha1(joined.encode('utf-8')).hexdigest()
+
+
+def _resolve_fields(fieldnames, wanted):
+    """Maps the wanted field names onto the actual (case-insensitive) fieldnames."""
+    lookup = {name.lower(): name for name in fieldnames}
+    resolved = []
+    for field in wanted:
+        if field.lower() not in lookup:
+            raise KeyError(f"Field '{field}' not found in {list(fieldnames)}")
+        resolved.append(lookup[field.lower()])
+    return resolved
+
+
+def conform_record(record, fieldnames):
+    """Re-keys a record onto the given fieldnames, matching names case-insensitively."""
+    lowered = {str(name).lower(): value for name, value in record.items()}
+    return {name: lowered.get(name.lower(), '') for name in fieldnames}
+
+
+def record_key(record, key_fields):
+    """Returns the identity hash of a record (e.g. quote text and author)."""
+    return _hash_values(record.get(field) for field in key_fields)
+
+
+def record_digest(record, fieldnames):
+    """Returns the content hash of a record over all of its fields."""
+    return _hash_values(record.get(field) for field in fieldnames)
+
+
+class CSVIndex:
+    """A key -> (row number, content digest) index over a CSV file, stored in a SQLite sidecar."""
+
+    def __init__(self, filename, key_fields=DEFAULT_KEY_FIELDS, index_path=None):
+        self.filename = filename
+        self.index_path = index_path or filename + INDEX_SUFFIX
+        self.wanted_key_fields = list(key_fields)
+        self.fieldnames = []
+        self.key_fields = []
+        self.row_count = 0
+        self._conn = None
+
+    def load(self):
+        """Opens the index, rebuilding it only if the CSV changed since it was last written."""
+        self._conn = sqlite3.connect(self.index_path)
+        self._conn.executescript(
+            """CREATE TABLE IF NOT EXISTS rows (
+                   key TEXT PRIMARY KEY,
+                   row_number INTEGER NOT NULL,
+                   digest TEXT NOT NULL
+               );
+               CREATE TABLE IF NOT EXISTS csv_state (
+                   id INTEGER PRIMARY KEY CHECK (id = 0),
+                   fieldnames TEXT NOT NULL,
+                   key_fields TEXT NOT NULL,
+                   row_count INTEGER NOT NULL,
+                   size INTEGER NOT NULL,
+                   mtime_ns INTEGER NOT NULL
+               );"""
+        )
+        if not os.path.exists(self.filename):
+            self._reset()
+            return self
+
+        stat = os.stat(self.filename)
+        state = self._conn.execute(
+            "SELECT fieldnames, key_fields, row_count, size, mtime_ns FROM csv_state").fetchone()
+        if state and (state[3], state[4]) == (stat.st_size, stat.st_mtime_ns) \
+                and json.loads(state[1]) == self.wanted_key_fields:
+            self.fieldnames = json.loads(state[0])
+            self.row_count = state[2]
+            if self.fieldnames:
+                self.key_fields = _resolve_fields(self.fieldnames, self.wanted_key_fields)
+            return self
+        return self.rebuild()
+
+    def rebuild(self):
+        """Streams the CSV once and hashes every row."""
+        self._reset()
+        with open(self.filename, 'r', newline='', encoding='utf-8') as csvfile:
+            reader = csv.DictReader(csvfile)
+            self.fieldnames = list(reader.fieldnames or [])
+            if self.fieldnames:
+                self.key_fields = _resolve_fields(self.fieldnames, self.wanted_key_fields)
+                with self._conn:
+                    self._conn.executemany(
+                        "INSERT OR REPLACE INTO rows VALUES (?, ?, ?)",
+                        ((record_key(row, self.key_fields), row_number, record_digest(row, self.fieldnames))
+                         for row_number, row in enumerate(reader)))
+                self.row_count = self._conn.execute(
+                    "SELECT COALESCE(MAX(row_number) + 1, 0) FROM rows").fetchone()[0]
+        self._save_state()
+        return self
+
+    def _reset(self):
+        self.fieldnames = []
+        self.key_fields = []
+        self.row_count = 0
+        with self._conn:
+            self._conn.execute("DELETE FROM rows")
+            self._conn.execute("DELETE FROM csv_state")
+
+    def _save_state(self):
+        stat = os.stat(self.filename)
+        with self._conn:
+            self._conn.execute(
+                "INSERT OR REPLACE INTO csv_state VALUES (0, ?, ?, ?, ?, ?)",
+                (json.dumps(self.fieldnames), json.dumps(self.wanted_key_fields), self.row_count,
+                 stat.st_size, stat.st_mtime_ns))
+
+    def get(self, key):
+        """Returns (row number, digest) for a stored key, or None."""
+        return self._conn.execute("SELECT row_number, digest FROM rows WHERE key = ?", (key,)).fetchone()
+
+    def diff(self, records):
+        """
+        Compares scraped records against the index.
+
+        Args:
+            records (list): Newly scraped records (dictionaries).
+
+        Returns:
+            tuple: (inserts, updates, unchanged) where ``updates`` maps row number
+            -> record and ``unchanged`` counts records already stored as-is.
+        """
+        if not self.fieldnames:
+            self.fieldnames = list(records[0].keys())
+            self.key_fields = _resolve_fields(self.fieldnames, self.wanted_key_fields)
+
+        inserts = {}
+        updates = {}
+        unchanged = 0
+        for record in records:
+            record = conform_record(record, self.fieldnames)
+            key = record_key(record, self.key_fields)
+            existing = self.get(key)
+            if existing is None:
+                inserts[key] = record  # Later duplicates in the same batch win
+            elif existing[1] != record_digest(record, self.fieldnames):
+                updates[existing[0]] = record
+            else:
+                unchanged += 1
+        return list(inserts.values()), updates, unchanged
+
+    def commit(self, inserts, updates):
+        """Indexes rows just appended to or rewritten in the CSV and stores the CSV's new size and mtime."""
+        rows = [(record_key(record, self.key_fields), row_number, record_digest(record, self.fieldnames))
+                for row_number, record in updates.items()]
+        rows += [(record_key(record, self.key_fields), self.row_count + i, record_digest(record, self.fieldnames))
+                 for i, record in enumerate(inserts)]
+        with self._conn:
+            self._conn.executemany("INSERT OR REPLACE INTO rows VALUES (?, ?, ?)", rows)
+        self.row_count += len(inserts)
+        self._save_state()
+
+    def close(self):
+        if self._conn is not None:
+            self._conn.close()
+            self._conn = None
+
+
+def upsert_csv(records, filename, key_fields=DEFAULT_KEY_FIELDS):
+    """
+    Merges scraped records into a CSV file and reports the upsert delta.
+
+    New records are appended to the end of the file. The file is only
+    rewritten when an existing record's content changed.
+
+    Args:
+        records (list): A list of dictionaries to merge.
+        filename (str): The CSV file to merge into.
+        key_fields (tuple): Fields that identify a record.
+
+    Returns:
+        dict: ``{'inserted': [...], 'updated': [...], 'unchanged': int}``
+    """
+    delta = {'inserted': [], 'updated': [], 'unchanged': 0}
+    if not records:
+        return delta
+
+    index = CSVIndex(filename, key_fields).load()
+    try:
+        file_exists = bool(index.fieldnames)
+        inserts, updates, unchanged = index.diff(records)
+        fieldnames = index.fieldnames
+
+        if updates:
+            _rewrite_rows(filename, fieldnames, updates)
+
+        if inserts:
+            mode = 'a' if file_exists else 'w'
+            with open(filename, mode, newline='', encoding='utf-8') as csvfile:
+                writer = csv.DictWriter(csvfile, fieldnames=fieldnames, extrasaction='ignore')
+                if not file_exists:
+                    writer.writeheader()
+                writer.writerows(inserts)
+
+        if updates or inserts:
+            index.commit(inserts, updates)
+    finally:
+        index.close()
+
+    delta['inserted'] = inserts
+    delta['updated'] = list(updates.values())
+    delta['unchanged'] = unchanged
+    return delta
+
+
+def _rewrite_rows(filename, fieldnames, updates):
+    """Rewrites the given row numbers of a CSV file atomically."""
+    temp_filename = filename + '.tmp'
+    with open(filename, 'r', newline='', encoding='utf-8') as source, \
+            open(temp_filename, 'w', newline='', encoding='utf-8') as target:
+        reader = csv.DictReader(source)
+        writer = csv.DictWriter(target, fieldnames=fieldnames, extrasaction='ignore')
+        writer.writeheader()
+        for row_number, row in enumerate(reader):
+            writer.writerow(updates.get(row_number, row))
+    os.replace(temp_filename, filename)
@@ -0,0 +1,143 @@
+"""
+URL shortening services shared by the shortener apps.
+
+Each service is an adapter function taking a requests.Session. Alongside
+the adapters live each service's rate limit (RATE_LIMITS) and ShortURLCache,
+a persistent long-URL -> short-URL cache in SQLite, so a URL that was
+shortened before never goes to the network again.
+
+The apps use async_shortener.AsyncShortener, which adds connection
+pooling, rate limiting, failover and batches on top of these adapters.
+
+The "Local" service creates links in the self-hosted shortener
+(local_shortener.py) instead of calling a third-party API.
+"""
+
+import sqlite3
+import threading
+import time
+from typing import Callable, Dict, Iterable, Optional, Tuple
+
+from local_shortener import LinkStore
+
+DEFAULT_CACHE_FILE = "short_urls.db"
+REQUEST_TIMEOUT = 10
+ANY_SERVICE = "Any"
+
+# Requests per second we allow ourselves per service
+RATE_LIMITS = {
+    "TinyURL": 5.0,
+    "is.gd": 1.0,
+    "Bitly": 5.0,
+}
+
+
+class ShortenerError(Exception):
+    """Raised when a service cannot shorten a URL."""
+
+
+def shorten_tinyurl(session, url, token=None, timeout=REQUEST_TIMEOUT):
+    response = session.get("https://tinyurl.com/api-create.php", params={'url': url}, timeout=timeout)
+    response.raise_for_status()
+    return response.text.strip()
+
+
+def shorten_isgd(session, url, token=None, timeout=REQUEST_TIMEOUT):
+    response = session.get("https://is.gd/create.php", params={'format': 'json', 'url': url}, timeout=timeout)
+    response.raise_for_status()
+    data = response.json()
+    if 'shorturl' not in data:
+        raise ShortenerError(f"is.gd error: {data.get('errormessage', 'unknown error')}")
+    return data['shorturl']
+
+
+def shorten_bitly(session, url, token=None, timeout=REQUEST_TIMEOUT):
+    if not token:
+        raise ShortenerError("Bitly requires an API access token.")
+    response = session.post("https://api-ssl.bitly.com/v4/shorten", headers={"Authorization": f"Bearer {token}"},
+                            json={"long_url": url}, timeout=timeout)
+    if response.status_code == 403:
+        raise ShortenerError("Bitly API Error: Forbidden. Check your API token and permissions.")
+    response.raise_for_status()
+    return response.json()['link']
+
+
+_local_store: Optional[LinkStore] = None
+_local_store_lock = threading.Lock()
+
+
+def local_store() -> LinkStore:
+    """The process-wide store of the self-hosted shortener, opened on first use."""
+    global _local_store
+    with _local_store_lock:
+        if _local_store is None:
+            _local_store = LinkStore()
+        return _local_store
+
+
+def shorten_local(session, url, token=None, timeout=REQUEST_TIMEOUT):
+    # No network round trip: the link is created in the local store
+    try:
+        return local_store().shorten_url(url)
+    except ValueError as e:
+        raise ShortenerError(str(e)) from e
+
+
+SERVICES: Dict[str, Callable] = {
+    "TinyURL": shorten_tinyurl,
+    "is.gd": shorten_isgd,
+    "Bitly": shorten_bitly,
+    "Local": shorten_local,
+}
+# Services whose links work without a locally running redirect server
+PUBLIC_SERVICES = ("TinyURL", "is.gd", "Bitly")
+
+
+class ShortURLCache:
+    """Persistent (service, long URL) -> short URL mapping; safe to share between threads."""
+
+    def __init__(self, path: str = DEFAULT_CACHE_FILE):
+        self.path = path
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(path, check_same_thread=False)
+        self._conn.execute(
+            """CREATE TABLE IF NOT EXISTS short_urls (
+                   service TEXT NOT NULL,
+                   long_url TEXT NOT NULL,
+                   short_url TEXT NOT NULL,
+                   created_at REAL NOT NULL,
+                   PRIMARY KEY (service, long_url)
+               )"""
+        )
+        self._conn.execute("CREATE INDEX IF NOT EXISTS short_urls_long ON short_urls (long_url)")
+        self._conn.commit()
+
+    def get(self, long_url: str, service: str) -> Optional[Tuple[str, str]]:
+        """Returns (service, short_url) for a URL shortened with `service`."""
+        with self._lock:
+            row = self._conn.execute(
+                "SELECT service, short_url FROM short_urls WHERE service = ? AND long_url = ?",
+                (service, long_url)).fetchone()
+        return tuple(row) if row else None
+
+    def get_any(self, long_url: str, services: Iterable[str]) -> Optional[Tuple[str, str]]:
+        """Returns the oldest (service, short_url) for a URL among `services`, e.g. PUBLIC_SERVICES."""
+        services = list(services)
+        if not services:
+            return None
+        with self._lock:
+            row = self._conn.execute(
+                f"SELECT service, short_url FROM short_urls WHERE long_url = ? "
+                f"AND service IN ({', '.join('?' * len(services))}) ORDER BY created_at LIMIT 1",
+                (long_url, *services)).fetchone()
+        return tuple(row) if row else None
+
+    def put(self, service: str, long_url: str, short_url: str):
+        with self._lock:
+            self._conn.execute("INSERT OR REPLACE INTO short_urls VALUES (?, ?, ?, ?)",
+                               (service, long_url, short_url, time.time()))
+            self._conn.commit()
+
+    def close(self):
+        with self._lock:
+            self._conn.close()
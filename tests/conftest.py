@@ -0,0 +1,18 @@
+import os
+import sys
+
+import pytest
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+import fixture_media  # noqa: E402
+
+
+@pytest.fixture
+def media_server():
+    server = fixture_media.serve()
+    yield server
+    server.shutdown()
+    server.server_close()
@@ -0,0 +1,146 @@
+"""
+A local stand-in for a video site, for tests that drive yt-dlp without the network.
+
+``serve()`` starts an HTTP server on 127.0.0.1 that serves:
+
+- ``/api/video/<id>.json`` and ``/api/playlist/<id>.json``: metadata,
+- ``/media/<id>.mp4``: deterministic fixture bytes with an ETag, answering
+  ``Range: bytes=a-b`` and ``bytes=a-`` with 206 and Content-Range, and
+  an optional per-chunk delay so downloads can be interrupted mid-file.
+  Set ``server.ignore_ranges`` to behave like a server without range
+  support.
+
+``FixtureIE`` is a yt-dlp extractor for ``/fixture/video/<id>`` and
+``/fixture/playlist/<id>`` pages on that server; ``make_ydl`` returns a
+YoutubeDL that only knows this extractor.
+"""
+
+import hashlib
+import json
+import re
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+import yt_dlp
+from yt_dlp.extractor.common import InfoExtractor
+
+CHUNK_SIZE = 16 * 1024
+
+VIDEOS = {
+    'vid001': {'title': 'First video', 'size': 96 * 1024},
+    'vid002': {'title': 'Second video', 'size': 160 * 1024},
+    'vid003': {'title': 'Third video', 'size': 64 * 1024},
+    'slow01': {'title': 'Slow video', 'size': 512 * 1024},
+}
+PLAYLISTS = {
+    # vid002 is listed twice and 'gone01' has no metadata, like a removed video
+    'pl1': {'title': 'Fixture playlist', 'entries': ['vid001', 'vid002', 'vid003', 'vid002', 'gone01']},
+}
+
+
+def media_bytes(video_id: str) -> bytes:
+    """The content served for a video: a repeated hash of its ID, VIDEOS[id]['size'] long."""
+    size = VIDEOS[video_id]['size']
+    block = hashlib.sha256(video_id.encode()).digest() * 64
+    return (block * (size // len(block) + 1))[:size]
+
+
+class FixtureHandler(BaseHTTPRequestHandler):
+    server_version = "FixtureMedia/1.0"
+
+    def do_GET(self):
+        match = re.fullmatch(r'/api/(video|playlist)/([\w-]+)\.json', self.path)
+        if match:
+            kind, item_id = match.groups()
+            table = VIDEOS if kind == 'video' else PLAYLISTS
+            if item_id not in table:
+                return self._send(404, b'{"error": "not found"}', 'application/json')
+            body = dict(table[item_id], id=item_id)
+            return self._send(200, json.dumps(body).encode(), 'application/json')
+
+        match = re.fullmatch(r'/media/([\w-]+)\.mp4', self.path)
+        if not match or match.group(1) not in VIDEOS:
+            return self._send(404, b'not found', 'text/plain')
+        self._send_media(media_bytes(match.group(1)))
+
+    def _send_media(self, data: bytes):
+        start, end = 0, len(data) - 1
+        range_header = self.headers.get('Range')
+        self.server.requests.append((self.path, range_header))
+        match = re.fullmatch(r'bytes=(\d+)-(\d*)', range_header or '')
+        if match and not self.server.ignore_ranges:
+            start = int(match.group(1))
+            end = min(int(match.group(2)), end) if match.group(2) else end
+            if start > end:
+                self.send_response(416)
+                self.send_header('Content-Range', f"bytes */{len(data)}")
+                self.send_header('Content-Length', '0')
+                self.end_headers()
+                return
+            self.send_response(206)
+            self.send_header('Content-Range', f"bytes {start}-{end}/{len(data)}")
+        else:
+            self.send_response(200)
+        self.send_header('Content-Type', 'video/mp4')
+        self.send_header('Content-Length', str(end - start + 1))
+        self.send_header('ETag', f'"{hashlib.sha256(data).hexdigest()[:16]}"')
+        if not self.server.ignore_ranges:
+            self.send_header('Accept-Ranges', 'bytes')
+        self.end_headers()
+        try:
+            for offset in range(start, end + 1, CHUNK_SIZE):
+                self.wfile.write(data[offset:min(offset + CHUNK_SIZE, end + 1)])
+                if self.server.chunk_delay:
+                    time.sleep(self.server.chunk_delay)
+        except (BrokenPipeError, ConnectionResetError):
+            pass  # The client cancelled
+
+    def _send(self, status, body, content_type):
+        self.send_response(status)
+        self.send_header('Content-Type', content_type)
+        self.send_header('Content-Length', str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, format, *args):
+        pass
+
+
+def serve(chunk_delay: float = 0.0) -> ThreadingHTTPServer:
+    """Starts the fixture server on a free port in a daemon thread; call shutdown() when done."""
+    server = ThreadingHTTPServer(('127.0.0.1', 0), FixtureHandler)
+    server.daemon_threads = True
+    server.chunk_delay = chunk_delay
+    server.ignore_ranges = False
+    server.requests = []
+    server.base_url = f"http://127.0.0.1:{server.server_address[1]}"
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    return server
+
+
+class FixtureIE(InfoExtractor):
+    _VALID_URL = r'(?P<base>http://127\.0\.0\.1:\d+)/fixture/(?P<kind>video|playlist)/(?P<id>[\w-]+)'
+
+    def _real_extract(self, url):
+        base, kind, item_id = self._match_valid_url(url).group('base', 'kind', 'id')
+        data = self._download_json(f"{base}/api/{kind}/{item_id}.json", item_id)
+        if kind == 'playlist':
+            entries = [self.url_result(f"{base}/fixture/video/{video_id}", FixtureIE.ie_key(), video_id)
+                       for video_id in data['entries']]
+            return self.playlist_result(entries, item_id, data['title'])
+        return {
+            'id': item_id,
+            'title': data['title'],
+            'ext': 'mp4',
+            'url': f"{base}/media/{item_id}.mp4",
+            'filesize': data['size'],
+        }
+
+
+def make_ydl(params=None) -> yt_dlp.YoutubeDL:
+    """A quiet YoutubeDL whose only extractor is FixtureIE."""
+    ydl = yt_dlp.YoutubeDL(dict({'quiet': True, 'no_warnings': True, 'noprogress': True}, **(params or {})),
+                           auto_init=False)
+    ydl.add_info_extractor(FixtureIE())
+    return ydl
@@ -0,0 +1,139 @@
+"""ChunkedDownloader against the range-capable fixture server."""
+
+import json
+import os
+import threading
+import time
+
+import pytest
+
+import chunked_download
+from chunked_download import ChunkedDownloader, DownloadCancelledError, bandwidth_bucket, parse_rate
+from fixture_media import media_bytes
+
+
+@pytest.fixture(autouse=True)
+def small_fragments(monkeypatch):
+    # Fixture files are a few hundred KiB; let them split into several ranges
+    monkeypatch.setattr(chunked_download, 'MIN_FRAGMENT_SIZE', 64 * 1024)
+
+
+def media_url(server, video_id):
+    return f"{server.base_url}/media/{video_id}.mp4"
+
+
+def ranges_requested(server, video_id, since=0):
+    return [header for path, header in server.requests[since:]
+            if path == f"/media/{video_id}.mp4" and header != 'bytes=0-0']
+
+
+def read(path):
+    with open(path, 'rb') as f:
+        return f.read()
+
+
+def test_fragments_are_fetched_in_parallel_and_reassembled(media_server, tmp_path):
+    dest = str(tmp_path / 'slow01.mp4')
+    progress = []
+    result = ChunkedDownloader(media_url(media_server, 'slow01'), dest, fragments=4,
+                               progress=lambda done, total, speed: progress.append((done, total))).run()
+
+    assert result == dest
+    assert read(dest) == media_bytes('slow01')
+    assert not os.path.exists(dest + '.part') and not os.path.exists(dest + '.part.json')
+    size = len(media_bytes('slow01'))
+    step = size // 4
+    assert sorted(ranges_requested(media_server, 'slow01')) == sorted(
+        f"bytes={i * step}-{(i + 1) * step - 1}" for i in range(4))
+    assert progress[-1] == (size, size)
+
+
+def test_interrupted_download_resumes_from_part_and_state(media_server, tmp_path):
+    media_server.chunk_delay = 0.02
+    dest = str(tmp_path / 'slow01.mp4')
+    cancel = threading.Event()
+
+    def stop_halfway(done, total, speed):
+        if done >= total // 2:
+            cancel.set()
+
+    first = ChunkedDownloader(media_url(media_server, 'slow01'), dest, fragments=4,
+                              progress=stop_halfway, cancel_event=cancel)
+    with pytest.raises(DownloadCancelledError):
+        first.run()
+
+    with open(dest + '.part.json') as f:
+        state = json.load(f)
+    saved = sum(done for _, _, done in state['ranges'])
+    assert 0 < saved < len(media_bytes('slow01'))
+    assert os.path.getsize(dest + '.part') == len(media_bytes('slow01'))
+
+    media_server.chunk_delay = 0.0
+    mark = len(media_server.requests)
+    ChunkedDownloader(media_url(media_server, 'slow01'), dest, fragments=4).run()
+
+    assert read(dest) == media_bytes('slow01')
+    resumed = ranges_requested(media_server, 'slow01', mark)
+    expected = [f"bytes={start + done}-{end}" for start, end, done in state['ranges'] if start + done <= end]
+    assert sorted(resumed) == sorted(expected)
+
+
+def test_changed_file_is_not_resumed(media_server, tmp_path):
+    dest = str(tmp_path / 'vid002.mp4')
+    size = len(media_bytes('vid002'))
+    with open(dest + '.part', 'wb') as f:
+        f.write(b'\0' * size)
+    with open(dest + '.part.json', 'w') as f:
+        json.dump({'url': 'x', 'url_size': size, 'validator': '"stale"', 'ranges': [[0, size - 1, size]]}, f)
+
+    ChunkedDownloader(media_url(media_server, 'vid002'), dest, fragments=2).run()
+
+    assert read(dest) == media_bytes('vid002')
+
+
+def test_server_without_ranges_falls_back_to_one_stream(media_server, tmp_path):
+    media_server.ignore_ranges = True
+    dest = str(tmp_path / 'vid001.mp4')
+    with open(dest + '.part', 'wb') as f:
+        f.write(b'leftover from an earlier attempt')
+
+    ChunkedDownloader(media_url(media_server, 'vid001'), dest, fragments=4).run()
+
+    assert read(dest) == media_bytes('vid001')
+    # The probe plus one streamed request; the leftover .part was overwritten, not appended to
+    assert len(ranges_requested(media_server, 'vid001')) == 1
+    assert not os.path.exists(dest + '.part.json')
+
+
+def test_shared_bucket_limits_the_combined_rate(media_server, tmp_path):
+    rate = 256 * 1024
+    bucket = bandwidth_bucket(rate)
+    downloads = [ChunkedDownloader(media_url(media_server, video_id), str(tmp_path / f"{video_id}.mp4"),
+                                   fragments=4, bucket=bucket) for video_id in ('slow01', 'vid002')]
+    threads = [threading.Thread(target=download.run) for download in downloads]
+    started = time.monotonic()
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    elapsed = time.monotonic() - started
+
+    total = len(media_bytes('slow01')) + len(media_bytes('vid002'))
+    # One second's worth may go out at once; the rest is paced at `rate`
+    assert elapsed >= (total - rate) / rate - 0.05
+    assert read(tmp_path / 'slow01.mp4') == media_bytes('slow01')
+    assert read(tmp_path / 'vid002.mp4') == media_bytes('vid002')
+
+
+@pytest.mark.parametrize('text, expected', [
+    ('0', 0), ('1048576', 1048576), ('500K', 500 * 1024), ('2M', 2 * 1024 ** 2),
+    ('2MB/s', 2 * 1024 ** 2), ('1.5g', 1.5 * 1024 ** 3), ('', 0),
+])
+def test_parse_rate(text, expected):
+    assert parse_rate(text) == expected
+
+
+@pytest.mark.parametrize('text', ['fast', '2 MB per second', 'M'])
+def test_parse_rate_rejects_garbage(text):
+    with pytest.raises(ValueError):
+        parse_rate(text)
@@ -0,0 +1,187 @@
+"""Playlist expansion and the download queue, driven through yt-dlp against fixture_media."""
+
+import json
+import os
+import threading
+import time
+
+import pytest
+
+from download_manager import (DownloadManager, DownloadJob, expand_playlist, DONE, CANCELLED, QUEUED, RUNNING,
+                              FAILED)
+from fixture_media import make_ydl, media_bytes
+
+
+def flat_entries(server, playlist_id='pl1'):
+    with make_ydl({'extract_flat': 'in_playlist'}) as ydl:
+        return ydl.extract_info(f"{server.base_url}/fixture/playlist/{playlist_id}", download=False)['entries']
+
+
+def extract(url):
+    with make_ydl() as ydl:
+        return ydl.extract_info(url, download=False)
+
+
+def make_run_job(started=None):
+    """A run_job like the app's: downloads with yt-dlp and honours cancellation from the progress hook."""
+
+    def run_job(job: DownloadJob):
+        def hook(d):
+            if started is not None and d.get('downloaded_bytes'):
+                started.set()
+            job.check_cancelled()
+            if d.get('total_bytes'):
+                job.progress = 100.0 * d['downloaded_bytes'] / d['total_bytes']
+
+        params = {'outtmpl': os.path.join(job.download_path, '%(id)s.%(ext)s'), 'progress_hooks': [hook],
+                  'continuedl': True, 'retries': 0}
+        with make_ydl(params) as ydl:
+            info = ydl.extract_info(job.url, download=True)
+            job.filename = ydl.prepare_filename(info)
+    return run_job
+
+
+def wait_for(predicate, timeout=15.0):
+    deadline = time.monotonic() + timeout
+    while time.monotonic() < deadline:
+        if predicate():
+            return True
+        time.sleep(0.02)
+    return False
+
+
+def finished(manager):
+    return manager.pending_count() == 0
+
+
+def test_expand_playlist_resolves_in_order_and_skips_known_ids(media_server):
+    entries = flat_entries(media_server)
+    resolved, skipped, failures = expand_playlist(entries, extract, skip_ids={'vid003'}, max_workers=3)
+
+    assert [info['id'] for info in resolved] == ['vid001', 'vid002']
+    assert all(info['webpage_url'].startswith(media_server.base_url) for info in resolved)
+    assert resolved[0]['title'] == 'First video'
+    # vid003 was already downloaded, the second vid002 repeats an earlier entry
+    assert skipped == ['vid003', 'vid002']
+    assert [entry['id'] for entry, _ in failures] == ['gone01']
+
+
+def test_queue_downloads_every_playlist_entry(media_server, tmp_path):
+    resolved, _, _ = expand_playlist(flat_entries(media_server), extract)
+    manager = DownloadManager(make_run_job(), max_workers=2)
+    manager.start()
+    jobs = [manager.submit(info['webpage_url'], str(tmp_path), video_id=info['id']) for info in resolved]
+
+    assert wait_for(lambda: finished(manager))
+    manager.shutdown(wait=True)
+    assert [job.state for job in jobs] == [DONE] * 3
+    for job, info in zip(jobs, resolved):
+        with open(job.filename, 'rb') as f:
+            assert f.read() == media_bytes(info['id'])
+    assert {'vid001', 'vid002', 'vid003'} <= manager.known_video_ids()
+
+
+def test_failed_download_does_not_stop_the_queue(media_server, tmp_path):
+    manager = DownloadManager(make_run_job(), max_workers=1)
+    manager.start()
+    bad = manager.submit(f"{media_server.base_url}/fixture/video/gone01", str(tmp_path))
+    good = manager.submit(f"{media_server.base_url}/fixture/video/vid003", str(tmp_path))
+
+    assert wait_for(lambda: finished(manager))
+    manager.shutdown(wait=True)
+    assert bad.state == FAILED and bad.error
+    assert good.state == DONE
+
+
+def test_cancel_running_and_queued_jobs(media_server, tmp_path):
+    media_server.chunk_delay = 0.05
+    started = threading.Event()
+    manager = DownloadManager(make_run_job(started), max_workers=1)
+    manager.start()
+    running = manager.submit(f"{media_server.base_url}/fixture/video/slow01", str(tmp_path))
+    queued = manager.submit(f"{media_server.base_url}/fixture/video/vid001", str(tmp_path))
+
+    assert started.wait(10)
+    assert manager.cancel(queued.job_id)
+    assert manager.cancel(running.job_id)
+    assert wait_for(lambda: finished(manager))
+    manager.shutdown(wait=True)
+
+    assert running.state == CANCELLED
+    assert queued.state == CANCELLED
+    assert not os.path.exists(tmp_path / 'vid001.mp4')
+    assert not manager.cancel(running.job_id)
+
+
+def test_interrupted_queue_resumes_and_continues_partial_file(media_server, tmp_path):
+    queue_file = str(tmp_path / 'queue.json')
+    media_server.chunk_delay = 0.05
+    started = threading.Event()
+    first = DownloadManager(make_run_job(started), max_workers=1, queue_file=queue_file)
+    first.start()
+    interrupted = first.submit(f"{media_server.base_url}/fixture/video/slow01", str(tmp_path))
+    waiting = first.submit(f"{media_server.base_url}/fixture/video/vid002", str(tmp_path))
+
+    # Take the queue file as it is mid-download, as a crash would leave it
+    assert started.wait(10)
+    assert wait_for(lambda: os.path.getsize(tmp_path / 'slow01.mp4.part') > 0)
+    with open(queue_file) as f:
+        snapshot = json.load(f)
+    assert {job['job_id']: job['state'] for job in snapshot} == {interrupted.job_id: RUNNING, waiting.job_id: QUEUED}
+    first.cancel(waiting.job_id)
+    first.cancel(interrupted.job_id)
+    assert wait_for(lambda: finished(first))
+    first.shutdown(wait=True)
+    with open(queue_file, 'w') as f:
+        json.dump(snapshot, f)
+
+    media_server.chunk_delay = 0.0
+    second = DownloadManager(make_run_job(), max_workers=2, queue_file=queue_file)
+    resumed = {job.job_id: job for job in second.list_jobs()}
+    assert set(resumed) == {interrupted.job_id, waiting.job_id}
+    assert all(job.state == QUEUED for job in resumed.values())
+    second.start()
+    assert wait_for(lambda: finished(second))
+    second.shutdown(wait=True)
+
+    assert all(job.state == DONE for job in resumed.values())
+    with open(tmp_path / 'slow01.mp4', 'rb') as f:
+        assert f.read() == media_bytes('slow01')
+    # The restarted job continued the .part file instead of starting over
+    ranges = [header for path, header in media_server.requests if path.endswith('slow01.mp4') and header]
+    assert ranges and ranges[-1] != 'bytes=0-'
+    with open(queue_file) as f:
+        assert json.load(f) == []
+
+
+def test_persisted_jobs_keep_their_fields(tmp_path):
+    queue_file = str(tmp_path / 'queue.json')
+    manager = DownloadManager(lambda job: None, queue_file=queue_file)
+    job = manager.submit('http://127.0.0.1:1/fixture/video/vid001', str(tmp_path), format_spec='18',
+                         priority=2, title='First video', video_id='vid001')
+    manager.shutdown()
+
+    reloaded = DownloadManager(lambda job: None, queue_file=queue_file).jobs[job.job_id]
+    assert (reloaded.format_spec, reloaded.priority, reloaded.title, reloaded.extra) == \
+           ('18', 2, 'First video', {'video_id': 'vid001'})
+
+
+@pytest.mark.parametrize('workers', [1, 3])
+def test_never_runs_more_than_max_workers(workers):
+    running, peak, lock = [0], [0], threading.Lock()
+
+    def run_job(job):
+        with lock:
+            running[0] += 1
+            peak[0] = max(peak[0], running[0])
+        time.sleep(0.05)
+        with lock:
+            running[0] -= 1
+
+    manager = DownloadManager(run_job, max_workers=workers)
+    manager.start()
+    for i in range(8):
+        manager.submit(f"job-{i}", '.')
+    assert wait_for(lambda: finished(manager))
+    manager.shutdown(wait=True)
+    assert peak[0] == workers
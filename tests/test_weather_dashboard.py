@@ -0,0 +1,122 @@
+"""CityFetcher against weather_stub_server: concurrency bound, rate limit, errors and the response cache."""
+
+import threading
+import time
+
+import pytest
+
+import weather_stub_server
+from weather_cache import WeatherCache
+from weather_dashboard import CityFetcher
+
+CITIES = [f"City {i}" for i in range(12)]
+
+
+@pytest.fixture
+def stub():
+    """The stub server on a free port, counting requests and the most handled at once."""
+    server = weather_stub_server.serve(port=0, latency=0.05)
+    handler = server.RequestHandlerClass
+    stats = {'requests': 0, 'active': 0, 'peak': 0}
+    lock = threading.Lock()
+
+    class CountingHandler(handler):
+        def do_GET(self):
+            with lock:
+                stats['requests'] += 1
+                stats['active'] += 1
+                stats['peak'] = max(stats['peak'], stats['active'])
+            try:
+                super().do_GET()
+            finally:
+                with lock:
+                    stats['active'] -= 1
+
+    server.RequestHandlerClass = CountingHandler
+    server.daemon_threads = True
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    server.base_url = f"http://127.0.0.1:{server.server_address[1]}/v1"
+    server.stats = stats
+    yield server
+    server.shutdown()
+    server.server_close()
+
+
+def test_fetch_all_returns_a_row_per_city(stub):
+    fetcher = CityFetcher('test-key', stub.base_url, max_workers=4, rate=0)
+    rows = {row['city']: row for row in fetcher.fetch_all(CITIES)}
+
+    assert set(rows) == set(CITIES)
+    assert all(row['error'] == '' and row['country'] == 'Stubland' for row in rows.values())
+    assert stub.stats['requests'] == len(CITIES)
+
+
+@pytest.mark.parametrize('workers', [1, 3])
+def test_never_more_requests_in_flight_than_workers(stub, workers):
+    fetcher = CityFetcher('test-key', stub.base_url, max_workers=workers, rate=0)
+    list(fetcher.fetch_all(CITIES))
+
+    assert stub.stats['peak'] == workers
+
+
+def test_requests_are_rate_limited(stub):
+    rate = 5.0
+    fetcher = CityFetcher('test-key', stub.base_url, max_workers=8, rate=rate)
+    started = time.monotonic()
+    list(fetcher.fetch_all(CITIES))
+    elapsed = time.monotonic() - started
+
+    # A full bucket allows one second's worth at once; the rest is paced at `rate`
+    assert elapsed >= (len(CITIES) - rate) / rate - 0.05
+    assert stub.stats['requests'] == len(CITIES)
+
+
+def test_unknown_city_is_an_error_row(stub):
+    fetcher = CityFetcher('test-key', stub.base_url, rate=0)
+    rows = {row['city']: row for row in fetcher.fetch_all(['Paris', 'Unknown Town'])}
+
+    assert rows['Paris']['error'] == ''
+    assert rows['Unknown Town']['error'] == "No matching location found."
+
+
+def test_missing_api_key_is_an_error_row(stub):
+    row = CityFetcher('', stub.base_url, rate=0).fetch('Paris')
+
+    assert "API key" in row['error']
+
+
+def test_repeated_cities_come_from_the_cache(stub, tmp_path):
+    cache = WeatherCache(str(tmp_path / 'weather_cache.db'))
+    try:
+        fetcher = CityFetcher('test-key', stub.base_url, rate=0, cache=cache)
+        first = list(fetcher.fetch_all(CITIES))
+        requests_made = stub.stats['requests']
+        second = {row['city']: row for row in fetcher.fetch_all([city.upper() for city in CITIES])}
+
+        assert requests_made == len(CITIES)
+        assert stub.stats['requests'] == requests_made
+        assert not any(row['cached'] for row in first)
+        assert all(row['cached'] for row in second.values())
+        assert second['CITY 3']['temp_c'] == next(row for row in first if row['city'] == 'City 3')['temp_c']
+
+        # The same city against another API root is not answered from the stub's entries
+        assert cache.get('current', 'City 3', base_url='http://api.example.invalid/v1') is None
+    finally:
+        cache.close()
+
+
+def test_fetch_errors_become_rows(stub, monkeypatch):
+    fetcher = CityFetcher('test-key', stub.base_url, rate=0)
+    original = fetcher.fetch
+
+    def flaky(city):
+        if city == 'City 2':
+            raise AttributeError("'list' object has no attribute 'get'")
+        return original(city)
+
+    monkeypatch.setattr(fetcher, 'fetch', flaky)
+    rows = {row['city']: row for row in fetcher.fetch_all(CITIES[:4])}
+
+    assert set(rows) == set(CITIES[:4])
+    assert rows['City 2']['error'].startswith('AttributeError')
+    assert rows['City 1']['error'] == ''
@@ -0,0 +1,140 @@
+"""
+URL validation shared by the shortener and downloader apps.
+
+All patterns are compiled once at import time. Generic URLs are checked
+with a single precompiled regex behind a cheap scheme test, so obvious
+non-URLs are rejected without running the regex at all. YouTube URLs are
+split with urllib.parse and matched against a set of hosts and a few path
+rules instead of substring searches.
+
+``validate_many`` checks a batch in one pass, without a Python function
+call per URL for the generic check.
+
+Usage:
+    python url_validation.py https://example.com https://youtu.be/dQw4w9WgXcQ
+    python url_validation.py --bench [--count 1000000]
+"""
+
+import argparse
+import re
+import sys
+import time
+from typing import Callable, Iterable, List
+from urllib.parse import urlsplit, parse_qs
+
+_URL_PATTERN = re.compile(
+    r'https?://'  # http:// or https://
+    r'(?:(?:[A-Z0-9](?:[A-Z0-9-]{0,61}[A-Z0-9])?\.)+[A-Z]{2,6}\.?|'  # domain...
+    r'localhost|'  # localhost...
+    r'\d{1,3}\.\d{1,3}\.\d{1,3}\.\d{1,3})'  # ...or ip
+    r'(?::\d+)?'  # optional port
+    r'(?:/?|[/?]\S+)\Z', re.IGNORECASE)
+
+YOUTUBE_HOSTS = frozenset({'youtube.com', 'www.youtube.com', 'm.youtube.com', 'music.youtube.com'})
+# Shared with download_archive, which pulls the ID out of the path through the group
+YOUTUBE_ID = re.compile(r'[A-Za-z0-9_-]{11}\Z')
+YOUTUBE_PATH_ID = re.compile(r'/(?:shorts|embed|live|v)/([A-Za-z0-9_-]{11})(?:[/?]|\Z)')
+
+
+def is_valid_url(url: str) -> bool:
+    """True for http(s) URLs with a domain name, localhost or an IPv4 address."""
+    if not isinstance(url, str) or url[:4].lower() != 'http':
+        return False
+    return _URL_PATTERN.match(url) is not None
+
+
+def is_youtube_url(url: str) -> bool:
+    """True for YouTube video, Shorts, live, embed and playlist URLs."""
+    if not isinstance(url, str) or 'youtu' not in url.lower():
+        return False
+    url = url.strip()
+    if '://' not in url:
+        url = 'https://' + url  # Accept 'youtu.be/...' and 'www.youtube.com/...' as typed
+    try:
+        parts = urlsplit(url)
+    except ValueError:
+        return False
+    if parts.scheme.lower() not in ('http', 'https'):
+        return False
+
+    host = parts.hostname or ''
+    if host == 'youtu.be':
+        return YOUTUBE_ID.match(parts.path[1:].split('/', 1)[0]) is not None
+    if host not in YOUTUBE_HOSTS:
+        return False
+    if parts.path == '/watch':
+        return YOUTUBE_ID.match(parse_qs(parts.query).get('v', [''])[0]) is not None
+    if parts.path == '/playlist':
+        return bool(parse_qs(parts.query).get('list'))
+    return YOUTUBE_PATH_ID.match(parts.path) is not None
+
+
+def validate_many(urls: Iterable[str], validate: Callable[[str], bool] = is_valid_url) -> List[bool]:
+    """Validates a batch and returns one bool per URL, in input order."""
+    if validate is is_valid_url:
+        # Same checks as is_valid_url without a Python function call per URL
+        match = _URL_PATTERN.match
+        return [isinstance(url, str) and url[:4].lower() == 'http' and match(url) is not None for url in urls]
+    return list(map(validate, urls))
+
+
+def _legacy_is_valid_url(url):
+    # The previous implementation, which compiled the pattern on every call; kept for the benchmark
+    regex = re.compile(
+        r'^(https?://)'
+        r'(?:(?:[A-Z0-9](?:[A-Z0-9-]{0,61}[A-Z0-9])?\.)+[A-Z]{2,6}\.?|'
+        r'localhost|'
+        r'\d{1,3}\.\d{1,3}\.\d{1,3}\.\d{1,3})'
+        r'(?::\d+)?'
+        r'(?:/?|[/?]\S+)$', re.IGNORECASE)
+    return re.match(regex, url) is not None
+
+
+def sample_urls(count: int) -> List[str]:
+    """A deterministic mix of valid, invalid and YouTube URLs for benchmarking."""
+    templates = [
+        "https://www.example{0}.com/articles/{0}?ref=home",
+        "http://localhost:8080/item/{0}",
+        "http://192.168.{1}.{2}/status",
+        "https://youtu.be/dQw4w9WgX{3}",
+        "https://www.youtube.com/watch?v=dQw4w9WgX{3}&t={0}",
+        "example{0}.com/no-scheme",
+        "not a url {0}",
+        "https://bad host{0}.com/",
+    ]
+    return [templates[i % len(templates)].format(i, i % 256, (i // 256) % 256, f"{i % 100:02d}")
+            for i in range(count)]
+
+
+def benchmark(count: int = 1000000):
+    urls = sample_urls(count)
+    runs = [
+        ("is_valid_url (compiled per call)", lambda: [_legacy_is_valid_url(url) for url in urls]),
+        ("is_valid_url (precompiled)", lambda: [is_valid_url(url) for url in urls]),
+        ("validate_many", lambda: validate_many(urls)),
+        ("validate_many(is_youtube_url)", lambda: validate_many(urls, is_youtube_url)),
+    ]
+    for name, run in runs:
+        started = time.perf_counter()
+        valid = sum(run())
+        elapsed = time.perf_counter() - started
+        print(f"{name:<34} {elapsed:6.2f}s  {elapsed / count * 1e9:7.0f} ns/URL  {valid} valid")
+
+
+def main(argv=None) -> int:
+    parser = argparse.ArgumentParser(description="Validate URLs or benchmark the validators.")
+    parser.add_argument('urls', nargs='*')
+    parser.add_argument('--bench', action='store_true', help="time the validators over generated URLs")
+    parser.add_argument('--count', type=int, default=1000000, help="URLs used by --bench (default: 1000000)")
+    args = parser.parse_args(argv)
+
+    if args.bench:
+        benchmark(args.count)
+        return 0
+    for url in args.urls:
+        print(f"{url}\tvalid={is_valid_url(url)}\tyoutube={is_youtube_url(url)}")
+    return 0 if all(validate_many(args.urls)) else 1
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,93 @@
+"""
+TTL cache of WeatherAPI responses, shared by the weather apps.
+
+Responses are stored in SQLite keyed by API root, endpoint and normalized
+city, so looking up "London" again, or " london", within the TTL returns
+the stored JSON without an API call and survives restarts. Responses from
+weather_stub_server.py never answer requests meant for the real API. Current conditions
+and forecasts go stale at different speeds, so each endpoint has its own TTL.
+"""
+
+import json
+import sqlite3
+import threading
+import time
+from typing import Dict, Optional
+from urllib.parse import urlparse
+
+DEFAULT_CACHE_FILE = "weather_cache.db"
+DEFAULT_TTLS = {
+    'current': 10 * 60,
+    'forecast': 30 * 60,
+}
+FALLBACK_TTL = 10 * 60
+
+
+def normalize_city(city: str) -> str:
+    """Lowercases a city query and collapses whitespace, e.g. '  New   York ' -> 'new york'."""
+    return ' '.join(str(city).lower().split())
+
+
+def endpoint_name(url: str) -> str:
+    """The endpoint part of an API URL, e.g. '.../v1/forecast.json' -> 'forecast'."""
+    return urlparse(url).path.rsplit('/', 1)[-1].rsplit('.', 1)[0] or url
+
+
+def cache_key(endpoint: str, city: str, params: Optional[Dict] = None, base_url: str = '') -> str:
+    """Builds the cache key; the API root and extra parameters such as 'days' are part of it, the API key is not."""
+    extra = sorted((k, str(v)) for k, v in (params or {}).items() if k not in ('key', 'q'))
+    suffix = '&'.join(f"{k}={v}" for k, v in extra)
+    prefix = f"{base_url.rstrip('/')}/" if base_url else ''
+    return f"{prefix}{endpoint}:{normalize_city(city)}" + (f"?{suffix}" if suffix else '')
+
+
+class WeatherCache:
+    """SQLite-backed response cache with a TTL per endpoint; safe to share between threads."""
+
+    def __init__(self, path: str = DEFAULT_CACHE_FILE, ttls: Optional[Dict[str, float]] = None):
+        self.path = path
+        self.ttls = dict(DEFAULT_TTLS, **(ttls or {}))
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(path, check_same_thread=False)
+        self._conn.execute(
+            """CREATE TABLE IF NOT EXISTS responses (
+                   key TEXT PRIMARY KEY,
+                   endpoint TEXT NOT NULL,
+                   data TEXT NOT NULL,
+                   fetched_at REAL NOT NULL
+               )"""
+        )
+        self._conn.commit()
+
+    def ttl_for(self, endpoint: str) -> float:
+        return self.ttls.get(endpoint, FALLBACK_TTL)
+
+    def get(self, endpoint: str, city: str, params: Optional[Dict] = None, base_url: str = '') -> Optional[Dict]:
+        """Returns a fresh cached response from the API at `base_url`, or None."""
+        with self._lock:
+            row = self._conn.execute("SELECT data, fetched_at FROM responses WHERE key = ?",
+                                     (cache_key(endpoint, city, params, base_url),)).fetchone()
+        if row is None or time.time() - row[1] > self.ttl_for(endpoint):
+            return None
+        return json.loads(row[0])
+
+    def put(self, endpoint: str, city: str, data: Dict, params: Optional[Dict] = None, base_url: str = ''):
+        """Stores a successful response from the API at `base_url`."""
+        with self._lock:
+            self._conn.execute("INSERT OR REPLACE INTO responses VALUES (?, ?, ?, ?)",
+                               (cache_key(endpoint, city, params, base_url), endpoint, json.dumps(data),
+                                time.time()))
+            self._conn.commit()
+
+    def purge_expired(self):
+        """Deletes every response older than its endpoint's TTL."""
+        now = time.time()
+        with self._lock:
+            for endpoint, in self._conn.execute("SELECT DISTINCT endpoint FROM responses").fetchall():
+                self._conn.execute("DELETE FROM responses WHERE endpoint = ? AND fetched_at < ?",
+                                   (endpoint, now - self.ttl_for(endpoint)))
+            self._conn.commit()
+
+    def close(self):
+        with self._lock:
+            self._conn.close()
@@ -0,0 +1,298 @@
+"""
+Multi-city weather dashboard.
+
+Fetches current conditions for a list of cities over a bounded pool of
+pooled HTTP connections, never sending more than ``rate`` requests per
+second, and shows each result in a sortable table as soon as it arrives.
+Recent responses come from the shared WeatherCache, so reopening the
+dashboard within the TTL costs no API calls.
+
+Usage:
+    python weather_dashboard.py cities.txt [--workers 8] [--rate 5] [--gui]
+    python weather_dashboard.py cities.txt --base-url http://127.0.0.1:8765/v1
+
+Run weather_stub_server.py and pass its --base-url to try it offline.
+"""
+
+import argparse
+import os
+import queue
+import sys
+import threading
+import time
+import tkinter as tk
+from collections import Counter
+from concurrent.futures import ThreadPoolExecutor, as_completed
+from tkinter import ttk
+from typing import Dict, Iterable, Iterator, List, Optional
+
+import requests
+
+from rate_limit import TokenBucket
+from weather_cache import WeatherCache
+
+API_BASE_URL = os.environ.get("WEATHER_API_BASE_URL", "http://api.weatherapi.com/v1")
+# The one place the weather apps get their WeatherAPI key from; set WEATHER_API_KEY to use your own
+API_KEY = os.environ.get("WEATHER_API_KEY", "e1be24f806884bf1ad664228252206")
+REQUEST_TIMEOUT = 10
+DEFAULT_WORKERS = 8
+DEFAULT_RATE = 5.0
+
+COLUMNS = ("City", "Country", "Temp °C", "Condition", "Humidity %", "Wind kph", "Status")
+NUMERIC_COLUMNS = {"Temp °C", "Humidity %", "Wind kph"}
+
+
+def read_cities(lines: Iterable[str]) -> List[str]:
+    """Unique city names in order, one per line or comma separated; '#' starts a comment."""
+    cities, seen = [], set()
+    for line in lines:
+        for city in line.split('#', 1)[0].split(','):
+            city = city.strip()
+            if city and city.lower() not in seen:
+                seen.add(city.lower())
+                cities.append(city)
+    return cities
+
+
+def summarize_current(city: str, data: Dict) -> Dict:
+    """Flattens a current.json response into one dashboard row."""
+    location = data.get('location', {})
+    current = data.get('current', {})
+    return {
+        'city': city,
+        'name': location.get('name', city),
+        'country': location.get('country', ''),
+        'temp_c': current.get('temp_c'),
+        'condition': current.get('condition', {}).get('text', ''),
+        'humidity': current.get('humidity'),
+        'wind_kph': current.get('wind_kph'),
+        'error': '',
+    }
+
+
+def error_row(city: str, message: str) -> Dict:
+    """A dashboard row for a city that could not be fetched."""
+    return {'city': city, 'name': city, 'error': message}
+
+
+class CityFetcher:
+    """
+    Fetches current weather for many cities with bounded concurrency and a rate limit.
+
+    Args:
+        api_key: WeatherAPI key.
+        base_url: API root, e.g. 'http://api.weatherapi.com/v1'.
+        max_workers: Number of requests in flight at the same time.
+        rate: Maximum requests per second across all workers (0 for no limit).
+        cache: Optional WeatherCache consulted before each request.
+    """
+
+    def __init__(self, api_key: str = API_KEY, base_url: str = API_BASE_URL, max_workers: int = DEFAULT_WORKERS,
+                 rate: float = DEFAULT_RATE, cache: Optional[WeatherCache] = None):
+        self.api_key = api_key
+        self.base_url = base_url
+        self.url = base_url.rstrip('/') + '/current.json'
+        self.max_workers = max(1, max_workers)
+        self.limiter = TokenBucket(rate, capacity=max(1.0, rate))
+        self.cache = cache
+        self.session = requests.Session()
+        adapter = requests.adapters.HTTPAdapter(pool_connections=1, pool_maxsize=self.max_workers)
+        self.session.mount('http://', adapter)
+        self.session.mount('https://', adapter)
+
+    def fetch(self, city: str) -> Dict:
+        """Returns one row for a city; errors are reported in the row, not raised."""
+        cached = self.cache.get('current', city, base_url=self.base_url) if self.cache else None
+        if cached is not None:
+            return dict(summarize_current(city, cached), cached=True)
+
+        self.limiter.consume(1)
+        try:
+            response = self.session.get(self.url, params={'key': self.api_key, 'q': city}, timeout=REQUEST_TIMEOUT)
+            data = response.json()
+        except (requests.exceptions.RequestException, ValueError) as e:
+            return error_row(city, f"Network error: {e}")
+        if not isinstance(data, dict):
+            return error_row(city, f"Unexpected response (HTTP {response.status_code})")
+        if not response.ok or 'error' in data:
+            message = data.get('error', {}).get('message', f"HTTP {response.status_code}")
+            return error_row(city, message)
+
+        if self.cache:
+            self.cache.put('current', city, data, base_url=self.base_url)
+        return dict(summarize_current(city, data), cached=False)
+
+    def _fetch_row(self, city: str) -> Dict:
+        # A bug in one city's handling must not end the whole batch
+        try:
+            return self.fetch(city)
+        except Exception as e:
+            return error_row(city, f"{type(e).__name__}: {e}")
+
+    def fetch_all(self, cities: Iterable[str], stop: Optional[threading.Event] = None) -> Iterator[Dict]:
+        """Yields rows in completion order, so callers can show them as they arrive."""
+        stop = stop or threading.Event()
+        with ThreadPoolExecutor(self.max_workers, thread_name_prefix="city") as executor:
+            futures = [executor.submit(self._fetch_row, city) for city in cities]
+            for future in as_completed(futures):
+                if stop.is_set():
+                    for pending in futures:
+                        pending.cancel()
+                    return
+                yield future.result()
+
+
+class WeatherDashboard(tk.Toplevel):
+    """A window listing many cities; rows appear as results arrive and any column can be sorted."""
+
+    def __init__(self, master, cities: List[str], fetcher: CityFetcher):
+        super().__init__(master)
+        self.title(f"Weather Dashboard ({len(cities)} cities)")
+        self.geometry("760x480")
+        self.cities = cities
+        self.fetcher = fetcher
+        self.results: "queue.SimpleQueue[Dict]" = queue.SimpleQueue()
+        self.received = 0
+        self.sort_column: Optional[str] = None
+        self.sort_reverse = False
+
+        self.status_var = tk.StringVar(value=f"Fetching 0/{len(cities)}...")
+        ttk.Label(self, textvariable=self.status_var).pack(anchor="w", padx=10, pady=(10, 0))
+
+        table_frame = ttk.Frame(self)
+        table_frame.pack(fill="both", expand=True, padx=10, pady=10)
+        self.tree = ttk.Treeview(table_frame, columns=COLUMNS, show="headings")
+        for col in COLUMNS:
+            self.tree.heading(col, text=col, command=lambda c=col: self.sort_by(c))
+            self.tree.column(col, width=150 if col in ("City", "Condition", "Status") else 80,
+                             anchor="w" if col in ("City", "Country", "Condition", "Status") else "e")
+        scrollbar = ttk.Scrollbar(table_frame, orient="vertical", command=self.tree.yview)
+        self.tree.configure(yscrollcommand=scrollbar.set)
+        self.tree.pack(side="left", fill="both", expand=True)
+        scrollbar.pack(side="right", fill="y")
+
+        self.started = time.monotonic()
+        self.stop = threading.Event()
+        self.executor = ThreadPoolExecutor(max_workers=1, thread_name_prefix="dashboard")
+        self.executor.submit(self._fetch_in_background)
+        self.protocol("WM_DELETE_WINDOW", self.on_close)
+        self.poll_id = self.after(100, self.poll_results)
+
+    def _fetch_in_background(self):
+        pending = Counter(self.cities)
+        try:
+            for row in self.fetcher.fetch_all(self.cities, self.stop):
+                pending[row['city']] -= 1
+                self.results.put(row)
+        except Exception as e:
+            # Report the cities that never got a row, so the poll loop sees every city and stops
+            for city, count in pending.items():
+                for _ in range(count):
+                    self.results.put(error_row(city, f"Not fetched: {type(e).__name__}: {e}"))
+
+    def poll_results(self):
+        """Adds rows that arrived since the last poll; runs on the Tk thread."""
+        added = False
+        try:
+            while True:
+                self.add_row(self.results.get_nowait())
+                added = True
+        except queue.Empty:
+            pass
+        if added and self.sort_column:
+            self.apply_sort()
+        self.status_var.set(f"Fetched {self.received}/{len(self.cities)} in {time.monotonic() - self.started:.1f}s")
+        if self.received < len(self.cities):
+            self.poll_id = self.after(100, self.poll_results)
+        else:
+            self.poll_id = None
+
+    def add_row(self, row: Dict):
+        self.received += 1
+        status = row['error'] or ("cached" if row.get('cached') else "ok")
+        values = (row.get('name', row['city']), row.get('country', ''), _blank(row.get('temp_c')),
+                  row.get('condition', ''), _blank(row.get('humidity')), _blank(row.get('wind_kph')), status)
+        self.tree.insert('', 'end', values=values)
+
+    def sort_by(self, column: str):
+        """Sorts by a column; clicking the same heading again reverses the order."""
+        self.sort_reverse = not self.sort_reverse if self.sort_column == column else False
+        self.sort_column = column
+        self.apply_sort()
+
+    def apply_sort(self):
+        index = COLUMNS.index(self.sort_column)
+        numeric = self.sort_column in NUMERIC_COLUMNS
+
+        def key(item):
+            value = self.tree.item(item, 'values')[index]
+            if numeric:
+                # Rows without a value (errors) sort last either way
+                try:
+                    return (0, float(value) * (-1 if self.sort_reverse else 1))
+                except ValueError:
+                    return (1, 0.0)
+            return (0, str(value).lower())
+
+        items = sorted(self.tree.get_children(''), key=key, reverse=self.sort_reverse and not numeric)
+        for position, item in enumerate(items):
+            self.tree.move(item, '', position)
+        for col in COLUMNS:
+            arrow = (" ▼" if self.sort_reverse else " ▲") if col == self.sort_column else ""
+            self.tree.heading(col, text=col + arrow)
+
+    def on_close(self):
+        if self.poll_id is not None:
+            self.after_cancel(self.poll_id)
+            self.poll_id = None
+        self.stop.set()
+        self.executor.shutdown(wait=False, cancel_futures=True)
+        self.destroy()
+
+
+def _blank(value):
+    return '' if value is None else value
+
+
+def main(argv=None) -> int:
+    """Prints the dashboard as text, or opens it in a window with --gui."""
+    parser = argparse.ArgumentParser(description="Fetch current weather for many cities.")
+    parser.add_argument('cities', help="file with city names, one per line ('-' for stdin)")
+    parser.add_argument('--base-url', default=API_BASE_URL, help=f"API root (default: {API_BASE_URL})")
+    parser.add_argument('--key', default=API_KEY, help="WeatherAPI key (default: $WEATHER_API_KEY)")
+    parser.add_argument('--workers', type=int, default=DEFAULT_WORKERS, help=f"parallel requests (default: {DEFAULT_WORKERS})")
+    parser.add_argument('--rate', type=float, default=DEFAULT_RATE, help=f"requests per second, 0 for no limit (default: {DEFAULT_RATE})")
+    parser.add_argument('--no-cache', action='store_true', help="always ask the API")
+    parser.add_argument('--gui', action='store_true', help="show the results in a window")
+    args = parser.parse_args(argv)
+
+    if args.cities == '-':
+        cities = read_cities(sys.stdin)
+    else:
+        with open(args.cities, 'r', encoding='utf-8') as f:
+            cities = read_cities(f)
+    cache = None if args.no_cache else WeatherCache()
+    fetcher = CityFetcher(args.key, args.base_url, args.workers, args.rate, cache)
+
+    if args.gui:
+        root = tk.Tk()
+        root.withdraw()
+        dashboard = WeatherDashboard(root, cities, fetcher)
+        dashboard.bind("<Destroy>", lambda e: root.destroy() if e.widget is dashboard else None)
+        root.mainloop()
+        return 0
+
+    started = time.monotonic()
+    failed = 0
+    for row in fetcher.fetch_all(cities):
+        if row['error']:
+            failed += 1
+            print(f"{row['city']:<24} ERROR: {row['error']}")
+        else:
+            print(f"{row['name']:<24} {row['country']:<16} {row['temp_c']:>6}°C  {row['condition']}")
+    print(f"{len(cities)} cities in {time.monotonic() - started:.2f}s, {failed} failed")
+    return 1 if failed else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
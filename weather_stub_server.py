@@ -0,0 +1,169 @@
+"""
+Local stand-in for the WeatherAPI.com endpoints the weather apps use.
+
+Serves ``/v1/current.json`` and ``/v1/forecast.json`` with the same JSON
+layout as the real API. The data is deterministic and made up from the city
+name, so the dashboard and caches can be exercised offline without spending
+API quota. City names containing "unknown" get WeatherAPI's
+"No matching location found" error. Condition icons are served by the stub
+too (``/weather/64x64/day/<code>.png``, a plain coloured square), so the
+apps make no requests to the real CDN.
+
+Usage:
+    python weather_stub_server.py [--port 8765] [--latency 0.2]
+    WEATHER_API_BASE_URL=http://127.0.0.1:8765/v1 python 8advanced.py
+"""
+
+import argparse
+import hashlib
+import json
+import struct
+import time
+import zlib
+from datetime import date, timedelta
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import urlparse, parse_qs
+
+CONDITIONS = [
+    (1000, "Sunny", 113),
+    (1003, "Partly cloudy", 116),
+    (1006, "Cloudy", 119),
+    (1063, "Patchy rain possible", 176),
+    (1183, "Light rain", 296),
+    (1213, "Light snow", 326),
+]
+
+
+def _seed(city, salt=''):
+    return int(hashlib.md5(f"{city.lower()}{salt}".encode('utf-8')).hexdigest(), 16)
+
+
+def _condition(seed):
+    code, text, icon = CONDITIONS[seed % len(CONDITIONS)]
+    # Root-relative, unlike the real API's '//cdn.weatherapi.com/...', so icons come from this server
+    return {'text': text, 'icon': f"/weather/64x64/day/{icon}.png", 'code': code}
+
+
+def make_icon(icon, size=64):
+    """A PNG of a solid square whose colour depends on the icon number."""
+    seed = _seed(str(icon))
+    pixel = bytes([seed & 0xff, (seed >> 8) & 0xff, (seed >> 16) & 0xff])
+    raw = (b'\x00' + pixel * size) * size
+
+    def chunk(kind, data):
+        return struct.pack('>I', len(data)) + kind + data + struct.pack('>I', zlib.crc32(kind + data))
+
+    return (b'\x89PNG\r\n\x1a\n' + chunk(b'IHDR', struct.pack('>IIBBBBB', size, size, 8, 2, 0, 0, 0))
+            + chunk(b'IDAT', zlib.compress(raw)) + chunk(b'IEND', b''))
+
+
+def make_current(city):
+    seed = _seed(city)
+    temp_c = round((seed % 450) / 10 - 10, 1)
+    return {
+        'last_updated': time.strftime('%Y-%m-%d %H:%M'),
+        'temp_c': temp_c,
+        'temp_f': round(temp_c * 9 / 5 + 32, 1),
+        'condition': _condition(seed),
+        'wind_kph': round((seed >> 8) % 400 / 10, 1),
+        'humidity': (seed >> 16) % 100,
+        'feelslike_c': round(temp_c - (seed >> 24) % 40 / 10, 1),
+    }
+
+
+def make_forecast_day(city, day):
+    seed = _seed(city, day.isoformat())
+    high = round((seed % 400) / 10 - 5, 1)
+    return {
+        'date': day.isoformat(),
+        'day': {
+            'maxtemp_c': high,
+            'mintemp_c': round(high - (seed >> 8) % 120 / 10, 1),
+            'condition': _condition(seed),
+        },
+    }
+
+
+def make_response(endpoint, city, days):
+    name = city.strip().title()
+    body = {
+        'location': {'name': name, 'region': '', 'country': 'Stubland',
+                     'localtime': time.strftime('%Y-%m-%d %H:%M')},
+        'current': make_current(name),
+    }
+    if endpoint == 'forecast':
+        today = date.today()
+        body['forecast'] = {'forecastday': [make_forecast_day(name, today + timedelta(days=i))
+                                            for i in range(max(1, min(days, 14)))]}
+    return body
+
+
+class StubHandler(BaseHTTPRequestHandler):
+    latency = 0.0
+
+    def do_GET(self):
+        parsed = urlparse(self.path)
+        query = {key: values[0] for key, values in parse_qs(parsed.query).items()}
+        endpoint = parsed.path.rsplit('/', 1)[-1].replace('.json', '')
+
+        if parsed.path.startswith('/weather/') and endpoint.endswith('.png'):
+            icon = endpoint[:-len('.png')]
+            if not icon.isdigit():
+                return self._send(404, {'error': {'code': 1005, 'message': "Icon not found."}})
+            return self._send_bytes(200, make_icon(int(icon)), 'image/png')
+        if endpoint not in ('current', 'forecast'):
+            return self._send(404, {'error': {'code': 1005, 'message': "API request url is invalid."}})
+        if not query.get('key'):
+            return self._send(401, {'error': {'code': 1002, 'message': "API key is invalid or not provided."}})
+        city = query.get('q', '').strip()
+        if not city:
+            return self._send(400, {'error': {'code': 1003, 'message': "Parameter q is missing."}})
+        if 'unknown' in city.lower():
+            return self._send(400, {'error': {'code': 1006, 'message': "No matching location found."}})
+
+        if self.latency:
+            time.sleep(self.latency)
+        try:
+            days = int(query.get('days', 1))
+        except ValueError:
+            days = 1
+        self._send(200, make_response(endpoint, city, days))
+
+    def _send(self, status, body):
+        self._send_bytes(status, json.dumps(body).encode('utf-8'), 'application/json')
+
+    def _send_bytes(self, status, payload, content_type):
+        self.send_response(status)
+        self.send_header('Content-Type', content_type)
+        self.send_header('Content-Length', str(len(payload)))
+        self.end_headers()
+        self.wfile.write(payload)
+
+    def log_message(self, format, *args):
+        pass
+
+
+def serve(port=8765, latency=0.0, host='127.0.0.1'):
+    """Creates the server; call serve_forever() on the result."""
+    handler = type('Handler', (StubHandler,), {'latency': latency})
+    return ThreadingHTTPServer((host, port), handler)
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Serve fake WeatherAPI responses locally.")
+    parser.add_argument('--port', type=int, default=8765)
+    parser.add_argument('--latency', type=float, default=0.0, help="seconds to wait before each answer")
+    args = parser.parse_args(argv)
+
+    server = serve(args.port, args.latency)
+    print(f"Serving fake WeatherAPI at http://127.0.0.1:{args.port}/v1")
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        server.server_close()
+
+
+if __name__ == "__main__":
+    main()